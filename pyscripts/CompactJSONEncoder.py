@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
 from __future__ import annotations
+import array
 import json
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # USE of custom formatter for json file.
 #import json,argparse
@@ -15,30 +22,55 @@ import json
 class CompactJSONEncoder(json.JSONEncoder):
     """A JSON Encoder that puts small containers on single lines."""
 
-    CONTAINER_TYPES = (list, tuple, dict)
+    ARRAY_TYPES = (array.array,) + ((np.ndarray,) if np is not None else ())
+    """Typed arrays, encoded like lists."""
+
+    CONTAINER_TYPES = (list, tuple, dict) + ARRAY_TYPES
     """Container datatypes include primitives or other containers."""
 
+    NUMBER_FORMATS = {float: "%g", int: "%d"}
+    """Bulk formats for lists holding only floats or only ints (same text as `_encode_primitive`)."""
+
     MAX_WIDTH = 70
     """Maximum width of a container that might be put on a single line."""
 
     MAX_ITEMS = 10
     """Maximum number of items in container that might be put on single line."""
 
+    CHUNK_ITEMS = 4096
+    """Number of output pieces joined into each chunk yielded by `iterencode`."""
+
     def __init__(self, *args, **kwargs):
         # using this class without indentation is pointless
         if kwargs.get("indent") is None:
             kwargs["indent"] = 4
         super().__init__(*args, **kwargs)
         self.indentation_level = 0
+        self._indent_cache = {}
 
     def encode(self, o):
         """Encode JSON object *o* with respect to single line lists."""
-        if isinstance(o, (list, tuple)):
-            return self._encode_list(o)
-        if isinstance(o, dict):
-            return self._encode_object(o)
+        return "".join(self._iterencode(o, self.indentation_level))
+
+    def iterencode(self, o, _one_shot=False):
+        """Encode *o* in chunks, so `json.dump` streams to the file."""
+        return self._iterencode(o, self.indentation_level)
+
+    def _encode_primitive(self, o):
         if isinstance(o, float):  # Use scientific notation for floats
             return format(o, "g")
+        if isinstance(o, str):
+            return self._encode_str(o)
+        if o is None:
+            return "null"
+        if o is True:
+            return "true"
+        if o is False:
+            return "false"
+        if type(o) is int:
+            return int.__repr__(o)
+        if np is not None and isinstance(o, np.generic):
+            return self._encode_primitive(o.item())
         return json.dumps(
             o,
             skipkeys=self.skipkeys,
@@ -51,58 +83,176 @@ class CompactJSONEncoder(json.JSONEncoder):
             default=self.default if hasattr(self, "default") else None,
         )
 
-    def _encode_list(self, o):
-        if self._put_on_single_line(o):
-            return "[" + ", ".join(self.encode(el) for el in o) + "]"
-        self.indentation_level += 1
-        output = [self.indent_str + self.encode(el) for el in o]
-        self.indentation_level -= 1
-        return "[\n" + ",\n".join(output) + "\n" + self.indent_str + "]"
+    def _encode_str(self, s):
+        return encode_basestring_ascii(s) if self.ensure_ascii else encode_basestring(s)
 
-    def _encode_object(self, o):
+    def _single_line(self, o):
+        """The one-line form of *o* (dicts with normalized keys), or None if it has to be broken up."""
         if not o:
-            return "{}"
+            return "{}" if isinstance(o, dict) else "[]"
+        if not self._put_on_single_line(o):
+            return None
+        encode = self._encode_primitive
+        if isinstance(o, dict):
+            return "{ " + ", ".join(
+                f"{encode_basestring_ascii(k)}: {encode(el)}" for k, el in o.items()
+            ) + " }"
+        return "[" + ", ".join(map(encode, o)) + "]"
 
+    def _normalize_keys(self, o):
         # ensure keys are converted to strings
         o = {str(k) if k is not None else "null": v for k, v in o.items()}
-
         if self.sort_keys:
             o = dict(sorted(o.items(), key=lambda x: x[0]))
+        return o
 
-        if self._put_on_single_line(o):
-            return (
-                "{ "
-                + ", ".join(
-                    f"{json.dumps(k)}: {self.encode(el)}" for k, el in o.items()
-                )
-                + " }"
-            )
+    def _iterencode(self, o, level):
+        """
+        Walk *o* with an explicit stack, each container visited once, and
+        yield the output in chunks of CHUNK_ITEMS pieces.
+        """
+        containers = self.CONTAINER_TYPES
+        chunk_items = self.CHUNK_ITEMS
+        out = []
+        # frames: [iterator over the remaining items, is_dict, prefix of the next item, separator, closing, level,
+        # marker id]
+        stack = []
+        # ids of the open containers, like json.encoder's markers
+        markers = {} if self.check_circular else None
 
-        self.indentation_level += 1
-        output = [
-            f"{self.indent_str}{json.dumps(k)}: {self.encode(v)}" for k, v in o.items()
-        ]
-        self.indentation_level -= 1
+        def enter(value, lvl):
+            # emit a value: primitives and one-line containers directly,
+            # otherwise open it and push a frame
+            if not isinstance(value, containers):
+                out.append(self._encode_primitive(value))
+                return
+            if isinstance(value, self.ARRAY_TYPES):
+                value = value.tolist()
+                if not isinstance(value, list):  # 0-d NumPy array
+                    out.append(self._encode_primitive(value))
+                    return
+            original = value
+            is_dict = isinstance(value, dict)
+            if is_dict:
+                value = self._normalize_keys(value)
+            else:
+                line = self._encode_flat_list(value, lvl)
+                if line is not None:
+                    out.append(line)
+                    return
+            line = self._single_line(value)
+            if line is not None:
+                out.append(line)
+                return
+            marker = None
+            if markers is not None:
+                marker = id(original)
+                if marker in markers:
+                    raise ValueError("Circular reference detected")
+                markers[marker] = original
+            inner = self._indent(lvl + 1)
+            out.append("{\n" if is_dict else "[\n")
+            closing = "\n" + self._indent(lvl) + ("}" if is_dict else "]")
+            stack.append([iter(value.items() if is_dict else value), is_dict, inner, ",\n" + inner, closing, lvl + 1,
+                          marker])
 
-        return "{\n" + ",\n".join(output) + "\n" + self.indent_str + "}"
+        enter(o, level)
+        while stack:
+            frame = stack[-1]
+            items, is_dict, prefix, sep, closing, lvl, marker = frame
+            for item in items:
+                if is_dict:
+                    out.append(prefix + encode_basestring_ascii(item[0]) + ": ")
+                    item = item[1]
+                else:
+                    out.append(prefix)
+                prefix = frame[2] = sep
+                depth = len(stack)
+                enter(item, lvl)
+                if len(out) >= chunk_items:
+                    yield "".join(out)
+                    out.clear()
+                if len(stack) > depth:
+                    break
+            else:
+                stack.pop()
+                if marker is not None:
+                    del markers[marker]
+                out.append(closing)
+        if out:
+            yield "".join(out)
 
-    def iterencode(self, o, **kwargs):
-        """Required to also work with `json.dump`."""
-        return self.encode(o)
+    def _encode_flat_list(self, o, level):
+        """
+        The encoded form of a list holding no containers, or None. Lists of
+        only floats or only ints are formatted with a single `%` operation.
+        """
+        if not o:
+            return None
+        kinds = set(map(type, o))
+        if any(issubclass(kind, self.CONTAINER_TYPES) for kind in kinds):
+            return None
+        if len(o) <= self.MAX_ITEMS and self._compact_width(o) <= self.MAX_WIDTH:
+            sep = ", "
+            opening, closing = "[", "]"
+        else:
+            inner = self._indent(level + 1)
+            sep = ",\n" + inner
+            opening, closing = "[\n" + inner, "\n" + self._indent(level) + "]"
+        fmt = self.NUMBER_FORMATS.get(kinds.pop()) if len(kinds) == 1 else None
+        if fmt is not None:
+            return opening + ((fmt + sep) * len(o))[: -len(sep)] % tuple(o) + closing
+        return opening + sep.join(map(self._encode_primitive, o)) + closing
 
     def _put_on_single_line(self, o):
         return (
-            self._primitives_only(o)
-            and len(o) <= self.MAX_ITEMS
-            and len(str(o)) - 2 <= self.MAX_WIDTH
+            len(o) <= self.MAX_ITEMS
+            and self._primitives_only(o)
+            and self._compact_width(o) <= self.MAX_WIDTH
         )
 
+    def _compact_width(self, o):
+        """
+        Width of `str(o)` without its brackets, computed from the element reprs
+        and abandoned as soon as it exceeds MAX_WIDTH. Only called on
+        containers of primitives, once per container.
+        """
+        limit = self.MAX_WIDTH
+        if isinstance(o, dict):
+            items = o.items()
+        else:
+            items = ((None, el) for el in o)
+        width = 0
+        for i, (k, el) in enumerate(items):
+            if i:
+                width += 2  # ", "
+            if k is not None:
+                width += len(repr(k)) + 2  # "'key': "
+            # repr() is never shorter than the string plus its quotes
+            if isinstance(el, str) and len(el) + 2 > limit:
+                return limit + 1
+            width += len(repr(el))
+            if width > limit:
+                return width
+        if isinstance(o, tuple) and len(o) == 1:
+            width += 1  # "(x,)"
+        return width
+
     def _primitives_only(self, o: list | tuple | dict):
         if isinstance(o, (list, tuple)):
             return not any(isinstance(el, self.CONTAINER_TYPES) for el in o)
         elif isinstance(o, dict):
             return not any(isinstance(el, self.CONTAINER_TYPES) for el in o.values())
 
+    def _indent(self, level) -> str:
+        if level not in self._indent_cache:
+            saved, self.indentation_level = self.indentation_level, level
+            try:
+                self._indent_cache[level] = self.indent_str
+            finally:
+                self.indentation_level = saved
+        return self._indent_cache[level]
+
     @property
     def indent_str(self) -> str:
         if isinstance(self.indent, int):
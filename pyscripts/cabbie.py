@@ -2,10 +2,10 @@
 """
 Easy driver for tests 
 
-usage: cabbie.py [-h] [-c] [-l] [-r] [-p PREFIX] source_file
+usage: cabbie.py [-h] [-c] [-l] [-r] [-p PREFIX] [--shard I/N] [--list] source_file
 
 positional arguments:
-  source_file
+  source_file           Test file, or a directory to discover tests in
 
 options:
   -h, --help            show this help message and exit
@@ -14,6 +14,8 @@ options:
   -r, --run-only        Only run execution commands
   -p PREFIX, --prefix PREFIX
                         Run only specific custom command prefixes (comma-separated)
+  --shard I/N           With a directory: run the I-th (1-based) of N shards
+  --list                With a directory: list the discovered tests, don't run them
 
 Examples:
 
@@ -26,6 +28,16 @@ Custom command prefix workflow:
   python3 cabbie.py -p VERIFY test.c   # run only VERIFY commands
   python3 cabbie.py -p QUICK,SMOKE test.c  # run QUICK and SMOKE commands
 
+Discovery over a test tree (files with the requested commands, in path order):
+  python3 cabbie.py -p VERIFY tests/                # every test with VERIFY commands
+  python3 cabbie.py -p VERIFY tests/ --shard 2/8    # CI machine 2 of 8
+  python3 cabbie.py tests/ --list                   # tests with COMPILE/LINK/RUN
+
+The directive names in each file are kept in an index keyed by path and
+mtime ($XDG_CACHE_HOME/groot/cabbie-<hash>.json, or --index), so only new
+and changed files are read again; the index only narrows down the files,
+which are then parsed as usual.
+
 C/C++ Example:
 /* COMPILE: gcc -c -o test/gnuasm.o %s \
    -DNDEBUG
@@ -62,9 +74,8 @@ Text/Other Example:
 
 import sys, os, re, subprocess, argparse
 
-# ANSI color codes
-RED = '\033[91m'
-RESET = '\033[0m'
+import groot
+from groot.colors import Colors
 
 # Comment patterns for different file types
 COMMENT_PATTERNS = {
@@ -79,6 +90,15 @@ COMMENT_PATTERNS = {
 # Standard command types
 STANDARD_TOKENS = {'COMPILE', 'LINK', 'RUN'}
 
+# Discovery index: every word followed by ':' in a file, a superset of the
+# tokens parse_commands can match there (it searches case-insensitively)
+INDEX_VERSION = 2
+DIRECTIVE_WORD = re.compile(rb'([\w-]+):')
+TOKEN_NAME = re.compile(r'^[\w-]+$')
+TEST_EXTENSIONS = ('.c', '.cpp', '.cc', '.cxx', '.sh', '.bash', '.ll', '.s', '.S', '.asm', '.txt')
+
+verbose = False
+
 def detect_file_type(filepath):
     """Auto-detect file type based on extension."""
     ext = os.path.splitext(filepath)[1].lower()
@@ -118,39 +138,43 @@ def parse_commands(filepath, custom_prefixes=None):
     try:
         with open(filepath, 'r') as f:
             lines = f.readlines()
-            
-            # Warn about unknown tokens (only if not in custom prefix mode)
-            if not custom_prefixes:
-                for i, line in enumerate(lines):
-                    cleaned = re.sub(comment_pattern, '', line)
-                    m = re.match(r'^([A-Z_]+):\s*(.+)', cleaned)
-                    if m:
-                        token = m.group(1).upper()
-                        if token not in STANDARD_TOKENS and verbose:
-                            print(f"Warning: Skipping custom command '{token}' at line {i+1}")
-            
-            # Extract commands for all tokens
-            for token in all_tokens:
-                key = token.lower()
-                if key not in commands:
-                    commands[key] = []
-                    
-                pattern = rf'{token}:\s*(.+)'
-                for i, line in enumerate(lines):
-                    cleaned = re.sub(comment_pattern, '', line)
-                    m = re.search(pattern, cleaned, re.IGNORECASE)
-                    if m:
-                        cmd = m.group(1).strip()
-                        j = i + 1
-                        # Handle line continuations
-                        while cmd.endswith('\\') and j < len(lines):
-                            next_line = re.sub(comment_pattern, '', lines[j])
-                            cmd = cmd[:-1].strip() + ' ' + next_line.strip()
-                            j += 1
-                        # Replace %s with filepath
-                        cmd = cmd.replace('%s', filepath)
-                        commands[key].append(cmd)
-                        
+        text = ''.join(lines)
+        comment_re = re.compile(comment_pattern)
+        cleaned_lines = [comment_re.sub('', line, count=1) for line in lines]
+
+        # Warn about unknown tokens (only if not in custom prefix mode)
+        if not custom_prefixes and verbose:
+            for i, cleaned in enumerate(cleaned_lines):
+                m = re.match(r'^([A-Z_]+):\s*(.+)', cleaned)
+                if m:
+                    token = m.group(1).upper()
+                    if token not in STANDARD_TOKENS:
+                        print(f"Warning: Skipping custom command '{token}' at line {i+1}")
+
+        # Extract commands for all tokens
+        for token in all_tokens:
+            key = token.lower()
+            if key not in commands:
+                commands[key] = []
+
+            # most files don't mention most tokens: skip the line scan
+            if not re.search(rf'{token}:', text, re.IGNORECASE):
+                continue
+            pattern = re.compile(rf'{token}:\s*(.+)', re.IGNORECASE)
+            for i, cleaned in enumerate(cleaned_lines):
+                m = pattern.search(cleaned)
+                if m:
+                    cmd = m.group(1).strip()
+                    j = i + 1
+                    # Handle line continuations
+                    while cmd.endswith('\\') and j < len(lines):
+                        next_line = cleaned_lines[j]
+                        cmd = cmd[:-1].strip() + ' ' + next_line.strip()
+                        j += 1
+                    # Replace %s with filepath
+                    cmd = cmd.replace('%s', filepath)
+                    commands[key].append(cmd)
+
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
@@ -163,14 +187,134 @@ def run_cmd(cmd, desc, idx):
     if result.stdout:
         print(result.stdout, end='')
     if result.stderr:
-        print(f"{RED}{result.stderr}{RESET}", end='')
+        print(f"{Colors.RED}{result.stderr}{Colors.RESET}", end='')
     if result.returncode != 0:
-        print(f"{RED}Failed with exit code {result.returncode}{RESET}")
+        print(f"{Colors.RED}Failed with exit code {result.returncode}{Colors.RESET}")
         sys.exit(1)
 
+def scan_directives(filepath):
+    """Upper-cased words followed by ':' in a file, for the discovery index."""
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    return sorted({w.decode('ascii').upper() for w in DIRECTIVE_WORD.findall(data)})
+
+def index_path(root):
+    import hashlib  # discovery only; keeps single-file runs lean
+    digest = hashlib.sha1(os.path.realpath(root).encode()).hexdigest()[:16]
+    return groot.cache.cache_path(f'cabbie-{digest}.json')
+
+def discover(root, index_file, jobs=None):
+    """
+    Walk root for test files and bring the index up to date: files whose
+    mtime or size changed are scanned again (in parallel), deleted ones
+    dropped. Returns {relative path: directive words}.
+    """
+    old = groot.cache.load_json(index_file, INDEX_VERSION) or {}
+    files = {}
+    stale = []
+    for dirpath, dirs, names in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        reldir = os.path.relpath(dirpath, root)
+        for name in sorted(names):
+            if not name.endswith(TEST_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, name)
+            rel = name if reldir == '.' else os.path.join(reldir, name)
+            st = os.stat(path)
+            entry = old.get(rel)
+            if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                files[rel] = entry
+            else:
+                files[rel] = [st.st_mtime_ns, st.st_size, None]
+                stale.append(rel)
+    if stale:
+        paths = [os.path.join(root, rel) for rel in stale]
+        if len(stale) > 64 and (jobs or os.cpu_count() or 1) > 1:
+            from concurrent.futures import ProcessPoolExecutor  # only for cold scans
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                words = list(executor.map(scan_directives, paths, chunksize=64))
+        else:
+            words = [scan_directives(p) for p in paths]
+        for rel, w in zip(stale, words):
+            files[rel][2] = w
+    if stale or len(files) != len(old):
+        groot.cache.write_json(index_file, INDEX_VERSION, files, separators=(',', ':'))
+    if verbose:
+        print(f"Index {index_file}: {len(files)} files, {len(stale)} scanned")
+    return {rel: entry[2] for rel, entry in files.items()}
+
+def wanted_tokens(args, custom_prefixes):
+    """Command keys that make a file a test in this mode."""
+    if custom_prefixes:
+        return list(custom_prefixes)
+    tokens = []
+    if not args.run_only:
+        tokens.append('COMPILE')
+    if not args.compile_only and not args.run_only:
+        tokens.append('LINK')
+    if not args.compile_only and not args.link_only:
+        tokens.append('RUN')
+    return tokens
+
+def may_have(words, token):
+    # parse_commands searches for TOKEN: anywhere in a line, so it can be
+    # the tail of a longer word
+    if not TOKEN_NAME.match(token):
+        return True
+    return any(w.endswith(token) for w in words)
+
+def select_tests(root, directives, tokens, custom_prefixes):
+    """Sorted test paths under root with commands for any of tokens."""
+    tests = []
+    for rel in sorted(directives):
+        if not any(may_have(directives[rel], t) for t in tokens):
+            continue
+        path = os.path.join(root, rel)
+        cmds = parse_commands(path, custom_prefixes)
+        if any(cmds.get(t.lower()) for t in tokens):
+            tests.append(path)
+    return tests
+
+def parse_shard(text):
+    """'I/N' -> (I, N), 1 <= I <= N."""
+    m = re.match(r'^(\d+)/(\d+)$', text)
+    if not m or not 1 <= int(m.group(1)) <= int(m.group(2)):
+        raise argparse.ArgumentTypeError(f"expected I/N with 1 <= I <= N, got '{text}'")
+    return int(m.group(1)), int(m.group(2))
+
+def shard(tests, index, count):
+    """Round-robin over the sorted tests: the same split on every machine."""
+    return tests[index - 1::count]
+
+def run_file(source_file, args, custom_prefixes):
+    cmds = parse_commands(source_file, custom_prefixes)
+
+    # If custom prefix mode, only run custom commands
+    if args.prefix:
+        for prefix in custom_prefixes:
+            key = prefix.lower()
+            if key in cmds and cmds[key]:
+                for i, cmd in enumerate(cmds[key]):
+                    run_cmd(cmd, prefix, i)
+            else:
+                print(f"Warning: No commands found for prefix '{prefix}'")
+    else:
+        # Standard mode: run compile, link, run
+        if not args.run_only:
+            for i, cmd in enumerate(cmds['compile']):
+                run_cmd(cmd, 'COMPILE', i)
+                
+        if not args.compile_only and not args.run_only:
+            for i, cmd in enumerate(cmds['link']):
+                run_cmd(cmd, 'LINK', i)
+                
+        if not args.compile_only and not args.link_only:
+            for i, cmd in enumerate(cmds['run']):
+                run_cmd(cmd, 'RUN', i)
+
 def main():
     parser = argparse.ArgumentParser(description='Easy driver for tests')
-    parser.add_argument('source_file', help='Source file to process')
+    parser.add_argument('source_file', help='Source file to process, or a directory to discover tests in')
     parser.add_argument('-c', '--compile-only', action='store_true',
                        help='Only run compile commands')
     parser.add_argument('-l', '--link-only', action='store_true',
@@ -179,6 +323,14 @@ def main():
                        help='Only run execution commands')
     parser.add_argument('-p', '--prefix', type=str,
                        help='Run only specific custom command prefixes (comma-separated, e.g., VERIFY,SMOKE)')
+    parser.add_argument('--shard', type=parse_shard, metavar='I/N',
+                       help='With a directory: run only the I-th (1-based) of N shards of the tests')
+    parser.add_argument('--list', action='store_true',
+                       help="With a directory: print the discovered tests instead of running them")
+    parser.add_argument('--index', type=str,
+                       help='Discovery index file (default: $XDG_CACHE_HOME/groot/cabbie-<hash>.json)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                       help='Processes to scan changed files with (default: all cores)')
     parser.add_argument('-v', '--verbose', action='store_true',
                        help='Enable verbose logging')
     args = parser.parse_args()
@@ -186,40 +338,44 @@ def main():
     global verbose
     verbose = args.verbose
     
-    if not os.path.isfile(args.source_file):
+    discovery = os.path.isdir(args.source_file)
+    if not discovery and not os.path.isfile(args.source_file):
         print(f"Error: File not found: {args.source_file}")
         sys.exit(1)
+    if (args.shard or args.list) and not discovery:
+        parser.error('--shard and --list need a directory')
     
     # Parse custom prefixes if provided
     custom_prefixes = None
     if args.prefix:
         custom_prefixes = [prefix.strip().upper() for prefix in args.prefix.split(',')]
-        print(f"Running custom command prefixes: {', '.join(custom_prefixes)}")
+        if not args.list:
+            print(f"Running custom command prefixes: {', '.join(custom_prefixes)}")
     
-    cmds = parse_commands(args.source_file, custom_prefixes)
-    
-    # If custom prefix mode, only run custom commands
-    if args.prefix:
-        for prefix in custom_prefixes:
-            key = prefix.lower()
-            if key in cmds and cmds[key]:
-                for i, cmd in enumerate(cmds[key]):
-                    run_cmd(cmd, prefix, i)
-            else:
-                print(f"Warning: No commands found for prefix '{prefix}'")
-    else:
-        # Standard mode: run compile, link, run
-        if not args.run_only:
-            for i, cmd in enumerate(cmds['compile']):
-                run_cmd(cmd, 'COMPILE', i)
-                
-        if not args.compile_only and not args.run_only:
-            for i, cmd in enumerate(cmds['link']):
-                run_cmd(cmd, 'LINK', i)
-                
-        if not args.compile_only and not args.link_only:
-            for i, cmd in enumerate(cmds['run']):
-                run_cmd(cmd, 'RUN', i)
+    if not discovery:
+        run_file(args.source_file, args, custom_prefixes)
+        return
+
+    root = args.source_file
+    directives = discover(root, args.index or index_path(root), args.jobs)
+    tests = select_tests(root, directives, wanted_tokens(args, custom_prefixes), custom_prefixes)
+    total = len(tests)
+    if args.shard:
+        tests = shard(tests, *args.shard)
+    if args.list:
+        for test in tests:
+            print(test)
+        return
+    shard_note = f" (shard {args.shard[0]}/{args.shard[1]} of {total})" if args.shard else ''
+    print(f"Discovered {len(tests)} tests in {root}{shard_note}")
+    for test in tests:
+        print(f"\n[CABBIE] {test}")
+        try:
+            run_file(test, args, custom_prefixes)
+        except SystemExit as e:
+            if e.code:
+                print(f"[CABBIE RUN FAIL]: {test}")
+            raise
 
 if __name__ == '__main__':
     main()
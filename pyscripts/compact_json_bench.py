@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Benchmark and golden-output check for CompactJSONEncoder.
+
+Builds a deterministic stats-like document of about --size-mb megabytes,
+encodes it with the original (reference) encoder and the current one,
+streams it with json.dump, and checks that all outputs are byte-identical.
+With --golden FILE the SHA-256 of the output is recorded on the first run
+and compared on later runs.
+
+python compact_json_bench.py                     # ~128MB document
+python compact_json_bench.py --size-mb 8 --golden /tmp/cje.sha256
+"""
+from __future__ import annotations
+import argparse
+import array
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from CompactJSONEncoder import CompactJSONEncoder, np
+
+
+class ReferenceCompactJSONEncoder(json.JSONEncoder):
+    """The original recursive implementation, kept verbatim as the golden reference."""
+
+    CONTAINER_TYPES = (list, tuple, dict)
+    MAX_WIDTH = 70
+    MAX_ITEMS = 10
+
+    def __init__(self, *args, **kwargs):
+        if kwargs.get("indent") is None:
+            kwargs["indent"] = 4
+        super().__init__(*args, **kwargs)
+        self.indentation_level = 0
+
+    def encode(self, o):
+        if isinstance(o, (list, tuple)):
+            return self._encode_list(o)
+        if isinstance(o, dict):
+            return self._encode_object(o)
+        if isinstance(o, float):
+            return format(o, "g")
+        return json.dumps(
+            o,
+            skipkeys=self.skipkeys,
+            ensure_ascii=self.ensure_ascii,
+            check_circular=self.check_circular,
+            allow_nan=self.allow_nan,
+            sort_keys=self.sort_keys,
+            indent=self.indent,
+            separators=(self.item_separator, self.key_separator),
+            default=self.default if hasattr(self, "default") else None,
+        )
+
+    def _encode_list(self, o):
+        if self._put_on_single_line(o):
+            return "[" + ", ".join(self.encode(el) for el in o) + "]"
+        self.indentation_level += 1
+        output = [self.indent_str + self.encode(el) for el in o]
+        self.indentation_level -= 1
+        return "[\n" + ",\n".join(output) + "\n" + self.indent_str + "]"
+
+    def _encode_object(self, o):
+        if not o:
+            return "{}"
+        o = {str(k) if k is not None else "null": v for k, v in o.items()}
+        if self.sort_keys:
+            o = dict(sorted(o.items(), key=lambda x: x[0]))
+        if self._put_on_single_line(o):
+            return "{ " + ", ".join(f"{json.dumps(k)}: {self.encode(el)}" for k, el in o.items()) + " }"
+        self.indentation_level += 1
+        output = [f"{self.indent_str}{json.dumps(k)}: {self.encode(v)}" for k, v in o.items()]
+        self.indentation_level -= 1
+        return "{\n" + ",\n".join(output) + "\n" + self.indent_str + "}"
+
+    def iterencode(self, o, **kwargs):
+        return self.encode(o)
+
+    def _put_on_single_line(self, o):
+        return self._primitives_only(o) and len(o) <= self.MAX_ITEMS and len(str(o)) - 2 <= self.MAX_WIDTH
+
+    def _primitives_only(self, o):
+        if isinstance(o, (list, tuple)):
+            return not any(isinstance(el, self.CONTAINER_TYPES) for el in o)
+        elif isinstance(o, dict):
+            return not any(isinstance(el, self.CONTAINER_TYPES) for el in o.values())
+
+    @property
+    def indent_str(self) -> str:
+        if isinstance(self.indent, int):
+            return " " * (self.indentation_level * self.indent)
+        return self.indentation_level * self.indent
+
+
+def make_document(size_mb, seed=7):
+    """Nested benchmark -> function -> stats document of roughly size_mb MB."""
+    rng = random.Random(seed)
+    doc = {"meta": {"tool": "bench", "version": 3, "flags": ["-O2", "-g"]}, "benchmarks": {}}
+    budget = size_mb * (1 << 20)
+    written = 0
+    b = 0
+    while written < budget:
+        functions = {}
+        for f in range(rng.randint(5, 40)):
+            timings = [rng.random() * 10 for _ in range(rng.randint(1, 60))]
+            functions[f"func_{b}_{f}"] = {
+                "timings": timings,
+                "histogram": [rng.randint(0, 1000) for _ in range(rng.randint(1, 16))],
+                "size": {"text": rng.randint(0, 1 << 20), "data": rng.randint(0, 4096)},
+                "passes": [{"name": f"pass{p}", "ms": rng.random()} for p in range(rng.randint(0, 4))],
+                "note": "x" * rng.randint(0, 90),
+            }
+            written += 110 + len(timings) * 43  # rough encoded size
+        doc["benchmarks"][f"bench_{b}"] = functions
+        b += 1
+    return doc
+
+
+def with_arrays(doc, make_array):
+    """Copy of *doc* with every "timings" list replaced by make_array(list)."""
+    if isinstance(doc, dict):
+        return {k: make_array(v) if k == "timings" else with_arrays(v, make_array) for k, v in doc.items()}
+    if isinstance(doc, list):
+        return [with_arrays(v, make_array) for v in doc]
+    return doc
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CompactJSONEncoder against the reference implementation.")
+    parser.add_argument("--size-mb", type=int, default=128, help="Approximate document size in MB (default: 128)")
+    parser.add_argument("--golden", metavar="FILE", help="Record/compare the SHA-256 of the encoded output")
+    parser.add_argument("--skip-reference", action="store_true", help="Don't run the (slow) reference encoder")
+    args = parser.parse_args()
+
+    doc, gen_time = timed(lambda: make_document(args.size_mb))
+    print(f"Generated document in {gen_time:.2f}s")
+
+    new_text, new_time = timed(lambda: json.dumps(doc, cls=CompactJSONEncoder))
+    print(f"CompactJSONEncoder.encode:     {new_time:8.2f}s  ({len(new_text) / (1 << 20):.1f} MB)")
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            _, dump_time = timed(lambda: json.dump(doc, f, cls=CompactJSONEncoder))
+        print(f"json.dump (streaming):         {dump_time:8.2f}s")
+        with open(path) as f:
+            streamed_same = f.read() == new_text
+    finally:
+        os.remove(path)
+
+    ok = streamed_same
+    if not streamed_same:
+        print("MISMATCH: json.dump output differs from encode()")
+
+    if not args.skip_reference:
+        ref_text, ref_time = timed(lambda: json.dumps(doc, cls=ReferenceCompactJSONEncoder))
+        print(f"Reference encode:              {ref_time:8.2f}s  (speedup {ref_time / new_time:.2f}x)")
+        if ref_text != new_text:
+            print("MISMATCH: output differs from the reference encoder")
+            ok = False
+
+    array_kinds = [("array.array", lambda v: array.array("d", v))]
+    if np is not None:
+        array_kinds.append(("numpy.ndarray", np.array))
+    for label, make_array in array_kinds:
+        typed = with_arrays(doc, make_array)
+        typed_text, typed_time = timed(lambda: json.dumps(typed, cls=CompactJSONEncoder))
+        print(f"encode with {label + ':':<19}{typed_time:8.2f}s")
+        if typed_text != new_text:
+            print(f"MISMATCH: {label} timings encode differently from lists")
+            ok = False
+        del typed, typed_text
+
+    digest = hashlib.sha256(new_text.encode()).hexdigest()
+    if args.golden:
+        if os.path.exists(args.golden):
+            with open(args.golden) as f:
+                expected = f.read().strip()
+            if expected != digest:
+                print(f"MISMATCH: golden digest {expected} != {digest}")
+                ok = False
+        else:
+            with open(args.golden, "w") as f:
+                f.write(digest + "\n")
+            print(f"Recorded golden digest in {args.golden}")
+
+    print("Identical output" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
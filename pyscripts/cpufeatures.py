@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+CPU feature detection without helper binaries: /proc/cpuinfo flags, CPUID
+and XCR0 (via a few bytes of machine code called through ctypes) and the
+AMX permission state of this process (arch_prctl ARCH_GET_XCOMP_PERM).
+
+    import cpufeatures
+    if cpufeatures.has("amx_tile", "amx_bf16"): ...
+    cpufeatures.cpu_features()["avx10_version"]
+
+python cpufeatures.py                  # print everything
+python cpufeatures.py avx512f amx_fp16  # exit status 0 if all are usable
+
+CPU and OS state (not the per-process permission) is cached per boot in
+$XDG_CACHE_HOME/groot/cpufeatures-<boot id>.json.
+"""
+import ctypes
+import mmap
+import platform
+import sys
+
+from groot.cache import cache_path as groot_cache_path, load_json, write_json
+
+CACHE_VERSION = 2
+
+# (leaf, subleaf, register, bit) -> name, using the /proc/cpuinfo spelling
+CPUID_BITS = {
+    (1, 0, "ecx", 27): "osxsave",
+    (7, 0, "ebx", 16): "avx512f",
+    (7, 0, "ebx", 17): "avx512dq",
+    (7, 0, "ebx", 21): "avx512ifma",
+    (7, 0, "ebx", 28): "avx512cd",
+    (7, 0, "ebx", 30): "avx512bw",
+    (7, 0, "ebx", 31): "avx512vl",
+    (7, 0, "ecx", 1): "avx512vbmi",
+    (7, 0, "ecx", 6): "avx512_vbmi2",
+    (7, 0, "ecx", 11): "avx512_vnni",
+    (7, 0, "ecx", 12): "avx512_bitalg",
+    (7, 0, "ecx", 14): "avx512_vpopcntdq",
+    (7, 0, "edx", 8): "avx512_vp2intersect",
+    (7, 0, "edx", 22): "amx_bf16",
+    (7, 0, "edx", 23): "avx512_fp16",
+    (7, 0, "edx", 24): "amx_tile",
+    (7, 0, "edx", 25): "amx_int8",
+    (7, 1, "eax", 4): "avx_vnni",
+    (7, 1, "eax", 5): "avx512_bf16",
+    (7, 1, "eax", 21): "amx_fp16",
+    (7, 1, "eax", 23): "avx_ifma",
+    (7, 1, "edx", 4): "avx_vnni_int8",
+    (7, 1, "edx", 5): "avx_ne_convert",
+    (7, 1, "edx", 8): "amx_complex",
+    (7, 1, "edx", 10): "avx_vnni_int16",
+    (7, 1, "edx", 19): "avx10",
+}
+
+# XCR0 state components the OS has to enable for a feature to be usable
+XCR0_AVX512 = 0b1110_0110  # SSE, AVX, opmask, ZMM_Hi256, Hi16_ZMM
+XCR0_AMX = (1 << 17) | (1 << 18)  # XTILECFG, XTILEDATA
+XFEATURE_XTILEDATA = 18
+
+ARCH_GET_XCOMP_SUPP = 0x1021
+ARCH_GET_XCOMP_PERM = 0x1022
+ARCH_REQ_XCOMP_PERM = 0x1023
+SYS_arch_prctl = 158  # x86-64
+
+# void cpuid(uint32 leaf, uint32 subleaf, uint32 out[4])  (System V ABI)
+CPUID_CODE = bytes([
+    0x53,                    # push rbx
+    0x89, 0xF8,              # mov eax, edi
+    0x89, 0xF1,              # mov ecx, esi
+    0x49, 0x89, 0xD0,        # mov r8, rdx
+    0x0F, 0xA2,              # cpuid
+    0x41, 0x89, 0x00,        # mov [r8], eax
+    0x41, 0x89, 0x58, 0x04,  # mov [r8+4], ebx
+    0x41, 0x89, 0x48, 0x08,  # mov [r8+8], ecx
+    0x41, 0x89, 0x50, 0x0C,  # mov [r8+12], edx
+    0x5B,                    # pop rbx
+    0xC3,                    # ret
+])
+
+# uint64 xgetbv(uint32 index)
+XGETBV_CODE = bytes([
+    0x89, 0xF9,              # mov ecx, edi
+    0x0F, 0x01, 0xD0,        # xgetbv
+    0x48, 0xC1, 0xE2, 0x20,  # shl rdx, 32
+    0x48, 0x09, 0xD0,        # or rax, rdx
+    0xC3,                    # ret
+])
+
+_features = None
+
+
+class _NativeProbe:
+    """CPUID/XGETBV stubs in an executable anonymous mapping (Linux x86-64 only)."""
+
+    def __init__(self):
+        if sys.platform != "linux" or platform.machine() not in ("x86_64", "AMD64"):
+            raise OSError("native CPUID probing needs Linux on x86-64")
+        code = CPUID_CODE + XGETBV_CODE
+        # may raise where W+X mappings are forbidden (SELinux execmem)
+        self.mem = mmap.mmap(-1, mmap.PAGESIZE, prot=mmap.PROT_READ | mmap.PROT_WRITE | mmap.PROT_EXEC)
+        self.mem.write(code)
+        base = ctypes.addressof(ctypes.c_char.from_buffer(self.mem))
+        self._cpuid = ctypes.CFUNCTYPE(None, ctypes.c_uint32, ctypes.c_uint32,
+                                       ctypes.POINTER(ctypes.c_uint32 * 4))(base)
+        self._xgetbv = ctypes.CFUNCTYPE(ctypes.c_uint64, ctypes.c_uint32)(base + len(CPUID_CODE))
+
+    def cpuid(self, leaf, subleaf=0):
+        regs = (ctypes.c_uint32 * 4)()
+        self._cpuid(leaf, subleaf, ctypes.byref(regs))
+        return dict(zip(("eax", "ebx", "ecx", "edx"), regs))
+
+    def xgetbv(self, index=0):
+        return self._xgetbv(index)
+
+
+def cpuinfo_flags(path="/proc/cpuinfo"):
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def boot_id():
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _arch_prctl(code):
+    if sys.platform != "linux" or platform.machine() not in ("x86_64", "AMD64"):
+        return None
+    libc = ctypes.CDLL(None, use_errno=True)
+    value = ctypes.c_uint64()
+    if libc.syscall(SYS_arch_prctl, code, ctypes.byref(value)) != 0:
+        return None  # EINVAL on kernels without dynamic XSTATE (< 5.16)
+    return value.value
+
+
+def amx_permission():
+    """AMX tile data state: {"kernel": supported by the kernel, "permitted": this process may use it}."""
+    supp = _arch_prctl(ARCH_GET_XCOMP_SUPP)
+    perm = _arch_prctl(ARCH_GET_XCOMP_PERM)
+    return {
+        "kernel": bool(supp is not None and supp >> XFEATURE_XTILEDATA & 1),
+        "permitted": bool(perm is not None and perm >> XFEATURE_XTILEDATA & 1),
+    }
+
+
+def request_amx_permission():
+    """Ask the kernel for AMX tile data permission for this process; True once granted."""
+    if sys.platform != "linux" or platform.machine() not in ("x86_64", "AMD64"):
+        return False
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.syscall(SYS_arch_prctl, ARCH_REQ_XCOMP_PERM, XFEATURE_XTILEDATA) != 0:
+        return False
+    return amx_permission()["permitted"]
+
+
+def probe():
+    """Detect features now, without the cache."""
+    kernel_flags = cpuinfo_flags()
+    flags = set(kernel_flags)
+    result = {"source": "cpuinfo", "xcr0": None, "avx10_version": 0}
+    try:
+        native = _NativeProbe()
+    except (OSError, ValueError, AttributeError):
+        native = None
+    if native is not None:
+        result["source"] = "cpuid"
+        max_leaf = native.cpuid(0)["eax"]
+        leaves = {}
+        for leaf, subleaf, reg, bit in CPUID_BITS:
+            if leaf <= max_leaf and (leaf, subleaf) not in leaves:
+                leaves[leaf, subleaf] = native.cpuid(leaf, subleaf)
+        for (leaf, subleaf, reg, bit), name in CPUID_BITS.items():
+            if (leaf, subleaf) in leaves and leaves[leaf, subleaf][reg] >> bit & 1:
+                flags.add(name)
+        if "osxsave" in flags:
+            result["xcr0"] = native.xgetbv(0)
+        if "avx10" in flags and max_leaf >= 0x24:
+            result["avx10_version"] = native.cpuid(0x24)["ebx"] & 0xFF
+    xcr0 = result["xcr0"]
+    if xcr0 is None:
+        # the kernel only lists features whose state it enabled
+        result["os_avx512"] = "avx512f" in kernel_flags
+        result["os_amx"] = "amx_tile" in kernel_flags
+    else:
+        result["os_avx512"] = xcr0 & XCR0_AVX512 == XCR0_AVX512
+        result["os_amx"] = xcr0 & XCR0_AMX == XCR0_AMX
+    result["flags"] = sorted(flags)
+    return result
+
+
+def cache_path(boot):
+    return groot_cache_path(f"cpufeatures-{boot}.json")
+
+
+def cpu_features(use_cache=True):
+    """
+    {"flags": sorted feature names, "xcr0", "os_avx512", "os_amx",
+    "avx10_version", "source": "cpuid" or "cpuinfo"}, cached per boot.
+    """
+    global _features
+    if _features is not None and use_cache:
+        return _features
+    boot = boot_id() if use_cache else None
+    path = cache_path(boot) if boot else None
+    if path:
+        cached = load_json(path, CACHE_VERSION)
+        if cached is not None:
+            _features = cached
+            return _features
+    features = probe()
+    if path:
+        try:
+            write_json(path, CACHE_VERSION, features)
+        except OSError:
+            pass
+    _features = features
+    return features
+
+
+def has(*names):
+    """
+    True if the CPU has all `names` (cpuinfo spelling, e.g. "avx512f",
+    "amx_fp16", "avx10") and the OS enabled their register state.
+    AMX additionally needs request_amx_permission() before use.
+    """
+    features = cpu_features()
+    flags = set(features["flags"])
+    for name in names:
+        if name not in flags:
+            return False
+        if name.startswith("amx") and not features["os_amx"]:
+            return False
+        if (name.startswith("avx512") or name == "avx10") and not features["os_avx512"]:
+            return False
+    return True
+
+
+def main():
+    names = sys.argv[1:]
+    if names:
+        sys.exit(0 if has(*names) else 1)
+    features = cpu_features()
+    interesting = [f for f in features["flags"] if f.startswith(("avx512", "avx10", "amx", "avx_"))]
+    print(f"Source:        {features['source']}")
+    print(f"XCR0:          {hex(features['xcr0']) if features['xcr0'] is not None else 'unknown'}")
+    print(f"AVX-512 state: {'enabled' if features['os_avx512'] else 'disabled'}")
+    print(f"AMX state:     {'enabled' if features['os_amx'] else 'disabled'}")
+    print(f"AVX10:         {features['avx10_version'] or 'no'}")
+    permission = amx_permission()
+    print(f"AMX permission: kernel {'yes' if permission['kernel'] else 'no'}, "
+          f"process {'yes' if permission['permitted'] else 'no'}")
+    print("Features:      " + " ".join(interesting))
+
+
+if __name__ == "__main__":
+    main()
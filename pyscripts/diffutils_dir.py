@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Diff two directory trees of compiler output, e.g. the .s files of a
+baseline and a patched compiler, like scripts/diffutils_dir_ext.sh but
+recursive, in parallel and with a ranked summary.
+
+python diffutils_dir.py base/ patched/ --ext s --filter asm -o diff_output.txt
+python diffutils_dir.py base/ patched/ --ext ll,mir --filter comments,blank --json summary.json -j 32
+
+Files are paired by relative path. Pairs of equal size are compared byte
+for byte in the workers and skipped when identical; the rest are
+normalized with the --filter passes (the asm preset does what bin/asm_filt
+does), diffed, and written to the output in path order. The summary ranks
+the files and functions with the most changed lines; functions are asm
+symbol labels, IR `define`s and MIR functions of the compared lines.
+"""
+import argparse
+import bisect
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+from split_printlog import hash_diff, line_opcodes
+
+# name -> regex of lines to drop; "strip-comments" is handled separately
+FILTERS = {
+    # bin/asm_filt's directives, plus debug line info that shifts with any change
+    "directives": r'\s*\.(?:file|text|globl|p2align|type|size|section|loc|ident)\b',
+    "cfi": r'\s*\.cfi',
+    "comments": r'\s*[#;]',
+    "blank": r'\s*$',
+}
+STRIP_COMMENTS = "strip-comments"  # trailing `# ...` annotations on asm lines (kill:, spill, %bb.N)
+PRESETS = {"asm": ("directives", "cfi", "comments", "blank")}
+TRAILING_COMMENT = re.compile(r'\s+#.*$')
+
+ASM_SYMBOL = re.compile(r'([A-Za-z_$?@][\w$.@?]*):')
+IR_FUNCTION = re.compile(r'define [^@\n]*@("[^"]+"|[-\w$.]+)\(')
+MIR_FUNCTION = re.compile(r'(?:name:\s+|# Machine code for function )([^\s:]+)')
+FILE_SCOPE = "[file scope]"
+
+
+def parse_filters(spec):
+    """Filter names (presets expanded) from a comma-separated list."""
+    names = []
+    for name in (n.strip() for n in spec.split(",") if n.strip()):
+        for expanded in PRESETS.get(name, (name,)):
+            if expanded not in FILTERS and expanded != STRIP_COMMENTS:
+                known = ", ".join(list(FILTERS) + [STRIP_COMMENTS] + list(PRESETS))
+                raise ValueError(f"unknown filter '{name}' (known: {known})")
+            if expanded not in names:
+                names.append(expanded)
+    return names
+
+
+def make_normalizer(filters, ignore_regexes=()):
+    """A function from a list of lines to the lines the diff should see."""
+    patterns = [FILTERS[name] for name in filters if name in FILTERS] + list(ignore_regexes)
+    drop = re.compile("|".join(f"(?:{p})" for p in patterns)).match if patterns else None
+    strip = STRIP_COMMENTS in filters
+
+    def normalize(lines):
+        if strip:
+            # Only outside strings: a quote means a directive with a literal, left as is
+            lines = [TRAILING_COMMENT.sub("", l[:-1]) + "\n" if "#" in l and '"' not in l else l for l in lines]
+        if drop:
+            lines = [l for l in lines if not drop(l)]
+        return lines
+    return normalize
+
+
+def walk(root, exts):
+    """{relative path: size} of the files under root with one of exts (all files if empty)."""
+    files = {}
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file() and (not exts or entry.name.endswith(exts)):
+                    files[os.path.relpath(entry.path, root)] = entry.stat().st_size
+    return files
+
+
+def function_starts(lines, path):
+    """(line indexes, names) of the functions in lines, in order."""
+    if path.endswith(".ll"):
+        pattern = IR_FUNCTION
+    elif path.endswith(".mir"):
+        pattern = MIR_FUNCTION
+    else:
+        pattern = ASM_SYMBOL  # .L* local labels don't match
+    indexes, names = [], []
+    for i, line in enumerate(lines):
+        m = pattern.match(line)
+        if m:
+            indexes.append(i)
+            names.append(m.group(1).strip('"'))
+    return indexes, names
+
+
+def function_at(starts, index):
+    indexes, names = starts
+    i = bisect.bisect_right(indexes, index) - 1
+    return names[i] if i >= 0 else FILE_SCOPE
+
+
+def read_lines(path):
+    with open(path, "r", errors="surrogateescape") as f:
+        lines = f.readlines()
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    return lines
+
+
+# Set in each pool worker by init_worker
+_config = None
+
+
+def init_worker(config):
+    global _config
+    _config = config
+
+
+def compare(rel):
+    """
+    (rel, status, diff text, added, removed, {function: changed lines}) for
+    one pair; status is "identical", "normalized" (equal after the filters)
+    or "different".
+    """
+    dir_a, dir_b, normalize, context = _config
+    path_a, path_b = os.path.join(dir_a, rel), os.path.join(dir_b, rel)
+    if os.path.getsize(path_a) == os.path.getsize(path_b):
+        with open(path_a, "rb") as fa, open(path_b, "rb") as fb:
+            if fa.read() == fb.read():
+                return rel, "identical", "", 0, 0, {}
+    old = normalize(read_lines(path_a))
+    new = normalize(read_lines(path_b))
+    if old == new:
+        return rel, "normalized", "", 0, 0, {}
+    ops = line_opcodes(old, new)
+    text, added, removed = hash_diff(old, new, path_a, path_b, context, ops=ops)
+    old_starts, new_starts = function_starts(old, rel), function_starts(new, rel)
+    functions = defaultdict(int)
+    for tag, a1, a2, b1, b2 in ops:
+        if tag == "equal":
+            continue
+        for i in range(a1, a2):
+            functions[function_at(old_starts, i)] += 1
+        for j in range(b1, b2):
+            functions[function_at(new_starts, j)] += 1
+    return rel, "different", text, added, removed, dict(functions)
+
+
+def print_summary(summary, top):
+    counts = summary["counts"]
+    print(f"\nPairs: {counts['pairs']}, identical: {counts['identical']}, "
+          f"equal after filters: {counts['normalized']}, different: {counts['different']}; "
+          f"only in A: {counts['only_a']}, only in B: {counts['only_b']} ({summary['seconds']:.2f}s)")
+    files = summary["files"][:top]
+    if files:
+        width = max(len("File"), *(len(f["file"]) for f in files))
+        print(f"\n{'File':<{width}} {'Added':>8} {'Removed':>8}")
+        for f in files:
+            print(f"{f['file']:<{width}} {f['added']:>8} {f['removed']:>8}")
+    functions = summary["functions"][:top]
+    if functions:
+        names = [f"{f['file']}:{f['function']}" for f in functions]
+        width = max(len("Function"), *(len(n) for n in names))
+        print(f"\n{'Function':<{width}} {'Changed':>8}")
+        for name, f in zip(names, functions):
+            print(f"{name:<{width}} {f['changed']:>8}")
+
+
+def diff_dirs(dir_a, dir_b, output, exts=(), filters=(), ignore_regexes=(), jobs=None, context=3):
+    """Write the diffs of dir_a vs dir_b to output; returns the summary dict."""
+    start = time.perf_counter()
+    files_a, files_b = walk(dir_a, exts), walk(dir_b, exts)
+    pairs = sorted(files_a.keys() & files_b.keys())
+    only_a = sorted(files_a.keys() - files_b.keys())
+    only_b = sorted(files_b.keys() - files_a.keys())
+    counts = {"pairs": len(pairs), "identical": 0, "normalized": 0, "different": 0,
+              "only_a": len(only_a), "only_b": len(only_b)}
+    changed_files = []
+    changed_functions = []
+
+    config = (dir_a, dir_b, make_normalizer(filters, ignore_regexes), context)
+    jobs = jobs or os.cpu_count() or 1
+    with open(output, "w", errors="surrogateescape") as out:
+        if jobs == 1 or len(pairs) < 2:
+            init_worker(config)
+            results = map(compare, pairs)
+            pool = None
+        else:
+            from multiprocessing import Pool
+            pool = Pool(processes=jobs, initializer=init_worker, initargs=(config,))
+            results = pool.imap(compare, pairs, chunksize=max(1, min(64, len(pairs) // (jobs * 8))))
+        try:
+            for rel, status, text, added, removed, functions in results:
+                counts[status] += 1
+                if status != "different":
+                    continue
+                out.write(f"Comparing {rel}:\n")
+                out.write(text)
+                out.write("----------------------------------------\n")
+                changed_files.append({"file": rel, "added": added, "removed": removed})
+                changed_functions.extend({"file": rel, "function": name, "changed": n}
+                                         for name, n in functions.items())
+        finally:
+            if pool is not None:
+                pool.terminate()
+        for rel in only_a:
+            out.write(f"File {rel} does not exist in {dir_b}.\n")
+        for rel in only_b:
+            out.write(f"File {rel} does not exist in {dir_a}.\n")
+
+    changed_files.sort(key=lambda f: (-(f["added"] + f["removed"]), f["file"]))
+    changed_functions.sort(key=lambda f: (-f["changed"], f["file"], f["function"]))
+    return {"dir_a": dir_a, "dir_b": dir_b, "filters": list(filters), "counts": counts,
+            "seconds": round(time.perf_counter() - start, 3), "files": changed_files,
+            "functions": changed_functions, "only_a": only_a, "only_b": only_b}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two directory trees of compiler output in parallel.")
+    parser.add_argument("dir_a", help="Baseline directory")
+    parser.add_argument("dir_b", help="Directory to compare against it")
+    parser.add_argument("--ext", default="",
+                        help="Comma-separated extensions to compare, e.g. s,ll (default: all files)")
+    parser.add_argument("--filter", default="",
+                        help="Comma-separated normalization filters applied before diffing: "
+                             f"{', '.join(list(FILTERS) + [STRIP_COMMENTS])}, or the preset asm "
+                             f"({','.join(PRESETS['asm'])}, like bin/asm_filt)")
+    parser.add_argument("--ignore-regex", action="append", default=[], metavar="REGEX",
+                        help="Also drop lines matching REGEX before diffing (can be repeated)")
+    parser.add_argument("-o", "--output", default="diff_output.txt",
+                        help="Diff output file (default: diff_output.txt)")
+    parser.add_argument("-U", "--context", type=int, default=3, help="Lines of context (default: 3)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--top", type=int, default=20, help="Files and functions to list in the summary "
+                                                             "(default: 20)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the full summary as JSON")
+    args = parser.parse_args()
+
+    for d in (args.dir_a, args.dir_b):
+        if not os.path.isdir(d):
+            print(f"Error: {d} is not a directory")
+            sys.exit(1)
+    exts = tuple("." + e.strip().lstrip(".") for e in args.ext.split(",") if e.strip())
+    try:
+        filters = parse_filters(args.filter)
+        for regex in args.ignore_regex:
+            re.compile(regex)
+    except (ValueError, re.error) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    summary = diff_dirs(args.dir_a, args.dir_b, args.output, exts, filters, args.ignore_regex, args.jobs,
+                        args.context)
+    print_summary(summary, args.top)
+    print(f"\nDiffs written to {args.output}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=1)
+        print(f"Summary written to {args.json}")
+    sys.exit(1 if summary["counts"]["different"] or summary["only_a"] or summary["only_b"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Shared helpers for the pyscripts tools.
+
+Submodules are imported on first use (groot.colors, groot.cache, ...), so
+`import groot` costs nothing a tool doesn't need:
+
+    from groot.colors import Colors
+    import groot; groot.cache.cache_path("cabbie-index.json")
+
+groot.daemon keeps a preloaded server on a Unix socket that bin/ wrappers
+reach through groot.client (see bin/grootd).
+"""
+SUBMODULES = ("cache", "client", "colors", "daemon", "process", "profile")
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        # importing a submodule binds it as an attribute of the package
+        __import__(f"{__name__}.{name}")
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(SUBMODULES))
@@ -0,0 +1,40 @@
+"""Per-user cache files under $XDG_CACHE_HOME/groot, written atomically."""
+import json
+import os
+import tempfile
+
+
+def cache_dir():
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "groot")
+
+
+def cache_path(name):
+    return os.path.join(cache_dir(), name)
+
+
+def load_json(path, version):
+    """The "data" of a file written by write_json with the same version, else None."""
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+        if cached.get("version") == version:
+            return cached["data"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return None
+
+
+def write_json(path, version, data, **kwargs):
+    """Write {"version", "data"} to a temp file next to path and os.replace() it."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": version, "data": data}, f, **kwargs)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
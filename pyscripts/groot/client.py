@@ -0,0 +1,186 @@
+"""
+Thin client for the groot daemon: run a pyscripts tool in a process forked
+from the preloaded daemon, with this process's stdin/stdout/stderr, cwd and
+environment. Without a daemon (or when it is restarting after a source
+change) the tool runs in this process instead.
+
+    python3 -S $GROOT/pyscripts/groot/client.py cabbie -p VERIFY test.c
+
+Only C modules are imported on the daemon path (_socket, _signal), so the
+client starts in about the time of a bare interpreter; run it with -S,
+site is loaded when the tool runs locally.
+"""
+import os
+import sys
+
+import _signal
+import _socket
+
+PROTOCOL = "groot1"
+S_IFMT, S_IFDIR, S_IFSOCK = 0o170000, 0o040000, 0o140000
+FORWARDED_SIGNALS = ("SIGINT", "SIGTERM", "SIGHUP", "SIGQUIT", "SIGCONT")
+
+
+def pyscripts_dir():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def socket_path():
+    runtime = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(runtime, f"groot-{os.getuid()}", "daemon.sock")
+
+
+def private(path, kind):
+    """
+    Whether path (lstat, so not a symlink) is a kind (S_IFDIR/S_IFSOCK)
+    owned by this user with mode 0700: /tmp is shared, and another user
+    could create the directory or socket first to receive our fds.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return st.st_mode & S_IFMT == kind and st.st_uid == os.getuid() and st.st_mode & 0o777 == 0o700
+
+
+def encode(fields):
+    payload = "\0".join(fields).encode("utf-8", "surrogateescape")
+    return len(payload).to_bytes(8, "little") + payload
+
+
+def connect(path=None):
+    """A connection to the daemon, or None if none is running or its socket isn't ours."""
+    path = path or socket_path()
+    if not (private(os.path.dirname(path), S_IFDIR) and private(path, S_IFSOCK)):
+        return None
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def request(sock, fields, fds=()):
+    """Send one request; the fds travel with the first chunk (SCM_RIGHTS)."""
+    data = encode(fields)
+    ancillary = []
+    if fds:
+        ancillary = [(_socket.SOL_SOCKET, _socket.SCM_RIGHTS,
+                      b"".join(fd.to_bytes(4, sys.byteorder, signed=True) for fd in fds))]
+    sent = sock.sendmsg([data], ancillary)
+    if sent < len(data):
+        sock.sendall(data[sent:])
+
+
+def replies(sock):
+    """Reply lines from the daemon until it closes the connection."""
+    buf = b""
+    while True:
+        chunk = sock.recv(4096)
+        if not chunk:
+            return
+        buf += chunk
+        while b"\n" in buf:
+            line, buf = buf.split(b"\n", 1)
+            yield line.decode("utf-8", "replace")
+
+
+def signal_group(pgid, signum):
+    try:
+        os.killpg(pgid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def forward_signals(pgid):
+    """
+    The tool runs in its own process group in the daemon's session, out of
+    reach of the terminal: pass terminal signals on to the whole group (the
+    tool, its pool workers and their commands), as a Ctrl-C would.
+    """
+    for name in FORWARDED_SIGNALS:
+        _signal.signal(getattr(_signal, name), lambda signum, frame: signal_group(pgid, signum))
+
+    def suspend(signum, frame):
+        # Ctrl-Z: stop the group, then ourselves so the shell sees a stopped job;
+        # the shell's SIGCONT is forwarded when we are resumed
+        signal_group(pgid, _signal.SIGTSTP)
+        _signal.signal(_signal.SIGTSTP, _signal.SIG_DFL)
+        os.kill(os.getpid(), _signal.SIGTSTP)
+        _signal.signal(_signal.SIGTSTP, suspend)
+    _signal.signal(_signal.SIGTSTP, suspend)
+
+
+def run(tool, argv):
+    """Exit code of the tool run by the daemon, or None if it has to run locally."""
+    sock = connect()
+    if sock is None:
+        return None
+    pid = None
+    try:
+        env = [f"{k}={v}" for k, v in os.environ.items()]
+        request(sock, [PROTOCOL, "run", tool, os.getcwd(), str(len(argv))] + argv + env, (0, 1, 2))
+        for line in replies(sock):
+            kind, _, value = line.partition(" ")
+            if kind == "pid":
+                pid = int(value)
+                forward_signals(pid)
+            elif kind == "exit":
+                return int(value)
+            elif kind == "restart":
+                return None
+            elif kind == "error":
+                os.write(2, f"groot daemon: {value}\n".encode())
+                return 2
+        # connection dropped without a status: the tool was killed, take its workers along
+        if pid is not None:
+            signal_group(pid, _signal.SIGKILL)
+        return 128 + 9
+    finally:
+        sock.close()
+
+
+def run_tool(tool, argv):
+    """
+    Run pyscripts/<tool>.py as __main__ in this process, like `python3
+    tool.py argv...` but from its cached bytecode.
+    """
+    import _frozen_importlib_external  # already loaded by the interpreter
+    path = os.path.join(pyscripts_dir(), f"{tool}.py")
+    loader = _frozen_importlib_external.SourceFileLoader("__main__", path)
+    code = loader.get_code("__main__")
+    main_module = type(sys)("__main__")
+    main_module.__file__ = path
+    main_module.__loader__ = loader
+    main_module.__builtins__ = __builtins__
+    sys.modules["__main__"] = main_module
+    sys.argv = [path] + argv
+    exec(code, main_module.__dict__)
+
+
+def run_local(tool, argv):
+    """Run the tool without the daemon."""
+    sys.path[0] = pyscripts_dir()
+    if sys.flags.no_site:
+        import site
+        site.main()
+    run_tool(tool, argv)
+
+
+def main():
+    if len(sys.argv) < 2:
+        os.write(2, b"usage: client.py TOOL [ARGS...]\n")
+        sys.exit(2)
+    tool, argv = sys.argv[1], sys.argv[2:]
+    if not os.environ.get("GROOT_NO_DAEMON"):
+        code = run(tool, argv)
+        if code is not None:
+            sys.stdout.flush()
+            os._exit(code)
+    run_local(tool, argv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Long-lived server that keeps the pyscripts tools and their imports loaded
+and forks a child per request, so a tool starts without interpreter
+startup or import time. Requests come from groot.client over a Unix socket
+in $XDG_RUNTIME_DIR/groot-<uid>/ (or /tmp), with the client's stdio fds.
+
+    bin/grootd start          # preload DEFAULT_PRELOAD and serve in the background
+    bin/grootd status
+    bin/grootd stop
+
+The daemon re-executes itself when a preloaded source file changes (the
+request then runs in the client), and exits after --idle-timeout seconds
+without requests.
+"""
+import argparse
+import atexit
+import importlib
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+from groot.client import (PROTOCOL, S_IFDIR, connect, private, pyscripts_dir, replies, request, run_tool,
+                          socket_path)
+
+DEFAULT_PRELOAD = ("cabbie", "parallel_exec", "split_printlog", "stringutils_rm_prefix", "opt_bisect",
+                   "cpufeatures", "merge_json")
+# heavy stdlib modules the tools import lazily
+PRELOAD_STDLIB = ("argparse", "concurrent.futures.process", "concurrent.futures.thread", "multiprocessing.pool",
+                  "difflib", "csv", "json", "tempfile", "subprocess")
+TOOL_NAME = re.compile(r'^[A-Za-z_]\w*$')
+
+
+def read_request(conn):
+    """(fields, fds) of one request; fields is None for a bare connect (a liveness probe)."""
+    data, fds, _, _ = socket.recv_fds(conn, 1 << 16, 3)
+    if not data:
+        return None, fds
+    if len(data) < 8:
+        raise ValueError("short request")
+    size = int.from_bytes(data[:8], "little")
+    data = data[8:]
+    while len(data) < size:
+        chunk = conn.recv(min(1 << 20, size - len(data)))
+        if not chunk:
+            raise ValueError("truncated request")
+        data += chunk
+    return data.decode("utf-8", "surrogateescape").split("\0"), fds
+
+
+def source_mtimes():
+    """mtimes of the loaded modules under pyscripts, to notice edits."""
+    root = pyscripts_dir() + os.sep
+    mtimes = {}
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and path.startswith(root):
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+    return mtimes
+
+
+def reopen_stdio():
+    # the daemon's stdio objects were set up for its log file
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(1, "w", buffering=1 if os.isatty(1) else -1, closefd=False)
+    sys.stderr = open(2, "w", buffering=1, closefd=False)
+
+
+def watch_client(conn, finished):
+    """In the child: kill the tool's process group when the client goes away mid-run."""
+    try:
+        while conn.recv(4096):
+            pass
+    except OSError:
+        pass
+    if not finished.is_set():
+        os.killpg(0, signal.SIGKILL)
+
+
+def run_child(conn, listener, fds, tool, cwd, argv, env):
+    """In the forked child: become the client's `python3 tool.py argv...`. Never returns."""
+    code = 1
+    try:
+        listener.close()
+        # a process group of our own, which the client signals as a whole
+        os.setpgid(0, 0)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        reopen_stdio()
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(env)
+        conn.sendall(f"pid {os.getpid()}\n".encode())
+        finished = threading.Event()
+        threading.Thread(target=watch_client, args=(conn, finished), daemon=True).start()
+        try:
+            run_tool(tool, argv)
+            code = 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                code = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+        except KeyboardInterrupt:
+            code = 130
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        atexit._run_exitfuncs()
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except (OSError, ValueError):
+                pass
+        finished.set()
+        conn.sendall(f"exit {code}\n".encode())
+    finally:
+        os._exit(code & 0xFF)
+
+
+def serve(preload, idle_timeout):
+    sys.path.insert(0, pyscripts_dir())
+    for name in PRELOAD_STDLIB + tuple(preload):
+        try:
+            importlib.import_module(name)
+        except Exception as e:  # a tool with missing dependencies is just loaded per request
+            print(f"preload {name}: {e}", flush=True)
+    mtimes = source_mtimes()
+
+    path = socket_path()
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if not private(directory, S_IFDIR):
+        print(f"refusing to serve: {directory} must be a directory owned by uid {os.getuid()} with mode 0700",
+              flush=True)
+        return 1
+    probe = connect(path)
+    if probe is not None:
+        probe.close()
+        print(f"daemon already running on {path}", flush=True)
+        return 1
+    if os.path.lexists(path):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    # clients only connect to a 0700 socket of their own uid
+    os.chmod(path, 0o700)
+    listener.listen(64)
+    listener.settimeout(idle_timeout)
+    # children are never waited for: let the kernel reap them
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    print(f"groot daemon {os.getpid()} on {path}, {len(mtimes)} sources loaded", flush=True)
+
+    while True:
+        try:
+            conn, _ = listener.accept()
+        except socket.timeout:
+            print("idle, exiting", flush=True)
+            break
+        conn.settimeout(None)
+        fds = []
+        try:
+            fields, fds = read_request(conn)
+            if fields is None:
+                continue
+            if fields[0] != PROTOCOL:
+                conn.sendall(b"error protocol mismatch\n")
+                continue
+            command = fields[1]
+            if command == "stop":
+                conn.sendall(b"ok stopping\n")
+                break
+            if command == "status":
+                conn.sendall(f"ok pid {os.getpid()}, {len(mtimes)} sources loaded\n".encode())
+                continue
+            if command != "run":
+                conn.sendall(f"error unknown request {command}\n".encode())
+                continue
+            if any(os.stat(p).st_mtime_ns != t for p, t in mtimes.items() if os.path.exists(p)):
+                conn.sendall(b"restart\n")
+                for fd in fds:
+                    os.close(fd)
+                conn.close()
+                listener.close()
+                os.unlink(path)
+                print("sources changed, restarting", flush=True)
+                os.execv(sys.executable, [sys.executable, "-m", "groot.daemon"] + sys.argv[1:])
+            tool, cwd, argc = fields[2], fields[3], int(fields[4])
+            argv, env = fields[5:5 + argc], fields[5 + argc:]
+            if not TOOL_NAME.match(tool) or not os.path.exists(os.path.join(pyscripts_dir(), f"{tool}.py")):
+                conn.sendall(f"error no tool {tool} in {pyscripts_dir()}\n".encode())
+                continue
+            if len(fds) != 3:
+                conn.sendall(b"error expected stdin, stdout and stderr\n")
+                continue
+            env = dict(item.split("=", 1) for item in env if "=" in item)
+            if os.fork() == 0:
+                run_child(conn, listener, fds, tool, cwd, argv, env)
+        except (OSError, ValueError, IndexError) as e:
+            print(f"bad request: {e}", flush=True)
+        finally:
+            for fd in fds:
+                os.close(fd)
+            conn.close()
+    listener.close()
+    if os.path.exists(path):
+        os.unlink(path)
+    return 0
+
+
+def command(fields):
+    sock = connect()
+    if sock is None:
+        print("groot daemon is not running")
+        return 1
+    try:
+        request(sock, [PROTOCOL] + fields)
+        for line in replies(sock):
+            print(line)
+        return 0
+    finally:
+        sock.close()
+
+
+def start(args):
+    sock = connect()
+    if sock is not None:
+        sock.close()
+        print(f"groot daemon already running on {socket_path()}")
+        return 0
+    log = os.path.join(os.path.dirname(socket_path()), "daemon.log")
+    os.makedirs(os.path.dirname(log), mode=0o700, exist_ok=True)
+    if not private(os.path.dirname(log), S_IFDIR):
+        print(f"{os.path.dirname(log)} is not a 0700 directory owned by uid {os.getuid()}, not starting")
+        return 1
+    with open(log, "a") as out:
+        subprocess.Popen([sys.executable, "-m", "groot.daemon", "serve", "--preload", ",".join(args.preload),
+                          "--idle-timeout", str(args.idle_timeout)],
+                         cwd=pyscripts_dir(), stdin=subprocess.DEVNULL, stdout=out, stderr=subprocess.STDOUT,
+                         start_new_session=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        sock = connect()
+        if sock is not None:
+            sock.close()
+            print(f"groot daemon running on {socket_path()} (log: {log})")
+            return 0
+        time.sleep(0.05)
+    print(f"groot daemon did not start, see {log}")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preloaded server for the pyscripts tools.")
+    parser.add_argument("action", choices=("start", "stop", "status", "serve"),
+                        help="serve runs in the foreground")
+    parser.add_argument("--preload", type=lambda s: [t for t in s.split(",") if t], default=list(DEFAULT_PRELOAD),
+                        help=f"Comma-separated tools to import up front (default: {','.join(DEFAULT_PRELOAD)})")
+    parser.add_argument("--idle-timeout", type=float, default=3600,
+                        help="Exit after this many seconds without requests (default: 3600)")
+    args = parser.parse_args()
+    if args.action == "serve":
+        sys.exit(serve(args.preload, args.idle_timeout))
+    if args.action == "start":
+        sys.exit(start(args))
+    sys.exit(command([args.action]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""Child process helpers shared by the tools that run probes in their own sessions."""
+import os
+import signal
+
+
+def kill_probe(proc):
+    """SIGKILL a Popen started with start_new_session=True, with everything it spawned."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
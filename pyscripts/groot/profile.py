@@ -0,0 +1,194 @@
+"""
+Opt-in profiling shared by the tools: per-phase timers, Chrome trace events
+with a lane per worker, and cProfile/tracemalloc on demand.
+
+    groot.profile.add_arguments(parser)
+    args = parser.parse_args()
+    profiler = groot.profile.from_args(args)
+    with profiler.phase("load_commands"):
+        ...
+    result, span = pool_result                 # from groot.profile.timed(fn, arg)
+    profiler.span("cmd #3", *span)
+    profiler.finish()
+
+--profile PREFIX prints the phase table to stderr and writes
+PREFIX.trace.json (chrome://tracing, https://ui.perfetto.dev); with
+--profile-with cprofile,tracemalloc also PREFIX.pstats and the top
+allocation sites of the main process. Without --profile the profiler is
+disabled and phase() is a shared no-op.
+
+Times are time.perf_counter() values, which on Linux is CLOCK_MONOTONIC and
+so comparable between the main process and forked pool workers.
+"""
+import os
+import sys
+import time
+
+TOOLS = ("cprofile", "tracemalloc")
+
+
+def add_arguments(parser):
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", metavar="PREFIX",
+                       help="Print per-phase times and write PREFIX.trace.json (Chrome trace events, one lane "
+                            "per worker)")
+    group.add_argument("--profile-with", metavar="LIST", default="",
+                       help=f"With --profile, also run {' and/or '.join(TOOLS)} in the main process "
+                            "(PREFIX.pstats, top allocation sites); comma-separated")
+
+
+def from_args(args):
+    if not args.profile:
+        return Profiler()
+    tools = [t.strip() for t in args.profile_with.split(",") if t.strip()]
+    unknown = [t for t in tools if t not in TOOLS]
+    if unknown:
+        raise SystemExit(f"Error: unknown --profile-with {','.join(unknown)} (known: {','.join(TOOLS)})")
+    return Profiler(args.profile, tools)
+
+
+def timed(fn, arg):
+    """fn(arg) and its (start, end, lane), for work items run in pool workers."""
+    start = time.perf_counter()
+    result = fn(arg)
+    return result, (start, time.perf_counter(), f"worker {os.getpid()}")
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.profiler.add(self.name, end - self.start)
+        self.profiler.span(self.name, self.start, end)
+        return False
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_PHASE = _NoPhase()
+
+
+class Profiler:
+    """
+    Phase totals ({name: [calls, seconds]}) and trace spans (name, start,
+    end, lane, args). A worker can collect into Profiler(enabled=True) and
+    return it for merge() into the main one.
+    """
+
+    def __init__(self, prefix=None, tools=(), enabled=None, lane="main"):
+        self.prefix = prefix
+        self.enabled = prefix is not None if enabled is None else enabled
+        self.lane = lane
+        self.phases = {}
+        self.events = []
+        self.origin = time.perf_counter()
+        self.cprofile = None
+        self.tracemalloc = "tracemalloc" in tools
+        if "cprofile" in tools:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        if self.tracemalloc:
+            import tracemalloc
+            tracemalloc.start(10)
+
+    def __getstate__(self):
+        # workers send back what they collected, not their cProfile handle
+        return dict(self.__dict__, cprofile=None, tracemalloc=False)
+
+    def phase(self, name):
+        """Context manager timing a phase of the run on this profiler's lane."""
+        if not self.enabled:
+            return NO_PHASE
+        return _Phase(self, name)
+
+    def add(self, name, seconds, calls=1):
+        """Add time measured elsewhere (e.g. summed over a loop) to a phase."""
+        if self.enabled:
+            entry = self.phases.setdefault(name, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+
+    def span(self, name, start, end, lane=None, args=None):
+        """A trace event from start to end (perf_counter values)."""
+        if self.enabled:
+            self.events.append((name, start, end, lane or self.lane, args))
+
+    def merge(self, other):
+        for name, (calls, seconds) in other.phases.items():
+            self.add(name, seconds, calls)
+        if self.enabled:
+            self.events.extend(other.events)
+
+    def trace(self):
+        """The spans as a Chrome trace-event document."""
+        pid = os.getpid()
+        lanes = {self.lane: 0}
+        events = []
+        for name, start, end, lane, args in self.events:
+            tid = lanes.setdefault(lane, len(lanes))
+            event = {"name": name, "ph": "X", "pid": pid, "tid": tid,
+                     "ts": round((start - self.origin) * 1e6, 3), "dur": round((end - start) * 1e6, 3)}
+            if args:
+                event["args"] = args
+            events.append(event)
+        for lane, tid in lanes.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": lane}})
+            events.append({"name": "thread_sort_index", "ph": "M", "pid": pid, "tid": tid,
+                           "args": {"sort_index": tid}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def finish(self, out=None):
+        """Stop the profilers, print the report and write the PREFIX.* files."""
+        if not self.enabled or self.prefix is None:
+            return
+        out = out or sys.stderr
+        total = time.perf_counter() - self.origin
+        # stop both before reporting, so the report itself isn't measured
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if self.tracemalloc:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        if self.cprofile is not None:
+            import pstats
+            self.cprofile.dump_stats(f"{self.prefix}.pstats")
+            print(f"\ncProfile, top functions by cumulative time ({self.prefix}.pstats):", file=out)
+            pstats.Stats(self.cprofile, stream=out).sort_stats("cumulative").print_stats(20)
+        if self.tracemalloc:
+            print(f"\ntracemalloc: {current / (1 << 20):.1f} MB live, {peak / (1 << 20):.1f} MB peak; "
+                  f"top allocation sites:", file=out)
+            for stat in snapshot.statistics("lineno")[:15]:
+                print(f"  {stat}", file=out)
+
+        width = max([len("Phase")] + [len(name) for name in self.phases])
+        print(f"\n{'Phase':<{width}} {'Calls':>8} {'Seconds':>9} {'%':>6}", file=out)
+        for name, (calls, seconds) in sorted(self.phases.items(), key=lambda kv: kv[1][1], reverse=True):
+            share = 100 * seconds / total if total > 0 else 0.0
+            print(f"{name:<{width}} {calls:>8} {seconds:>9.3f} {share:>6.1f}", file=out)
+        print(f"{'wall':<{width}} {'':>8} {total:>9.3f}", file=out)
+
+        import json
+        path = f"{self.prefix}.trace.json"
+        with open(path, "w") as f:
+            json.dump(self.trace(), f)
+        print(f"Trace written to {path} ({len(self.events)} spans)", file=out)
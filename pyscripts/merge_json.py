@@ -1,6 +1,16 @@
 import json
 import argparse
+import mmap
+import os
+import sqlite3
 import sys
+from itertools import islice
+from json.encoder import encode_basestring_ascii
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 """
 Config.json
 {
@@ -26,6 +36,18 @@ b.json
 ]
 python merge_json.py a.json b.json config.json final.json
 
+Streaming mode for inputs larger than memory (JSON arrays or JSON Lines,
+.jsonl output is written as JSON Lines):
+python merge_json.py --stream a.jsonl b.json config.json final.jsonl
+
+Repeated merges against the same large baseline keep a key index next to it
+(b.json.idx.sqlite), rebuilt only when b.json changes:
+python merge_json.py --index run1.json b.json config.json final.json
+
+N-way joins with inner/left/outer edges and composite or nested keys
+(config format in parse_multi_config):
+python merge_json.py --multi joins.json final.json
+
 """
 def load_json(file_path):
     try:
@@ -49,8 +71,9 @@ def save_json(data, file_path):
 def parse_config(config):
     try:
         key_mapping = config['key'].split('->')
-        a_key = key_mapping[0].strip()
-        b_key = key_mapping[1].strip()
+        # "a:id -> b:id": drop the side prefix from each key
+        a_key = key_mapping[0].strip().split(':', 1)[-1].strip()
+        b_key = key_mapping[1].strip().split(':', 1)[-1].strip()
 
         a_fields = [field.split(':')[1].strip() for field in config['fields'] if field.startswith('a:')]
         b_fields = [field.split(':')[1].strip() for field in config['fields'] if field.startswith('b:')]
@@ -60,6 +83,26 @@ def parse_config(config):
         print(f"Error: Missing expected key in config: {e}")
         sys.exit(1)
 
+def combine(a_item, b_item, a_fields, b_fields, key_value):
+    merged_item = {}
+
+    # Merge fields from a.json
+    for field in a_fields:
+        if field in a_item:
+            merged_item[field] = a_item[field]
+
+    # Merge fields from b.json with type checking
+    for field in b_fields:
+        if field in b_item:
+            if field in merged_item:
+                # Check if types match
+                if type(merged_item[field]) != type(b_item[field]):
+                    print(f"Warning: Type mismatch for field '{field}' with key '{key_value}'. Skipping this field.")
+                    continue
+            merged_item[field] = b_item[field]
+
+    return merged_item
+
 def merge_json(a_data, b_data, a_key, b_key, a_fields, b_fields):
     try:
         b_dict = {item[b_key]: item for item in b_data}
@@ -68,40 +111,647 @@ def merge_json(a_data, b_data, a_key, b_key, a_fields, b_fields):
         for a_item in a_data:
             a_key_value = a_item[a_key]
             if a_key_value in b_dict:
-                b_item = b_dict[a_key_value]
-                merged_item = {}
-
-                # Merge fields from a.json
-                for field in a_fields:
-                    if field in a_item:
-                        merged_item[field] = a_item[field]
-
-                # Merge fields from b.json with type checking
-                for field in b_fields:
-                    if field in b_item:
-                        if field in merged_item:
-                            # Check if types match
-                            if type(merged_item[field]) != type(b_item[field]):
-                                print(f"Warning: Type mismatch for field '{field}' with key '{a_key_value}'. Skipping this field.")
-                                continue
-                        merged_item[field] = b_item[field]
-
-                final_data.append(merged_item)
+                final_data.append(combine(a_item, b_dict[a_key_value], a_fields, b_fields, a_key_value))
 
         return final_data
     except KeyError as e:
         print(f"Error: Missing expected key in data: {e}")
         sys.exit(1)
 
+def iter_json_array(file, chunk_size=1 << 20):
+    # Decode the elements of a top-level array one at a time, yielding
+    # (start, end, item) with offsets counted in characters of *file*
+    decoder = json.JSONDecoder()
+    buf = file.read(chunk_size)
+    base = 0
+    pos = len(buf) - len(buf.lstrip())
+    if not buf.startswith('[', pos):
+        raise ValueError("expected a top-level JSON array")
+    pos += 1
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buf) and buf[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+            # A value that runs to the end of the buffer may continue in the next chunk
+            if end < len(buf) or eof:
+                yield base + pos, base + end, item
+                pos = end
+                continue
+        except json.JSONDecodeError:
+            if eof:
+                raise
+        chunk = file.read(chunk_size)
+        if not chunk:
+            if eof or pos >= len(buf):
+                raise ValueError("unterminated JSON array")
+            eof = True
+        base += pos
+        buf = buf[pos:] + chunk
+        pos = 0
+
+def is_json_array(file_path):
+    if file_path.endswith(('.jsonl', '.ndjson')):
+        return False
+    with open(file_path, 'rb') as file:
+        head = file.read(4096).lstrip()
+    return head.startswith(b'[')
+
+def iter_record_spans(file_path):
+    """
+    Yield (offset, length, record) for every record, with byte offsets so
+    a record can later be re-read on its own.
+    """
+    if is_json_array(file_path):
+        # latin-1 maps bytes 1:1 to characters, so character offsets are byte
+        # offsets; UTF-8 multibyte sequences never look like JSON syntax
+        with open(file_path, 'r', encoding='latin-1') as file:
+            for start, end, item in iter_json_array(file):
+                yield start, end - start, item
+        return
+    with open(file_path, 'rb') as file:
+        offset = 0
+        for line in file:
+            if line.strip():
+                yield offset, len(line), json.loads(line)
+            offset += len(line)
+
+def iter_records(file_path):
+    """Yield records from a JSON array or JSON Lines file without loading it whole."""
+    try:
+        array = is_json_array(file_path)
+        with open(file_path, 'r') as file:
+            if array:
+                for _, _, item in iter_json_array(file):
+                    yield item
+                return
+            for line_no, line in enumerate(file, 1):
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        print(f"Error: Invalid JSON on line {line_no} of '{file_path}'.")
+                        sys.exit(1)
+    except FileNotFoundError:
+        print(f"Error: The file '{file_path}' was not found.")
+        sys.exit(1)
+    except (ValueError, json.JSONDecodeError) as e:
+        print(f"Error: The file '{file_path}' is not a valid JSON file. {e}")
+        sys.exit(1)
+
+def project(item, fields):
+    return {field: item[field] for field in fields if field in item}
+
+def merge_streams(a_path, b_path, a_key, b_key, a_fields, b_fields):
+    """
+    Stream merged records with merge_json's semantics (last b record wins,
+    output in a order). Only the smaller input is held in memory: either
+    b's projected records by key, or a's projected records plus the last
+    b record of each of their keys.
+    """
+    try:
+        if os.path.getsize(b_path) <= os.path.getsize(a_path):
+            b_index = {}
+            for item in iter_records(b_path):
+                b_index[item[b_key]] = project(item, b_fields)
+            for a_item in iter_records(a_path):
+                a_key_value = a_item[a_key]
+                if a_key_value in b_index:
+                    yield combine(project(a_item, a_fields), b_index[a_key_value], a_fields, b_fields, a_key_value)
+        else:
+            a_rows = [(item[a_key], project(item, a_fields)) for item in iter_records(a_path)]
+            b_index = dict.fromkeys(key for key, _ in a_rows)
+            # Reduce b to its last record per key, for the keys a has
+            for b_item in iter_records(b_path):
+                b_key_value = b_item[b_key]
+                if b_key_value in b_index:
+                    b_index[b_key_value] = project(b_item, b_fields)
+            for a_key_value, a_item in a_rows:
+                b_item = b_index[a_key_value]
+                if b_item is not None:
+                    yield combine(a_item, b_item, a_fields, b_fields, a_key_value)
+    except KeyError as e:
+        print(f"Error: Missing expected key in data: {e}")
+        sys.exit(1)
+
+def save_json_stream(records, file_path):
+    # Same layout as save_json (json.dump(indent=4)), or JSON Lines for .jsonl/.ndjson
+    json_lines = file_path.endswith(('.jsonl', '.ndjson'))
+    try:
+        with open(file_path, 'w') as file:
+            count = 0
+            for record in records:
+                if json_lines:
+                    file.write(json.dumps(record) + '\n')
+                else:
+                    file.write('[\n    ' if count == 0 else ',\n    ')
+                    file.write(json.dumps(record, indent=4).replace('\n', '\n    '))
+                count += 1
+            if not json_lines:
+                file.write('\n]' if count else '[]')
+            return count
+    except IOError as e:
+        print(f"Error: Could not write to file '{file_path}'. {e}")
+        sys.exit(1)
+
+INDEX_BATCH = 500
+
+INDEX_FORMAT = '2'
+
+def key_text(value):
+    """
+    Index text of a join key, equal for keys merge_json's dict treats as
+    the same: True, 1 and 1.0 all give "1".
+    """
+    if isinstance(value, bool):
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return json.dumps(value, sort_keys=True)
+
+def open_disk_index(source_path, key, index_path=None):
+    """
+    Open (building it if needed) a SQLite index of source_path mapping the
+    JSON-encoded join key to the byte span of its record. The index is
+    rebuilt when the source's size or mtime, or the key, changes.
+    """
+    index_path = index_path or f"{source_path}.idx.sqlite"
+    try:
+        stat = os.stat(source_path)
+    except FileNotFoundError:
+        print(f"Error: The file '{source_path}' was not found.")
+        sys.exit(1)
+    stamp = {'source': os.path.abspath(source_path), 'size': str(stat.st_size),
+             'mtime_ns': str(stat.st_mtime_ns), 'key': key, 'format': INDEX_FORMAT}
+
+    db = sqlite3.connect(index_path)
+    db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+    if dict(db.execute("SELECT name, value FROM meta")) == stamp:
+        return db
+
+    print(f"Building index {index_path} for '{source_path}'...")
+    db.execute("DROP TABLE IF EXISTS idx")
+    db.execute("CREATE TABLE idx (key TEXT PRIMARY KEY, offset INTEGER, length INTEGER)")
+    with open(source_path, 'rb') as raw:
+        rows = []
+        try:
+            for offset, length, item in iter_record_spans(source_path):
+                value = item[key]
+                if isinstance(value, str) and not value.isascii():
+                    # Spans of JSON arrays are decoded as latin-1; re-read non-ASCII keys as UTF-8
+                    raw.seek(offset)
+                    value = json.loads(raw.read(length))[key]
+                rows.append((key_text(value), offset, length))
+                if len(rows) >= 10000:
+                    # Last record wins for duplicate keys, like merge_json
+                    db.executemany("INSERT OR REPLACE INTO idx VALUES (?, ?, ?)", rows)
+                    rows = []
+        except KeyError as e:
+            print(f"Error: Missing expected key in data: {e}")
+            sys.exit(1)
+        except (ValueError, json.JSONDecodeError) as e:
+            print(f"Error: The file '{source_path}' is not a valid JSON file. {e}")
+            sys.exit(1)
+        db.executemany("INSERT OR REPLACE INTO idx VALUES (?, ?, ?)", rows)
+    db.execute("DELETE FROM meta")
+    db.executemany("INSERT INTO meta VALUES (?, ?)", stamp.items())
+    db.commit()
+    return db
+
+def merge_indexed(a_path, b_path, a_key, b_key, a_fields, b_fields, index_path=None):
+    """
+    Stream a.json against the on-disk index of b.json, reading only the
+    matched b records through a memory map. Output matches merge_json.
+    """
+    db = open_disk_index(b_path, b_key, index_path)
+    with open(b_path, 'rb') as raw:
+        size = os.path.getsize(b_path)
+        b_map = mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        try:
+            records = iter_records(a_path)
+            while True:
+                batch = list(islice(records, INDEX_BATCH))
+                if not batch:
+                    break
+                try:
+                    keys = [key_text(a_item[a_key]) for a_item in batch]
+                except KeyError as e:
+                    print(f"Error: Missing expected key in data: {e}")
+                    sys.exit(1)
+                unique = list(set(keys))
+                spans = dict(db.execute(
+                    f"SELECT key, offset || ',' || length FROM idx WHERE key IN ({','.join('?' * len(unique))})",
+                    unique))
+                found = {}
+                for k, span in spans.items():
+                    offset, length = map(int, span.split(','))
+                    found[k] = project(json.loads(b_map[offset:offset + length]), b_fields)
+                for a_item, k in zip(batch, keys):
+                    if k in found:
+                        yield combine(project(a_item, a_fields), found[k], a_fields, b_fields, a_item[a_key])
+        finally:
+            if size:
+                b_map.close()
+            db.close()
+
+def load_columns(file_path, fields):
+    # One list per field, MISSING where a record lacks it
+    records = load_json(file_path) if is_json_array(file_path) else list(iter_records(file_path))
+    return len(records), {field: [r.get(field, MISSING) for r in records] for field in fields}
+
+def column_types(values):
+    return set(map(type, values))
+
+def encode_column(values):
+    """
+    Encode a column the way json.dump(indent=4) writes a value nested in a
+    record of a top-level list, choosing the encoder once per column.
+    """
+    types = column_types(values)
+    has_missing = type(MISSING) in types
+    types.discard(type(MISSING))
+    if types == {str}:
+        encoder = encode_basestring_ascii
+    elif types == {int}:
+        encoder = int.__repr__
+    elif types == {float} and np.isfinite(np.array([v for v in values if v is not MISSING])).all():
+        encoder = float.__repr__
+    else:
+        def encoder(v):
+            return json.dumps(v, indent=4).replace('\n', '\n        ')
+    if not has_missing:
+        return list(map(encoder, values))
+    return [encoder(v) if v is not MISSING else v for v in values]
+
+def join_positions(a_keys, b_keys):
+    """
+    Return (a_rows, b_rows): for every a row with a matching key, the index
+    of the last b row with that key, like the b_dict of merge_json.
+    """
+    # NumPy would coerce mixed keys to one dtype (1 == "1", True == 1): only
+    # columns of all-int or all-str keys on both sides take the array path
+    key_types = column_types(a_keys) | column_types(b_keys)
+    a_arr = b_arr = None
+    if key_types == {int} or key_types == {str}:
+        a_arr = np.asarray(a_keys)
+        b_arr = np.asarray(b_keys)
+    if a_arr is not None and a_arr.dtype.kind == b_arr.dtype.kind and a_arr.dtype.kind in 'iuU':
+        # Sorted unique b keys; searching the reversed array keeps the last duplicate
+        uniq, first_in_reversed = np.unique(b_arr[::-1], return_index=True)
+        last = len(b_arr) - 1 - first_in_reversed
+        if len(uniq) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        pos = np.clip(np.searchsorted(uniq, a_arr), 0, len(uniq) - 1)
+        matched = uniq[pos] == a_arr
+        return np.nonzero(matched)[0], last[pos[matched]]
+    # Mixed or float keys: hash join, same equality rules as the row engine
+    b_last = {k: i for i, k in enumerate(b_keys)}
+    pairs = [(i, b_last[k]) for i, k in enumerate(a_keys) if k in b_last]
+    return (np.array([p[0] for p in pairs], dtype=np.intp),
+            np.array([p[1] for p in pairs], dtype=np.intp))
+
+def merge_columnar(a_path, b_path, a_key, b_key, a_fields, b_fields, output_path, jobs=1):
+    """
+    Columnar version of merge_json + save_json for flat records: the join is
+    done on key arrays with NumPy, type checks run once per column, and the
+    output text is identical to the row engine's. With jobs > 1 the output
+    is rendered in chunks by forked workers.
+    """
+    if np is None:
+        print("Error: the columnar engine needs NumPy (pip install numpy)")
+        sys.exit(1)
+
+    a_count, a_cols = load_columns(a_path, list(dict.fromkeys([a_key] + a_fields)))
+    b_count, b_cols = load_columns(b_path, list(dict.fromkeys([b_key] + b_fields)))
+    for name, cols in ((a_key, a_cols), (b_key, b_cols)):
+        if any(v is MISSING for v in cols[name]):
+            print(f"Error: Missing expected key in data: '{name}'")
+            sys.exit(1)
+
+    a_rows, b_rows = join_positions(a_cols[a_key], b_cols[b_key])
+    n = len(a_rows)
+    a_take = a_rows.tolist()
+    b_take = b_rows.tolist()
+
+    # Output columns in the row engine's key order: a fields, then new b fields
+    out_fields = list(dict.fromkeys(a_fields + b_fields))
+    columns = {}
+    for field in a_fields:
+        col = a_cols[field]
+        columns[field] = [col[i] for i in a_take]
+    for field in b_fields:
+        col = b_cols[field]
+        b_values = [col[i] for i in b_take]
+        if field not in columns:
+            columns[field] = b_values
+            continue
+        a_values = columns[field]
+        # Whole-column type check first; only mixed columns are compared cell by cell
+        a_types = column_types(a_values) - {type(MISSING)}
+        b_types = column_types(b_values) - {type(MISSING)}
+        if len(a_types | b_types) <= 1:
+            columns[field] = [av if bv is MISSING else bv for av, bv in zip(a_values, b_values)]
+            continue
+        merged = []
+        for row, (av, bv) in enumerate(zip(a_values, b_values)):
+            if bv is MISSING:
+                merged.append(av)
+            elif av is not MISSING and type(av) != type(bv):
+                print(f"Warning: Type mismatch for field '{field}' with key '{a_cols[a_key][a_take[row]]}'. Skipping this field.")
+                merged.append(av)
+            else:
+                merged.append(bv)
+        columns[field] = merged
+
+    global _render_state
+    _render_state = (columns, out_fields)
+    chunks = [(lo, min(lo + RENDER_CHUNK, n)) for lo in range(0, n, RENDER_CHUNK)]
+    jobs = min(jobs or 1, len(chunks))
+    try:
+        with open(output_path, 'w') as file:
+            if not n:
+                file.write("[]")
+                return n
+            file.write("[\n    ")
+            if jobs > 1:
+                # Forked workers inherit the columns; only the rendered text comes back
+                from multiprocessing import get_context
+                with get_context('fork').Pool(jobs) as pool:
+                    for i, text in enumerate(pool.imap(render_rows, chunks)):
+                        file.write(",\n    " if i else "")
+                        file.write(text)
+            else:
+                for i, chunk in enumerate(chunks):
+                    file.write(",\n    " if i else "")
+                    file.write(render_rows(chunk))
+            file.write("\n]")
+    except IOError as e:
+        print(f"Error: Could not write to file '{output_path}'. {e}")
+        sys.exit(1)
+    finally:
+        _render_state = None
+    return n
+
+# Rows per render_rows call; (columns, out_fields) of the merge being written
+RENDER_CHUNK = 200000
+_render_state = None
+
+def render_rows(bounds):
+    """
+    The output text of rows lo..hi of the merged columns, without the
+    surrounding brackets. Encoders are chosen per chunk; each one writes a
+    value exactly like json.dumps, so the text doesn't depend on the chunking.
+    """
+    lo, hi = bounds
+    columns, out_fields = _render_state
+    n = hi - lo
+    encoded = [encode_column(columns[field][lo:hi]) for field in out_fields]
+    keys = [encode_basestring_ascii(field) for field in out_fields]
+    rows = np.empty(n, dtype=object)
+    # Group rows by which fields are present and format each group with one template
+    present = np.zeros(n, dtype=np.int64)
+    for bit, col in enumerate(encoded):
+        present |= np.fromiter((v is not MISSING for v in col), dtype=bool, count=n).astype(np.int64) << bit
+    for pattern in np.unique(present).tolist():
+        used = [bit for bit in range(len(out_fields)) if pattern >> bit & 1]
+        where = np.nonzero(present == pattern)[0]
+        if not used:
+            rows[where] = "{}"
+            continue
+        template = "{\n        " + ",\n        ".join(f"{keys[b]}: %s" for b in used) + "\n    }"
+        picked = where.tolist()
+        cols = [[encoded[b][i] for i in picked] for b in used]
+        rows[where] = [template % values for values in zip(*cols)]
+    return ",\n    ".join(rows.tolist())
+
+JOIN_TYPES = ('inner', 'left', 'outer')
+MISSING = object()
+
+def get_path(item, path, default=None):
+    # "meta.bench" -> item["meta"]["bench"]; default when any step is missing
+    for part in path:
+        if not isinstance(item, dict) or part not in item:
+            return default
+        item = item[part]
+    return item
+
+def hashable(value):
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return json.dumps(value, sort_keys=True)
+
+def record_key(item, paths):
+    values = tuple(get_path(item, path) for path in paths)
+    if any(v is None for v in values):
+        return None
+    return tuple(hashable(v) for v in values)
+
+def parse_multi_config(config, input_overrides=None):
+    """
+    Parse an N-way join config:
+
+    {
+        "inputs": {"ct": "compile_time.json", "size": "size.jsonl", "perf": "perf.json"},
+        "joins": [
+            {"left": "ct", "right": "size", "on": ["benchmark", "function"], "type": "left"},
+            {"left": "ct", "right": "perf", "type": "outer",
+             "on": {"ct": ["benchmark", "function"], "perf": ["meta.bench", "meta.func"]}}
+        ],
+        "fields": ["ct:benchmark", "ct:function", "ct:time", "size:text", "perf:counters.cycles as cycles"]
+    }
+
+    Joins must form a tree: one base input that is never a "right" side,
+    every other input joined in exactly once. Returns (inputs, base, joins, fields).
+    """
+    try:
+        inputs = dict(config['inputs'])
+        inputs.update(input_overrides or {})
+
+        joins = []
+        for edge in config['joins']:
+            left, right = edge['left'], edge['right']
+            join_type = edge.get('type', 'inner').lower()
+            if join_type not in JOIN_TYPES:
+                raise ValueError(f"unknown join type '{join_type}' (use {', '.join(JOIN_TYPES)})")
+            on = edge['on']
+            if isinstance(on, str):
+                on = [on]
+            if isinstance(on, dict):
+                left_on, right_on = on[left], on[right]
+            else:
+                left_on = right_on = on
+            left_on = [left_on] if isinstance(left_on, str) else left_on
+            right_on = [right_on] if isinstance(right_on, str) else right_on
+            if len(left_on) != len(right_on):
+                raise ValueError(f"join {left} -> {right} has keys of different arity")
+            joins.append((left, [p.split('.') for p in left_on], right, [p.split('.') for p in right_on], join_type))
+
+        fields = []
+        for field in config['fields']:
+            name, spec = field.split(':', 1)
+            path, _, alias = spec.partition(' as ')
+            path = path.strip().split('.')
+            fields.append((name.strip(), path, alias.strip() or path[-1]))
+    except KeyError as e:
+        print(f"Error: Missing expected key in config: {e}")
+        sys.exit(1)
+    except (ValueError, AttributeError, TypeError) as e:
+        print(f"Error: Invalid join config: {e}")
+        sys.exit(1)
+
+    # Plan: order joins so each left side is already joined, each input indexed once
+    rights = [j[2] for j in joins]
+    bases = [name for name in inputs if name not in rights]
+    unknown = {j[0] for j in joins} | set(rights) | {f[0] for f in fields}
+    unknown -= set(inputs)
+    if unknown:
+        print(f"Error: Join config refers to unknown input(s): {', '.join(sorted(unknown))}")
+        sys.exit(1)
+    if len(bases) != 1 or len(set(rights)) != len(rights):
+        print("Error: Joins must form a tree: one base input, every other input joined exactly once")
+        sys.exit(1)
+    ordered = []
+    available = {bases[0]}
+    pending = list(joins)
+    while pending:
+        ready = [j for j in pending if j[0] in available]
+        if not ready:
+            print("Error: Joins must form a tree: one base input, every other input joined exactly once")
+            sys.exit(1)
+        for j in ready:
+            ordered.append(j)
+            available.add(j[2])
+            pending.remove(j)
+    return inputs, bases[0], ordered, fields
+
+def build_join_index(path, key_paths, keep_paths):
+    # key -> list of (record id, {path: value}) holding only what later steps read
+    index = {}
+    count = 0
+    for item in iter_records(path):
+        key = record_key(item, key_paths)
+        if key is not None:
+            values = {p: get_path(item, p.split('.'), MISSING) for p in keep_paths}
+            index.setdefault(key, []).append((count, {p: v for p, v in values.items() if v is not MISSING}))
+        count += 1
+    return index
+
+def merge_multi(inputs, base, joins, fields):
+    """Stream merged records for an N-way join plan from parse_multi_config."""
+    # Each non-base input keeps its projected fields and the keys it is the left side of
+    keep = {name: set() for name in inputs}
+    for name, path, _ in fields:
+        keep[name].add('.'.join(path))
+    for left, left_on, _, _, _ in joins:
+        keep[left].update('.'.join(p) for p in left_on)
+
+    indexes = [build_join_index(inputs[right], right_on, keep[right])
+               for _, _, right, right_on, _ in joins]
+    matched = [set() for _ in joins]
+
+    def lookup(row, name, path):
+        record = row.get(name)
+        if record is None:
+            return MISSING
+        return record.get('.'.join(path), MISSING) if name != base else get_path(record, path, MISSING)
+
+    def extend(row, step):
+        if step == len(joins):
+            yield row
+            return
+        left, left_on, right, _, join_type = joins[step]
+        values = tuple(lookup(row, left, p) for p in left_on)
+        key = None if any(v is None or v is MISSING for v in values) else tuple(hashable(v) for v in values)
+        hits = indexes[step].get(key, ()) if key is not None else ()
+        for record_id, record in hits:
+            matched[step].add(record_id)
+            yield from extend({**row, right: record}, step + 1)
+        if not hits and join_type != 'inner':
+            yield from extend({**row, right: None}, step + 1)
+
+    def project_row(row):
+        merged_item = {}
+        for name, path, alias in fields:
+            value = lookup(row, name, path)
+            if value is MISSING:
+                continue
+            if alias in merged_item and type(merged_item[alias]) != type(value):
+                print(f"Warning: Type mismatch for field '{alias}'. Skipping this field.")
+                continue
+            merged_item[alias] = value
+        return merged_item
+
+    for item in iter_records(inputs[base]):
+        for row in extend({base: item}, 0):
+            yield project_row(row)
+
+    # Outer joins: right-side records nothing matched, continued through the later joins
+    for step, (_, _, right, _, join_type) in enumerate(joins):
+        if join_type != 'outer':
+            continue
+        for records in indexes[step].values():
+            for record_id, record in records:
+                if record_id not in matched[step]:
+                    for row in extend({right: record}, step + 1):
+                        yield project_row(row)
+
 def main():
     parser = argparse.ArgumentParser(description='Merge two JSON files based on a configuration.')
-    parser.add_argument('a_json', help='Path to the first JSON file (a.json)')
-    parser.add_argument('b_json', help='Path to the second JSON file (b.json)')
-    parser.add_argument('config_json', help='Path to the configuration JSON file')
-    parser.add_argument('output_json', help='Path to the output JSON file (final.json)')
+    parser.add_argument('a_json', nargs='?', help='Path to the first JSON file (a.json)')
+    parser.add_argument('b_json', nargs='?', help='Path to the second JSON file (b.json)')
+    parser.add_argument('config_json', nargs='?', help='Path to the configuration JSON file')
+    parser.add_argument('output_json', nargs='?', help='Path to the output JSON file (final.json)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream inputs (JSON arrays or JSON Lines) and output instead of loading them whole')
+    parser.add_argument('--index', action='store_true',
+                        help='Keep a persistent on-disk key index of b_json and read only matched records; '
+                             'rebuilt when b_json changes')
+    parser.add_argument('--index-path', metavar='PATH',
+                        help='Location of the --index database (default: <b_json>.idx.sqlite)')
+    parser.add_argument('--engine', choices=('row', 'columnar'), default='row',
+                        help='columnar: NumPy join and per-column encoding for flat records (same output)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='With --engine columnar, processes rendering the output (default: all cores)')
+    parser.add_argument('--multi', nargs=2, metavar=('CONFIG', 'OUTPUT'),
+                        help='N-way join of the inputs named in CONFIG (see parse_multi_config), streamed to OUTPUT')
+    parser.add_argument('-i', '--input', action='append', default=[], metavar='NAME=PATH',
+                        help='With --multi, override the path of a named input (can be repeated)')
 
     args = parser.parse_args()
 
+    if args.multi:
+        overrides = dict(spec.split('=', 1) for spec in args.input)
+        inputs, base, joins, fields = parse_multi_config(load_json(args.multi[0]), overrides)
+        save_json_stream(merge_multi(inputs, base, joins, fields), args.multi[1])
+        return
+    if args.output_json is None:
+        parser.error('a_json, b_json, config_json and output_json are required without --multi')
+
+    if args.index:
+        config = load_json(args.config_json)
+        a_key, b_key, a_fields, b_fields = parse_config(config)
+        records = merge_indexed(args.a_json, args.b_json, a_key, b_key, a_fields, b_fields, args.index_path)
+        save_json_stream(records, args.output_json)
+        return
+
+    if args.stream:
+        config = load_json(args.config_json)
+        a_key, b_key, a_fields, b_fields = parse_config(config)
+        records = merge_streams(args.a_json, args.b_json, a_key, b_key, a_fields, b_fields)
+        save_json_stream(records, args.output_json)
+        return
+
+    if args.engine == 'columnar':
+        a_key, b_key, a_fields, b_fields = parse_config(load_json(args.config_json))
+        merge_columnar(args.a_json, args.b_json, a_key, b_key, a_fields, b_fields, args.output_json, args.jobs)
+        return
+
     # Load JSON data
     a_data = load_json(args.a_json)
     b_data = load_json(args.b_json)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark the row and columnar engines of merge_json.py on synthetic flat
+records and check that both write byte-identical output.
+
+python merge_json_bench.py                      # 1M, 10M and 50M rows
+python merge_json_bench.py --rows 100000,1000000 --keep /tmp/mj_bench
+"""
+import argparse
+import filecmp
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import merge_json
+
+
+def write_inputs(rows, workdir, seed=1):
+    # a: every row; b: ~80% of the keys, shuffled, with one overlapping field
+    rng = random.Random(seed)
+    a_path = os.path.join(workdir, "a.json")
+    b_path = os.path.join(workdir, "b.json")
+    with open(a_path, "w") as f:
+        f.write("[")
+        for i in range(rows):
+            f.write("," if i else "")
+            f.write(json.dumps({"id": i, "bench": f"b{i % 977}", "time": rng.random() * 100, "size": i * 3}))
+        f.write("]")
+    b_ids = [i for i in range(rows) if rng.random() < 0.8]
+    rng.shuffle(b_ids)
+    with open(b_path, "w") as f:
+        f.write("[")
+        for n, i in enumerate(b_ids):
+            f.write("," if n else "")
+            f.write(json.dumps({"id": i, "cycles": i * 7, "ipc": round(rng.random() * 4, 3), "size": i * 3}))
+        f.write("]")
+    return a_path, b_path
+
+
+def run_row(a_path, b_path, config, out_path):
+    a_key, b_key, a_fields, b_fields = merge_json.parse_config(config)
+    data = merge_json.merge_json(merge_json.load_json(a_path), merge_json.load_json(b_path),
+                                 a_key, b_key, a_fields, b_fields)
+    merge_json.save_json(data, out_path)
+
+
+def run_columnar(a_path, b_path, config, out_path):
+    a_key, b_key, a_fields, b_fields = merge_json.parse_config(config)
+    merge_json.merge_columnar(a_path, b_path, a_key, b_key, a_fields, b_fields, out_path, os.cpu_count() or 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark merge_json.py row vs columnar engines.")
+    parser.add_argument("--rows", default="1000000,10000000,50000000",
+                        help="Comma-separated row counts (default: 1000000,10000000,50000000)")
+    parser.add_argument("--keep", metavar="DIR", help="Generate inputs in DIR and keep them")
+    args = parser.parse_args()
+
+    if merge_json.np is None:
+        print("Error: NumPy is required for the columnar engine")
+        sys.exit(1)
+
+    config = {"key": "a:id -> b:id", "fields": ["a:bench", "a:time", "a:size", "b:cycles", "b:ipc", "b:size"]}
+    print(f"{'Rows':>12} {'Row (s)':>10} {'Columnar (s)':>13} {'Speedup':>8}  Identical")
+    for rows in [int(r) for r in args.rows.split(",")]:
+        workdir = args.keep or tempfile.mkdtemp(prefix="merge_json_bench_")
+        os.makedirs(workdir, exist_ok=True)
+        try:
+            a_path, b_path = write_inputs(rows, workdir)
+            row_out = os.path.join(workdir, "row.json")
+            col_out = os.path.join(workdir, "columnar.json")
+
+            start = time.perf_counter()
+            run_row(a_path, b_path, config, row_out)
+            row_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            run_columnar(a_path, b_path, config, col_out)
+            col_time = time.perf_counter() - start
+
+            same = filecmp.cmp(row_out, col_out, shallow=False)
+            print(f"{rows:>12} {row_time:>10.2f} {col_time:>13.2f} {row_time / col_time:>7.2f}x  {'yes' if same else 'NO'}")
+        finally:
+            if not args.keep:
+                shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
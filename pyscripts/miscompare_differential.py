@@ -1,35 +1,567 @@
 """
 python script.py --dir_a path\to\A --dir_b path\to\B --workdir path\to\work --app_cmd "bash run_script.sh" --check_expr "exit_code == 0"
+
+Each probe workdir keeps its state, and a probe only swaps the files that
+differ from the previous one (--link copy/symlink/hardlink/reflink; the
+link modes go through a base copy of A and B). Parallel mode tests up to
+-j partitions at once, each in its own workdir:
+python script.py ... -j 64 --split 4
+
+--ddmin finds a minimal set of files that fails together (interactions
+between files) instead of bisecting for files that fail on their own.
+Probe results are cached in <workdir>.probes.jsonl, so a rerun of an
+interrupted search resumes without repeating finished probes.
+
+--functions then narrows each failing .ll/.s file down to functions, by
+probing hybrid files that take some of its functions from B.
 """
 import argparse
-import random
+import errno
+import hashlib
+import json
 import os
+import re
 import shutil
 import subprocess
-import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from groot.process import kill_probe
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+FICLONE = 0x40049409  # linux/fs.h _IOW(0x94, 9, int)
+LINK_MODES = ("copy", "symlink", "hardlink", "reflink")
+
+
+def build_and_run(app_cmd, workdir, on_start=None):
+    if on_start is None:
+        result = subprocess.run(app_cmd, cwd=workdir, shell=True)
+        return result.returncode
+    # own session, so a pruned probe can be killed with everything it spawned
+    proc = subprocess.Popen(app_cmd, cwd=workdir, shell=True, start_new_session=True)
+    on_start(proc)
+    return proc.wait()
+
+
+def reflink(src, dst):
+    """
+    Copy-on-write clone of src, falling back to a plain copy where
+    unsupported. Returns the number of bytes actually copied.
+    """
+    if fcntl is not None:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                shutil.copystat(src, dst)
+                return 0
+            except OSError as e:
+                if e.errno not in (errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY):
+                    raise
+    shutil.copy2(src, dst)
+    return os.path.getsize(dst)
+
+
+def place_file(src, dst, link_mode):
+    """
+    Put src at dst: build a temporary next to dst and os.replace() it, so
+    dst is swapped atomically and never written through (an existing link
+    into the base copy is replaced, not modified). Returns bytes copied.
+    """
+    tmp = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.swap")
+    if os.path.lexists(tmp):
+        os.unlink(tmp)
+    if link_mode == "symlink":
+        os.symlink(os.path.abspath(src), tmp)
+        copied = 0
+    elif link_mode == "hardlink":
+        os.link(src, tmp)
+        copied = 0
+    elif link_mode == "reflink":
+        copied = reflink(src, tmp)
+    else:
+        shutil.copy2(src, tmp)
+        copied = os.path.getsize(tmp)
+    os.replace(tmp, dst)
+    return copied
+
+
+def passes(check_expr, exit_code):
+    return bool(eval(check_expr, {"exit_code": exit_code}))
+
+
+def split_ranges(lo, hi, split):
+    """Split file_list[lo:hi] into up to `split` contiguous chunks; split=2 halves at the midpoint."""
+    n = hi - lo
+    bounds = [lo + i * n // split for i in range(split + 1)]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+FUNC_SEP = "::"
+"""Joins a file and a function name into a function-level partition item."""
+
+FUNCTION_START = {
+    ".ll": re.compile(r'define\b[^@]*@("(?:[^"\\]|\\.)*"|[-\w.$]+)\('),
+    ".s": re.compile(r'\s*\.type\s+("?[^",\s]+"?)\s*,\s*[@%]function'),
+}
+
+
+def split_functions(text, ext):
+    """
+    Split .ll or (ELF) .s text into [(function name or None, chunk)]. A .ll
+    function runs from `define` to the closing `}`, a .s function from its
+    `.type name,@function` to `.size name, ...`; everything else stays in
+    unnamed chunks.
+    """
+    start = FUNCTION_START[ext]
+    lines = text.splitlines(keepends=True)
+    segments = []
+    other = []
+    i = 0
+    while i < len(lines):
+        m = start.match(lines[i])
+        if not m:
+            other.append(lines[i])
+            i += 1
+            continue
+        name = m.group(1)
+        if ext == ".ll":
+            end = re.compile(r"}")
+        else:
+            end = re.compile(rf"\s*\.size\s+{re.escape(name)}\s*,")
+        j = i
+        while j < len(lines) and not end.match(lines[j]):
+            j += 1
+        if j == len(lines):  # unterminated: keep as is
+            other.extend(lines[i:])
+            break
+        if other:
+            segments.append((None, "".join(other)))
+            other = []
+        segments.append((name, "".join(lines[i:j + 1])))
+        i = j + 1
+    if other:
+        segments.append((None, "".join(other)))
+    return segments
+
+
+class HybridFile:
+    """
+    A .ll/.s file present on both sides, rendered as the A file with a
+    chosen set of its functions replaced by their B versions. Only
+    functions that exist on both sides and differ are candidates; the rest
+    of the file (globals, declarations, metadata) always comes from A, so
+    both sides should be built from the same source.
+    """
+
+    def __init__(self, path_a, path_b):
+        ext = os.path.splitext(path_a)[1]
+        self.segments = split_functions(read_text(path_a), ext)
+        self.b_functions = {name: chunk for name, chunk in split_functions(read_text(path_b), ext) if name}
+        self.functions = [name for name, chunk in self.segments
+                          if name and name in self.b_functions and self.b_functions[name] != chunk]
+
+    def render(self, from_b):
+        return "".join(self.b_functions[name] if name in from_b else chunk for name, chunk in self.segments)
+
+
+def read_text(path):
+    # byte-faithful round trip of whatever the compiler wrote
+    with open(path, encoding="utf-8", errors="surrogateescape", newline="") as f:
+        return f.read()
+
+
+def write_file(text, dst):
+    """Atomically replace dst with text; returns bytes written."""
+    data = text.encode("utf-8", errors="surrogateescape")
+    tmp = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.swap")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, dst)
+    return len(data)
+
+
+def partition_state(partition):
+    """{file: "b" or frozenset of its functions taken from B} for a partition of files and function items."""
+    state = {}
+    functions = {}
+    for item in partition:
+        f, sep, function = item.partition(FUNC_SEP)
+        if sep:
+            functions.setdefault(f, set()).add(function)
+        else:
+            state[f] = "b"
+    state.update((f, frozenset(names)) for f, names in functions.items())
+    return state
+
+
+class Workdir:
+    """
+    A probe directory and where each of its files currently comes from
+    (A, B, or a hybrid with some functions from B), so moving to the next
+    partition only swaps the files that differ.
+    """
+
+    def __init__(self, path, file_list, dir_a, dir_b, link_mode, hybrids):
+        self.path = path
+        self.dir_a = dir_a
+        self.dir_b = dir_b
+        self.link_mode = link_mode
+        self.hybrids = hybrids
+        self.state = {}  # files not in here come from A
+        os.makedirs(path)
+        self.setup_bytes = sum(place_file(os.path.join(dir_a, f), os.path.join(path, f), link_mode)
+                               for f in file_list)
+
+    def distance(self, state):
+        return sum(self.state.get(f) != state.get(f) for f in self.state.keys() | state.keys())
+
+    def switch(self, state):
+        """Move to `state` (see partition_state); returns (files swapped, bytes copied)."""
+        changed = sorted(f for f in self.state.keys() | state.keys() if self.state.get(f) != state.get(f))
+        copied = 0
+        for f in changed:
+            want = state.get(f)
+            dst = os.path.join(self.path, f)
+            if want is None:
+                copied += place_file(os.path.join(self.dir_a, f), dst, self.link_mode)
+                del self.state[f]
+                continue
+            if want == "b":
+                copied += place_file(os.path.join(self.dir_b, f), dst, self.link_mode)
+            else:
+                copied += write_file(self.hybrids[f].render(want), dst)
+            self.state[f] = want
+        return len(changed), copied
+
 
-def build_and_run(app_cmd, workdir):
-    result = subprocess.run(app_cmd, cwd=workdir, shell=True)
-    return result.returncode
+def probe_context(file_list, dir_a, dir_b, app_cmd, check_expr):
+    """Identity of a search: cached results are only reused for the same inputs and commands."""
+    stats = [(f, os.stat(os.path.join(d, f)).st_size, os.stat(os.path.join(d, f)).st_mtime_ns)
+             for d in (dir_a, dir_b) for f in file_list]
+    return hashlib.sha256(json.dumps([app_cmd, check_expr, stats]).encode()).hexdigest()
 
-def copy_partition(file_list, dir_a, dir_b, workdir, partition):
-    for f in file_list:
-        src = os.path.join(dir_b if f in partition else dir_a, f)
-        dst = os.path.join(workdir, f)
-        shutil.copy2(src, dst)
 
-def find_failing_files(file_list, dir_a, dir_b, workdir, app_cmd, check_expr):
+class ProbeCache:
+    """
+    Probe results keyed by the set of files taken from B, appended to a
+    JSON Lines file as they come in. Lines from other contexts (inputs,
+    app_cmd, check_expr) and a truncated last line are ignored on load.
+    """
+
+    def __init__(self, path, context):
+        self.context = context
+        self.results = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("context") == context:
+                        self.results[entry["key"]] = entry["passes"]
+        self.loaded = len(self.results)
+        self.file = open(path, "a")
+
+    @staticmethod
+    def key(partition):
+        return hashlib.sha256("\0".join(sorted(partition)).encode()).hexdigest()
+
+    def get(self, partition):
+        return self.results.get(self.key(partition))
+
+    def put(self, partition, passed, seconds):
+        key = self.key(partition)
+        self.results[key] = passed
+        entry = {"context": self.context, "key": key, "passes": passed, "files": len(partition),
+                 "seconds": round(seconds, 3)}
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ProbePool:
+    """
+    Workdirs for (concurrent) probes: workdir/probe-<slot>, each kept
+    between probes and updated incrementally. In the link modes the files
+    are linked from a base copy in workdir/.base/{a,b}, so the sources in
+    dir_a/dir_b are never linked into (and modified by) a probe.
+    """
+
+    def __init__(self, file_list, dir_a, dir_b, workdir, app_cmd, check_expr, jobs, link_mode, cache=None):
+        self.app_cmd = app_cmd
+        self.check_expr = check_expr
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.probes = 0
+        self.cache_hits = 0
+        self.run_time = 0.0
+        self.copied = 0
+        self.setup_bytes = 0
+        if link_mode != "copy":
+            base_a = os.path.join(workdir, ".base", "a")
+            base_b = os.path.join(workdir, ".base", "b")
+            for src_dir, base in ((dir_a, base_a), (dir_b, base_b)):
+                os.makedirs(base)
+                for f in file_list:
+                    self.setup_bytes += place_file(os.path.join(src_dir, f), os.path.join(base, f), "reflink")
+            dir_a, dir_b = base_a, base_b
+        self.dir_a = dir_a
+        self.dir_b = dir_b
+        self.hybrids = {}
+        self.free = [Workdir(os.path.join(workdir, f"probe-{slot}"), file_list, dir_a, dir_b, link_mode,
+                             self.hybrids)
+                     for slot in range(jobs)]
+        self.setup_bytes += sum(w.setup_bytes for w in self.free)
+
+    def probe(self, partition, on_start=None):
+        """
+        Run app_cmd with `partition` (files, and file::function items for
+        hybrids) from B; returns True if check_expr holds.
+        """
+        partition = set(partition)
+        state = partition_state(partition)
+        with self.lock:
+            if self.cache is not None:
+                passed = self.cache.get(partition)
+                if passed is not None:
+                    self.cache_hits += 1
+                    return passed
+            # reuse the workdir that needs the fewest swaps
+            wd = min(self.free, key=lambda w: w.distance(state))
+            self.free.remove(wd)
+            self.probes += 1
+            n = self.probes
+        try:
+            swapped, copied = wd.switch(state)
+            start = time.perf_counter()
+            exit_code = build_and_run(self.app_cmd, wd.path, on_start)
+            seconds = time.perf_counter() - start
+            passed = passes(self.check_expr, exit_code)
+            with self.lock:
+                self.copied += copied
+                self.run_time += seconds
+                # a negative code means the shell itself was killed (a pruned probe): not a result
+                if self.cache is not None and exit_code >= 0:
+                    self.cache.put(partition, passed, seconds)
+                print(f"Probe {n} [{os.path.basename(wd.path)}]: {len(partition)} items from B, "
+                      f"{swapped} swapped, {copied / (1 << 20):.1f} MB copied, "
+                      f"{'passes' if passed else 'fails'} in {seconds:.2f}s", flush=True)
+            return passed
+        finally:
+            with self.lock:
+                self.free.append(wd)
+
+    def add_hybrid(self, f):
+        if f not in self.hybrids:
+            self.hybrids[f] = HybridFile(os.path.join(self.dir_a, f), os.path.join(self.dir_b, f))
+        return self.hybrids[f]
+
+
+class WithFiles:
+    """A view of a ProbePool that also takes `files` from B in every probe."""
+
+    def __init__(self, pool, files):
+        self.pool = pool
+        self.files = list(files)
+
+    def probe(self, partition, on_start=None):
+        return self.pool.probe(list(partition) + self.files, on_start)
+
+
+def find_failing_files(file_list, pool, split=2):
+    """
+    Test with file_list taken from B and every other file from A; if that
+    fails, recurse into `split` chunks of file_list.
+    """
     if not file_list:
         return []
-    copy_partition(file_list, dir_a, dir_b, workdir, file_list)
-    exit_code = build_and_run(app_cmd, workdir)
-    if eval(check_expr, {"exit_code": exit_code}):
+    if pool.probe(file_list):
         return []
     if len(file_list) == 1:
         return file_list
-    mid = len(file_list) // 2
-    return find_failing_files(file_list[:mid], dir_a, dir_b, workdir, app_cmd, check_expr) + \
-           find_failing_files(file_list[mid:], dir_a, dir_b, workdir, app_cmd, check_expr)
+    failing = []
+    for lo, hi in split_ranges(0, len(file_list), split):
+        failing += find_failing_files(file_list[lo:hi], pool, split)
+    return failing
+
+
+def first_failing(partitions, pool, jobs):
+    """
+    The first of `partitions` (in order) that fails, or None. With jobs > 1
+    they are tested concurrently; the answer is the same as testing in order.
+    """
+    if jobs <= 1:
+        return next((p for p in partitions if not pool.probe(p)), None)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(pool.probe, p) for p in partitions]
+        for p, future in zip(partitions, futures):
+            if not future.result():
+                # probes already running still finish and land in the cache
+                for other in futures:
+                    other.cancel()
+                return p
+    return None
+
+
+def ddmin(file_list, pool, jobs=1):
+    """
+    Minimizing delta debugging (Zeller): a 1-minimal set of files that
+    still fails when taken from B, so failures that need several files
+    together are found. Tests the n chunks of the current set, then their
+    complements, and doubles n when neither fails.
+    """
+    if not pool.probe([]):
+        print("Error: fails with every file from A; nothing to minimize")
+        return None
+    if pool.probe(file_list):
+        return []
+    current = list(file_list)
+    n = 2
+    while len(current) > 1:
+        chunks = [current[lo:hi] for lo, hi in split_ranges(0, len(current), n)]
+        failing = first_failing(chunks, pool, jobs)
+        if failing is not None:
+            current, n = failing, 2
+            continue
+        if n > 2:  # with two chunks the complements are the chunks again
+            complements = [[f for f in current if f not in chunk_set] for chunk_set in map(set, chunks)]
+            failing = first_failing(complements, pool, jobs)
+            if failing is not None:
+                current, n = failing, max(n - 1, 2)
+                continue
+        if n >= len(current):
+            break
+        n = min(len(current), 2 * n)
+    return current
+
+
+def find_failing_files_parallel(file_list, pool, jobs, split=2, speculate=2):
+    """
+    Same result as find_failing_files, testing up to `jobs` partitions at
+    once. The chunks of a failing partition are tested together; idle
+    workers speculatively test chunks of partitions still being tested, up
+    to `speculate` levels deep. A passing partition prunes its subtree:
+    queued chunks are dropped and running ones are killed.
+    """
+    if not file_list:
+        return []
+    status = {}  # (lo, hi) -> True (passes) / False (fails)
+    running = {}  # future -> node
+    procs = {}
+    pruned = set()
+    lock = threading.Lock()
+    stats = {"probes": 0, "killed": 0}
+
+    def children(node):
+        lo, hi = node
+        return split_ranges(lo, hi, split) if hi - lo > 1 else []
+
+    def candidates():
+        # walk the recursion tree of the serial algorithm; nodes whose
+        # ancestors all failed are needed, the rest are speculative
+        needed, spec = [], []
+        stack = [((0, len(file_list)), 0)]
+        in_flight = set(running.values())
+        while stack:
+            node, depth = stack.pop()
+            result = status.get(node)
+            if result is True:
+                continue
+            if result is None and node not in in_flight:
+                (spec if depth else needed).append((depth, node))
+                continue
+            if result is None:
+                depth += 1
+                if depth > speculate:
+                    continue
+            stack.extend((child, depth) for child in reversed(children(node)))
+        spec.sort(key=lambda x: x[0])
+        return [node for _, node in needed + spec]
+
+    def on_start(node):
+        def register(proc):
+            with lock:
+                if node in pruned:
+                    kill_probe(proc)
+                else:
+                    procs[node] = proc
+        return register
+
+    def run(node):
+        lo, hi = node
+        try:
+            return pool.probe(file_list[lo:hi], on_start(node))
+        finally:
+            with lock:
+                procs.pop(node, None)
+
+    def has_passing_ancestor(node):
+        lo, hi = node
+        return any(r and l <= lo and hi <= h and (l, h) != node for (l, h), r in status.items())
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while True:
+            for node in candidates()[: jobs - len(running)]:
+                running[executor.submit(run, node)] = node
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                if node in pruned or has_passing_ancestor(node):
+                    continue
+                stats["probes"] += 1
+                status[node] = future.result()
+                if status[node]:
+                    lo, hi = node
+                    with lock:
+                        for other in running.values():
+                            if lo <= other[0] and other[1] <= hi:
+                                pruned.add(other)
+                                if other in procs:
+                                    kill_probe(procs[other])
+                                    stats["killed"] += 1
+
+    def collect(node):
+        if status[node]:
+            return []
+        if node[1] - node[0] == 1:
+            return [file_list[node[0]]]
+        return [f for child in children(node) for f in collect(child)]
+
+    print(f"Partitions: {stats['probes']} tested, {stats['killed']} speculative probes killed")
+    return collect((0, len(file_list)))
+
+
+def find_failing_functions(failing_files, pool, search, together=False):
+    """
+    Second level: for each failing .ll/.s file, run `search(items, pool)`
+    over its differing functions, probing hybrids of that file. Bisection
+    finds files that fail on their own, so everything else comes from A;
+    a ddmin set only fails `together`, so the rest of it comes from B.
+    Returns {file: failing functions}.
+    """
+    results = {}
+    for f in failing_files:
+        if os.path.splitext(f)[1] not in FUNCTION_START:
+            continue
+        hybrid = pool.add_hybrid(f)
+        print(f"{f}: {len(hybrid.functions)} functions differ")
+        items = [f + FUNC_SEP + name for name in hybrid.functions]
+        others = [g for g in failing_files if g != f] if together else []
+        found = search(items, WithFiles(pool, others))
+        results[f] = [item.partition(FUNC_SEP)[2] for item in found or []]
+    return results
+
 
 def main():
     parser = argparse.ArgumentParser(description="Delta debug file changes causing test failures.")
@@ -38,16 +570,64 @@ def main():
     parser.add_argument("--workdir", required=True, help="Working directory")
     parser.add_argument("--app_cmd", required=True, help="App run script/command")
     parser.add_argument("--check_expr", required=True, help="Python expression to check exit code, e.g. 'exit_code == 0'")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Partitions to test concurrently (default: 1, serial)")
+    parser.add_argument("--split", type=int, default=2, help="Chunks to split a failing partition into (default: 2)")
+    parser.add_argument("--speculate", type=int, default=2,
+                        help="Levels of chunks to test ahead of a running probe in parallel mode (default: 2)")
+    parser.add_argument("--ddmin", action="store_true",
+                        help="Find a minimal set of files failing together (ddmin) instead of bisecting")
+    parser.add_argument("--functions", action="store_true",
+                        help="Then narrow failing .ll/.s files down to functions, using hybrid files")
+    parser.add_argument("--cache", metavar="FILE", help="Probe result cache (default: <workdir>.probes.jsonl)")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the probe result cache")
+    parser.add_argument("--link", choices=LINK_MODES, default="reflink",
+                        help="How files are placed in workdirs: copy, symlink or hardlink (app_cmd must not "
+                             "modify its inputs in place) or reflink, falling back to copy (default: reflink)")
     args = parser.parse_args()
+    if args.split < 2:
+        parser.error("--split must be at least 2")
 
     file_list = sorted(os.listdir(args.dir_a))
     if os.path.exists(args.workdir):
         shutil.rmtree(args.workdir)
     os.makedirs(args.workdir)
-    for f in file_list:
-        shutil.copy2(os.path.join(args.dir_a, f), os.path.join(args.workdir, f))
-    failing_files = find_failing_files(file_list, args.dir_a, args.dir_b, args.workdir, args.app_cmd, args.check_expr)
+    cache = None
+    if not args.no_cache:
+        cache_path = args.cache or os.path.normpath(args.workdir) + ".probes.jsonl"
+        context = probe_context(file_list, args.dir_a, args.dir_b, args.app_cmd, args.check_expr)
+        cache = ProbeCache(cache_path, context)
+        print(f"Probe cache {cache_path}: {cache.loaded} results")
+    pool = ProbePool(file_list, args.dir_a, args.dir_b, args.workdir, args.app_cmd, args.check_expr,
+                     args.jobs, args.link, cache)
+
+    def search(items, pool):
+        if args.ddmin:
+            return ddmin(items, pool, args.jobs)
+        if args.jobs > 1:
+            return find_failing_files_parallel(items, pool, args.jobs, args.split, args.speculate)
+        return find_failing_files(items, pool, args.split)
+
+    start = time.perf_counter()
+    try:
+        failing_files = search(file_list, pool)
+        failing_functions = {}
+        if args.functions and failing_files:
+            print("Failing files:", failing_files)
+            failing_functions = find_failing_functions(failing_files, pool, search, together=args.ddmin)
+    finally:
+        if cache is not None:
+            cache.close()
+    elapsed = time.perf_counter() - start
+    per_probe = pool.run_time / pool.probes if pool.probes else 0.0
+    print(f"Probes: {pool.probes} run ({per_probe:.2f}s each, {pool.run_time:.1f}s in app_cmd), "
+          f"{pool.cache_hits} answered from the cache; {elapsed:.1f}s total")
+    print(f"Copied {pool.copied / (1 << 20):.1f} MB in {pool.probes} probes "
+          f"({pool.setup_bytes / (1 << 20):.1f} MB to set up the workdirs)")
+    if failing_files is None:
+        sys.exit(1)
     print("Failing files:", failing_files)
+    for f, functions in failing_functions.items():
+        print(f"Failing functions in {f}:", functions)
 
 if __name__ == "__main__":
     main()
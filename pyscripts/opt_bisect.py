@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Find the pass that breaks a program with -opt-bisect-limit, like
+scripts/bisect/bisector.sh, probing several limits at once.
+
+python opt_bisect.py --src repro/ --compile "bash compile.sh" --test "bash execute.sh" -j 16
+
+The compile command gets "-mllvm -opt-bisect-limit=N" appended as one
+argument (as bisector.sh passes it); a failing compile counts as a failing
+limit. Both commands run in workdir/probe-<slot>, a copy of --src (the
+directory with the sources and scripts, kept small: it is copied once per
+job), so concurrent probes don't overwrite each other's objects. The unlimited run (-1) gives the upper bound and the pass list.
+
+Every free slot probes the midpoint of the widest untested gap between the
+last passing and the first failing limit, so -j k takes about
+log(N)/log(k+1) rounds instead of log2(N). Probes that a result makes
+irrelevant are killed. Results are memoized per limit in
+<workdir>.limits.jsonl, so a rerun (or a -j change) resumes the search.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from groot.process import kill_probe
+
+LIMIT_ARG = "-mllvm -opt-bisect-limit={}"
+RUNNING_PASS = re.compile(rb"BISECT: running pass \((\d+)\) ([^\r\n]*)")
+MEMO_VERSION = 2  # part of the context: memo entries of other versions are ignored
+
+
+def passes_at(log_path, number):
+    """
+    (highest pass number, descriptions of the pass numbered `number`) from a
+    compile log; -1 means the highest. A compile script may run several
+    compilations, each counting its passes from 1 and each stopped by the
+    limit, so there is one description per compilation that got that far.
+    """
+    highest = None
+    found = []
+    with open(log_path, "rb") as f:
+        for line in f:
+            m = RUNNING_PASS.match(line)
+            if m is None:
+                continue
+            n = int(m.group(1))
+            if highest is None or n > highest:
+                highest = n
+                if number == -1:
+                    found = []
+            if n == (highest if number == -1 else number):
+                found.append(m.group(2).decode(errors="replace"))
+    return highest, found
+
+
+def source_context(src, skip, compile_cmd, test_cmd):
+    """Identity of a bisection: memoized results are only reused for the same sources and commands."""
+    stats = []
+    for root, dirs, names in os.walk(src):
+        dirs[:] = sorted(d for d in dirs if os.path.realpath(os.path.join(root, d)) not in skip)
+        for name in sorted(names):
+            if os.path.realpath(os.path.join(root, name)) in skip:
+                continue
+            st = os.stat(os.path.join(root, name))
+            stats.append((os.path.relpath(os.path.join(root, name), src), st.st_size, st.st_mtime_ns))
+    return hashlib.sha256(json.dumps([MEMO_VERSION, compile_cmd, test_cmd, stats]).encode()).hexdigest()
+
+
+class LimitCache:
+    """
+    Probe results keyed by limit, appended to a JSON Lines file as they
+    come in: {"limit", "passes", "last", "at_limit", "seconds"}, where
+    "last" is the highest pass number in the compile log and "at_limit" the
+    descriptions of the pass numbered "limit". Lines from other contexts
+    and a truncated last line are ignored on load.
+    """
+
+    def __init__(self, path, context):
+        self.context = context
+        self.results = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("context") == context:
+                        self.results[entry["limit"]] = entry
+        self.loaded = len(self.results)
+        self.file = open(path, "a") if path else None
+
+    def get(self, limit):
+        return self.results.get(limit)
+
+    def put(self, entry):
+        self.results[entry["limit"]] = entry
+        if self.file is not None:
+            self.file.write(json.dumps(dict(entry, context=self.context)) + "\n")
+            self.file.flush()
+
+
+class Prober:
+    """Runs compile + test for a limit in a free probe workdir; answers from the cache first."""
+
+    def __init__(self, src, workdir, skip, compile_cmd, test_cmd, jobs, cache):
+        self.compile_cmd = compile_cmd
+        self.test_cmd = test_cmd
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.probes = 0
+        self.cache_hits = 0
+        self.run_time = 0.0
+        ignore = lambda d, names: [n for n in names if os.path.realpath(os.path.join(d, n)) in skip]
+        self.free = []
+        for slot in range(jobs):
+            path = os.path.join(workdir, f"probe-{slot}")
+            shutil.copytree(src, path, symlinks=True, ignore=ignore)
+            self.free.append(path)
+
+    def cached(self, limit):
+        with self.lock:
+            entry = self.cache.get(limit)
+            if entry is not None:
+                self.cache_hits += 1
+            return entry
+
+    def run(self, limit, on_start=None, use_cache=True):
+        """{"limit", "passes", "last", "at_limit", "seconds"}, or None if the probe was killed."""
+        if use_cache:
+            entry = self.cached(limit)
+            if entry is not None:
+                return entry
+        with self.lock:
+            path = self.free.pop()
+            self.probes += 1
+            n = self.probes
+        try:
+            start = time.perf_counter()
+            log = os.path.join(path, "opt_bisect.log")
+            cmd = f"{self.compile_cmd} {shlex.quote(LIMIT_ARG.format(limit))}"
+            with open(log, "wb") as out:
+                code = self._run(cmd, path, on_start, out)
+            if code == 0:
+                code = self._run(self.test_cmd, path, on_start)
+            seconds = time.perf_counter() - start
+            if code < 0:
+                return None  # killed: not a result
+            highest, at_limit = passes_at(log, limit)
+            entry = {"limit": limit, "passes": code == 0, "last": highest, "at_limit": at_limit,
+                     "seconds": round(seconds, 3)}
+            with self.lock:
+                self.run_time += seconds
+                if use_cache:
+                    self.cache.put(entry)
+                print(f"Probe {n} [{os.path.basename(path)}]: limit {limit} "
+                      f"{'passes' if entry['passes'] else 'fails'} in {seconds:.2f}s", flush=True)
+            return entry
+        finally:
+            with self.lock:
+                self.free.append(path)
+
+    @staticmethod
+    def _run(cmd, cwd, on_start, stdout=subprocess.DEVNULL):
+        # own session, so a killed probe takes everything it spawned with it
+        proc = subprocess.Popen(cmd, cwd=cwd, shell=True, stdout=stdout, stderr=subprocess.STDOUT,
+                                start_new_session=True)
+        if on_start is not None:
+            on_start(proc)
+        return proc.wait()
+
+
+def next_limits(lo, hi, in_flight, count):
+    """
+    Up to `count` limits to probe in (lo, hi): each splits the widest gap
+    between lo, the limits already in flight and hi.
+    """
+    points = sorted({lo, hi} | {p for p in in_flight if lo < p < hi})
+    chosen = []
+    for _ in range(count):
+        width, a, b = max((b - a, a, b) for a, b in zip(points, points[1:]))
+        if width <= 1:
+            break
+        mid = (a + b) // 2
+        chosen.append(mid)
+        points.append(mid)
+        points.sort()
+    return chosen
+
+
+def bisect(prober, lo, hi, jobs):
+    """
+    Narrow (lo passes, hi fails) down to hi - lo == 1, probing up to `jobs`
+    limits at once. Returns (lo, hi, results by limit).
+    """
+    results = {}
+    running = {}  # future -> limit
+    procs = {}
+    killed = set()
+    lock = threading.Lock()
+    kills = 0
+
+    def on_start(limit):
+        def register(proc):
+            with lock:
+                if limit in killed:
+                    kill_probe(proc)
+                else:
+                    procs.setdefault(limit, []).append(proc)
+        return register
+
+    def run(limit):
+        try:
+            return prober.run(limit, on_start(limit))
+        finally:
+            with lock:
+                procs.pop(limit, None)
+
+    def record(limit, entry):
+        # results outside (lo, hi) are stale or contradict the others: ignored
+        nonlocal lo, hi
+        results[limit] = entry
+        if lo < limit < hi:
+            if entry["passes"]:
+                lo = limit
+            else:
+                hi = limit
+
+    def kill_outside():
+        nonlocal kills
+        with lock:
+            for limit in running.values():
+                if not lo < limit < hi and limit not in killed:
+                    killed.add(limit)
+                    for proc in procs.get(limit, []):
+                        kill_probe(proc)
+                    kills += 1
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while True:
+            moved = False
+            for limit in next_limits(lo, hi, running.values(), jobs - len(running)):
+                entry = prober.cached(limit)
+                if entry is not None:
+                    record(limit, entry)
+                    moved = True
+                    break  # the interval changed: pick again
+                running[executor.submit(run, limit)] = limit
+            if moved:
+                kill_outside()
+                continue
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                limit = running.pop(future)
+                entry = future.result()
+                if entry is not None:
+                    record(limit, entry)
+            kill_outside()
+    print(f"Limits: {len(results)} tested, {kills} probes killed")
+    return lo, hi, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the failing pass with -opt-bisect-limit, in parallel.")
+    parser.add_argument("--compile", required=True,
+                        help='Compile command; gets "-mllvm -opt-bisect-limit=N" appended (e.g. "bash compile.sh")')
+    parser.add_argument("--test", required=True, help="Test command: exit code 0 if the program works")
+    parser.add_argument("--src", required=True,
+                        help="Directory with the sources and scripts, copied into each probe workdir")
+    parser.add_argument("--workdir", default="opt_bisect.work", help="Working directory (default: opt_bisect.work)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Limits to probe concurrently (default: all cores)")
+    parser.add_argument("--cache", metavar="FILE", help="Result memo (default: <workdir>.limits.jsonl)")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the result memo")
+    parser.add_argument("--verify", action="store_true",
+                        help="Rerun the final limits, bypassing the memo, to catch flaky tests")
+    args = parser.parse_args()
+
+    if os.path.exists(args.workdir):
+        shutil.rmtree(args.workdir)
+    os.makedirs(args.workdir)
+    cache_path = None
+    if not args.no_cache:
+        cache_path = args.cache or os.path.normpath(args.workdir) + ".limits.jsonl"
+    # the workdir and the memo may live in --src, but aren't sources
+    skip = {os.path.realpath(p) for p in (args.workdir, cache_path) if p}
+    context = source_context(args.src, skip, args.compile, args.test)
+    cache = LimitCache(cache_path, context)
+    if cache_path:
+        print(f"Limit memo {cache_path}: {cache.loaded} results")
+    prober = Prober(args.src, args.workdir, skip, args.compile, args.test, max(args.jobs, 2), cache)
+
+    start = time.perf_counter()
+    print("Finding upper bound (unlimited) and checking limit 0...")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        full, none = executor.map(prober.run, (-1, 0))
+    if full["last"] is None:
+        print("ERROR: Could not find pass numbers in the compile output (no BISECT: lines)")
+        sys.exit(1)
+    upper = full["last"]
+    print(f"Found upper bound: {upper}")
+    if full["passes"]:
+        print("ERROR: Upper bound should fail but passed the test")
+        sys.exit(1)
+    if not none["passes"]:
+        print("ERROR: Even with no passes, the test fails")
+        sys.exit(1)
+    # the unlimited run is the run at the upper bound
+    if cache.get(upper) is None:
+        cache.put(dict(full, limit=upper))
+
+    lo, hi, results = bisect(prober, 0, upper, args.jobs)
+    elapsed = time.perf_counter() - start
+    per_probe = prober.run_time / prober.probes if prober.probes else 0.0
+    print(f"Probes: {prober.probes} run ({per_probe:.2f}s each), "
+          f"{prober.cache_hits} answered from the memo; {elapsed:.1f}s total")
+
+    print("\nBISECT COMPLETE:")
+    print(f"Last passing pass limit: {lo}")
+    print(f"First failing pass limit: {hi}")
+    failing = results.get(hi) or cache.get(hi)
+    print("\nFailing pass details:")
+    if failing and failing["at_limit"]:
+        for description in failing["at_limit"]:
+            print(f"BISECT: running pass ({hi}) {description}")
+    else:
+        print("Pass info not found")
+
+    if args.verify:
+        print("\nVerification:")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            low, high = executor.map(lambda limit: prober.run(limit, use_cache=False), (lo, hi))
+        print(f"Running with limit {lo} (should pass): {'PASSED' if low['passes'] else 'FAILED unexpectedly'}")
+        print(f"Running with limit {hi} (should fail): {'PASSED unexpectedly' if high['passes'] else 'FAILED'}")
+        if not low["passes"] or high["passes"]:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,11 @@
 """
 Parallel Command Executor - GNU parallel-like functionality in Python.
 
-Executes commands from a file in parallel using a process pool. Each command's output
-is captured in a temporary file, then all outputs are concatenated into a final log.
+Executes commands from a file in parallel using a process pool. Commands are read
+from the file as the pool takes them, each worker appends command output to its own
+temporary file, and the outputs are concatenated into a final log in command order.
+Only per-command columns (exit code, duration, output offset) are kept in memory, so
+command files with millions of lines work, and --range seeks through a cached index.
 
 USAGE:
     parallel_exec.py [OPTIONS] COMMAND_FILE
@@ -71,6 +74,9 @@ DEBUG EXAMPLES:
     # Verbose mode with temp file locations
     parallel_exec.py commands.txt -vv --keep-temp
 
+    # Where the time goes: phase times, plus pe.trace.json with a lane per worker
+    parallel_exec.py commands.txt --profile pe --profile-with cprofile
+
 COMMAND FILE FORMAT:
     - One command per line
     - Lines starting with '#' are treated as comments
@@ -109,99 +115,108 @@ OUTPUT:
 """
 
 import argparse
+import functools
 import subprocess
 import sys
+import threading
+from array import array
 from multiprocessing import Pool
-from typing import Tuple, Optional
+from typing import Iterator, Tuple, Optional
 import time
 import tempfile
 import os
 
+import groot.cache
+import groot.profile
+from groot.colors import Colors
+
+
+NOT_RUN = -(1 << 31)          # exit code column value of commands that never ran
+INDEX_STRIDE = 1024           # commands per entry of the command file offset index
+INDEX_MIN_COMMANDS = 100000   # smaller command files are rescanned instead of cached
+INDEX_VERSION = 1
+
+# Set in each pool worker (and the main process) by init_worker
+_temp_dir = None
+_worker_log = None
+
+
+def init_worker(temp_dir: str):
+    """Pool initializer: where this process appends command output."""
+    global _temp_dir, _worker_log
+    _temp_dir = temp_dir
+    _worker_log = None
+
+
+def worker_log():
+    """This process's output file: one per worker instead of one per command."""
+    global _worker_log
+    if _worker_log is None:
+        _worker_log = open(os.path.join(_temp_dir, f"worker_{os.getpid()}.log"), 'ab')
+    return _worker_log
 
-# ANSI color codes
-class Colors:
-    """ANSI color codes for terminal output."""
-    RED = '\033[91m'
-    GREEN = '\033[92m'
-    YELLOW = '\033[93m'
-    BLUE = '\033[94m'
-    MAGENTA = '\033[95m'
-    CYAN = '\033[96m'
-    WHITE = '\033[97m'
-    RESET = '\033[0m'
-    BOLD = '\033[1m'
-    
-    @staticmethod
-    def disable():
-        """Disable colors."""
-        Colors.RED = ''
-        Colors.GREEN = ''
-        Colors.YELLOW = ''
-        Colors.BLUE = ''
-        Colors.MAGENTA = ''
-        Colors.CYAN = ''
-        Colors.WHITE = ''
-        Colors.RESET = ''
-        Colors.BOLD = ''
-
-
-def execute_command(args_tuple: Tuple[int, str, str]) -> Tuple[int, int, str, str, str]:
+
+def execute_command(args_tuple: Tuple[int, str]) -> Tuple[int, int, str, Tuple[str, int, int], str, float]:
     """
-    Execute a single command and write output to a temporary file.
+    Execute a single command and append its output to this worker's log file.
     
     Args:
-        args_tuple: Tuple of (command_index, command, temp_dir)
+        args_tuple: Tuple of (command_index, command)
         
     Returns:
-        Tuple of (command_index, return_code, command, temp_file_path, error_msg)
+        Tuple of (command_index, return_code, command, (log_file, start, end), error_msg, seconds)
     """
-    cmd_index, cmd, temp_dir = args_tuple
-    temp_file_path = os.path.join(temp_dir, f"cmd_{cmd_index:06d}.log")
+    cmd_index, cmd = args_tuple
+    f = worker_log()
+    start_time = time.perf_counter()
+    f.seek(0, os.SEEK_END)
+    start = f.tell()
+    return_code, error_msg = -1, ""
     
     try:
-        with open(temp_file_path, 'w') as f:
-            # Write header
-            f.write(f"{'='*70}\n")
-            f.write(f"Command #{cmd_index + 1}: {cmd}\n")
-            f.write(f"{'='*70}\n\n")
-            f.flush()
-            
-            # Execute command and redirect output to temp file
-            result = subprocess.run(
-                cmd,
-                shell=True,
-                stdout=f,
-                stderr=subprocess.STDOUT,
-                text=True,
-                timeout=None
-            )
-            
-            # Write footer
-            f.write(f"\n{'='*70}\n")
-            f.write(f"Exit Code: {result.returncode}\n")
-            f.write(f"{'='*70}\n\n")
-            
-        return (cmd_index, result.returncode, cmd, temp_file_path, "")
+        # Write header
+        f.write(f"{'='*70}\n".encode())
+        f.write(f"Command #{cmd_index + 1}: {cmd}\n".encode())
+        f.write(f"{'='*70}\n\n".encode())
+        f.flush()
+        
+        # Execute command and redirect output to the log file
+        result = subprocess.run(
+            cmd,
+            shell=True,
+            stdout=f,
+            stderr=subprocess.STDOUT,
+            timeout=None
+        )
+        return_code = result.returncode
+        
+        # Write footer after whatever the command wrote
+        f.seek(0, os.SEEK_END)
+        f.write(f"\n{'='*70}\n".encode())
+        f.write(f"Exit Code: {result.returncode}\n".encode())
+        f.write(f"{'='*70}\n\n".encode())
     except subprocess.TimeoutExpired:
-        with open(temp_file_path, 'a') as f:
-            f.write("\nERROR: Command timed out\n")
-        return (cmd_index, -1, cmd, temp_file_path, "Command timed out")
+        error_msg = "Command timed out"
+        f.seek(0, os.SEEK_END)
+        f.write(b"\nERROR: Command timed out\n")
     except Exception as e:
         error_msg = f"Error executing command: {str(e)}"
-        with open(temp_file_path, 'a') as f:
-            f.write(f"\nERROR: {error_msg}\n")
-        return (cmd_index, -1, cmd, temp_file_path, error_msg)
+        f.seek(0, os.SEEK_END)
+        f.write(f"\nERROR: {error_msg}\n".encode())
+    f.flush()
+    end = f.tell()
+    return (cmd_index, return_code, cmd, (f.name, start, end), error_msg, time.perf_counter() - start_time)
 
 
-def print_progress(result: Tuple[int, int, str, str, str], verbose: int = 0):
+def print_progress(result: Tuple[int, int, str, Tuple[str, int, int], str, float], verbose: int = 0):
     """
     Print progress of a command execution.
     
     Args:
-        result: Tuple of (command_index, return_code, command, temp_file, error_msg)
+        result: Tuple of (command_index, return_code, command, (log_file, start, end), error_msg, seconds)
         verbose: Verbosity level (0=quiet, 1=normal, 2=verbose)
     """
-    cmd_index, return_code, cmd, temp_file, error_msg = result
+    cmd_index, return_code, cmd, (log_file, start, end), error_msg, seconds = result
     
     if verbose == 0:
         # Quiet mode - only print failures
@@ -220,31 +235,162 @@ def print_progress(result: Tuple[int, int, str, str, str], verbose: int = 0):
         if error_msg:
             print(f"  {Colors.YELLOW}Error:{Colors.RESET} {error_msg}")
         
-        # In verbose mode, show temp file location
+        # In verbose mode, show where the output is
         if verbose >= 2:
-            print(f"  {Colors.CYAN}Log:{Colors.RESET} {temp_file}")
+            print(f"  {Colors.CYAN}Log:{Colors.RESET} {log_file} (bytes {start}-{end}, {seconds:.2f}s)")
+
+
+def command_of(line: bytes) -> Optional[str]:
+    """The command on a raw line of a command file; None for empty and comment lines."""
+    cmd = line.decode().strip()
+    if not cmd or cmd.startswith('#'):
+        return None
+    return cmd
 
 
-def load_commands(file_path: str) -> list:
+class CommandFile:
+    """
+    The commands of a command file, read lazily. One streaming pass counts
+    them and records the byte offset of every INDEX_STRIDE-th command (kept
+    in the groot cache for big files, keyed by size and mtime), so a range
+    is read by seeking to the nearest indexed command instead of from the top.
     """
-    Load commands from a file.
     
-    Args:
-        file_path: Path to the commands file
-        
-    Returns:
-        List of command strings
+    def __init__(self, path: str):
+        self.path = path
+        self.count, self.offsets = self._load_index()
+    
+    def __len__(self):
+        return self.count
+    
+    def _index_file(self) -> str:
+        import hashlib
+        key = hashlib.sha1(os.path.realpath(self.path).encode()).hexdigest()[:16]
+        return groot.cache.cache_path(f"parallel_exec-{key}.json")
+    
+    def _load_index(self):
+        st = os.stat(self.path)
+        index_file = None
+        if st.st_size >= INDEX_MIN_COMMANDS * 8:
+            index_file = self._index_file()
+            cached = groot.cache.load_json(index_file, INDEX_VERSION)
+            if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+                return cached["count"], array('q', cached["offsets"])
+        count = 0
+        offsets = array('q')
+        position = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if command_of(line) is not None:
+                    if count % INDEX_STRIDE == 0:
+                        offsets.append(position)
+                    count += 1
+                position += len(line)
+        if index_file and count >= INDEX_MIN_COMMANDS:
+            try:
+                groot.cache.write_json(index_file, INDEX_VERSION, {
+                    "size": st.st_size, "mtime_ns": st.st_mtime_ns, "count": count, "offsets": offsets.tolist()})
+            except OSError:
+                pass  # just rescanned next time
+        return count, offsets
+    
+    def iter(self, start: int = 1, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """(number, command) for the 1-based command numbers start..end."""
+        end = self.count if end is None else min(end, self.count)
+        if start > end:
+            return
+        number = (start - 1) // INDEX_STRIDE * INDEX_STRIDE + 1
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[(start - 1) // INDEX_STRIDE])
+            for line in f:
+                cmd = command_of(line)
+                if cmd is None:
+                    continue
+                if number >= start:
+                    yield number, cmd
+                if number == end:
+                    return
+                number += 1
+
+
+class Feeder:
     """
-    try:
-        with open(file_path, 'r') as f:
-            commands = [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
-        return commands
-    except FileNotFoundError:
-        print(f"Error: Command file '{file_path}' not found", file=sys.stderr)
-        sys.exit(1)
-    except Exception as e:
-        print(f"Error reading command file: {str(e)}", file=sys.stderr)
-        sys.exit(1)
+    Hands items to Pool.imap at most `window` ahead of the results taken
+    back with done(), so the pool's task queue doesn't swallow the whole
+    command file.
+    """
+    
+    def __init__(self, items, window: int):
+        self.items = items
+        self.slots = threading.Semaphore(window)
+        self.stopped = False
+    
+    def __iter__(self):
+        for item in self.items:
+            # Polls so that stop() can release the pool's task handler thread
+            while not self.slots.acquire(timeout=0.1):
+                if self.stopped:
+                    return
+            if self.stopped:
+                return
+            yield item
+    
+    def done(self):
+        self.slots.release()
+    
+    def stop(self):
+        self.stopped = True
+
+
+class Results:
+    """
+    Per-command results in array columns indexed by position in the run:
+    exit code (NOT_RUN until it ran), duration, and where the output is
+    (worker log file number, offset, length).
+    """
+    
+    def __init__(self, count: int):
+        self.exit_codes = array('i', [NOT_RUN]) * count
+        self.durations = array('f', [0.0]) * count
+        self.log_files = array('H', [0]) * count
+        self.log_offsets = array('q', [0]) * count
+        self.log_lengths = array('q', [0]) * count
+        self.files = []
+        self.file_numbers = {}
+        self.executed = 0
+    
+    def add(self, position: int, result: Tuple[int, int, str, Tuple[str, int, int], str, float]):
+        _, return_code, _, (log_file, start, end), _, seconds = result
+        number = self.file_numbers.get(log_file)
+        if number is None:
+            number = self.file_numbers[log_file] = len(self.files)
+            self.files.append(log_file)
+        self.exit_codes[position] = return_code
+        self.durations[position] = seconds
+        self.log_files[position] = number
+        self.log_offsets[position] = start
+        self.log_lengths[position] = end - start
+        self.executed += 1
+    
+    def copy_output(self, outfile):
+        """Write every command's output to outfile in command order."""
+        fds = [os.open(path, os.O_RDONLY) for path in self.files]
+        try:
+            for position, code in enumerate(self.exit_codes):
+                if code == NOT_RUN:
+                    continue
+                fd = fds[self.log_files[position]]
+                offset, remaining = self.log_offsets[position], self.log_lengths[position]
+                while remaining > 0:
+                    chunk = os.pread(fd, min(remaining, 1 << 20), offset)
+                    if not chunk:
+                        break
+                    outfile.write(chunk)
+                    offset += len(chunk)
+                    remaining -= len(chunk)
+        finally:
+            for fd in fds:
+                os.close(fd)
 
 
 def main():
@@ -336,7 +482,10 @@ Examples:
         help='Execute only commands in range START:END (1-based, inclusive). Examples: 5:10, :5, 10:'
     )
     
+    groot.profile.add_arguments(parser)
+    
     args = parser.parse_args()
+    profiler = groot.profile.from_args(args)
     
     # Handle verbosity settings
     if args.quiet:
@@ -392,56 +541,61 @@ Examples:
             print("Use format: START:END (e.g., 5:10, :5, 10:)", file=sys.stderr)
             sys.exit(1)
     
-    # Load commands
-    commands = load_commands(args.command_file)
+    # Index the command file; commands are read from it as they are dispatched
+    try:
+        with profiler.phase("load_commands"):
+            command_file = CommandFile(args.command_file)
+    except FileNotFoundError:
+        print(f"Error: Command file '{args.command_file}' not found", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error reading command file: {str(e)}", file=sys.stderr)
+        sys.exit(1)
     
-    if not commands:
+    if not len(command_file):
         print("No commands found in file", file=sys.stderr)
         sys.exit(1)
     
     # Apply range filter if specified
-    original_count = len(commands)
+    original_count = len(command_file)
     if args.range:
         # Set range_end to total commands if not specified
         if range_end is None:
-            range_end = len(commands)
+            range_end = original_count
         
         # Validate range against actual command count
-        if range_start > len(commands):
-            print(f"Error: Range start {range_start} exceeds total commands {len(commands)}", file=sys.stderr)
+        if range_start > original_count:
+            print(f"Error: Range start {range_start} exceeds total commands {original_count}", file=sys.stderr)
             sys.exit(1)
         
-        if range_end > len(commands):
-            range_end = len(commands)
-        
-        # Filter commands (convert to 0-based indexing)
-        commands = commands[range_start - 1:range_end]
-        
+        if range_end > original_count:
+            range_end = original_count
+    else:
+        range_start, range_end = 1, original_count
+    command_count = range_end - range_start + 1
+    
+    if args.range:
         if verbosity >= 1:
             print(f"{Colors.BOLD}Loaded {original_count} command(s) from '{args.command_file}'{Colors.RESET}")
-            print(f"{Colors.CYAN}Executing range {range_start}:{range_end} ({len(commands)} command(s)){Colors.RESET}")
+            print(f"{Colors.CYAN}Executing range {range_start}:{range_end} ({command_count} command(s)){Colors.RESET}")
     else:
         if verbosity >= 1:
-            print(f"{Colors.BOLD}Loaded {len(commands)} command(s) from '{args.command_file}'{Colors.RESET}")
-    
-    if not commands:
-        print("No commands in specified range", file=sys.stderr)
-        sys.exit(1)
+            print(f"{Colors.BOLD}Loaded {command_count} command(s) from '{args.command_file}'{Colors.RESET}")
     
     if verbosity >= 1:
-        if args.serial_from and args.serial_from <= len(commands):
+        if args.serial_from and args.serial_from <= command_count:
             if args.serial_from == 1:
                 print(f"{Colors.BOLD}Executing all commands serially{Colors.RESET}\n")
             else:
                 print(f"{Colors.BOLD}Executing commands 1-{args.serial_from - 1} in parallel ({args.jobs} jobs){Colors.RESET}")
-                print(f"{Colors.BOLD}Executing commands {args.serial_from}-{len(commands)} serially{Colors.RESET}\n")
+                print(f"{Colors.BOLD}Executing commands {args.serial_from}-{command_count} serially{Colors.RESET}\n")
         else:
             print(f"{Colors.BOLD}Executing with {args.jobs} parallel job(s){Colors.RESET}\n")
     
     # Dry run mode
     if args.dry_run:
         print("DRY RUN - Commands to be executed:")
-        for i, cmd in enumerate(commands, 1):
+        for i, (_, cmd) in enumerate(command_file.iter(range_start, range_end), 1):
             print(f"  {i}. {cmd}")
         return
     
@@ -449,73 +603,91 @@ Examples:
     temp_dir = tempfile.mkdtemp(prefix='parallel_exec_')
     if verbosity >= 2:
         print(f"{Colors.CYAN}Using temporary directory:{Colors.RESET} {temp_dir}\n")
-    
-    # Calculate the offset for command numbering (when using range)
-    cmd_offset = (range_start - 1) if args.range else 0
+    init_worker(temp_dir)  # for the serial batch
     
     # Execute commands in parallel
     start_time = time.time()
     failed_count = 0
     success_count = 0
-    all_results = []
+    results = Results(command_count)
+    
+    # With --profile every result comes with the (start, end, lane) of its command
+    run_command = functools.partial(groot.profile.timed, execute_command) if profiler.enabled else execute_command
+    
+    def record(result):
+        if profiler.enabled:
+            result, (start, end, lane) = result
+            profiler.span(f"#{result[0] + 1}", start, end, lane, {"cmd": result[2], "exit": result[1]})
+        results.add(result[0] + 1 - range_start, result)
+        return result
     
     try:
-        # Determine split point for parallel vs serial execution
-        serial_from_index = None
-        if args.serial_from:
-            serial_from_index = args.serial_from - 1  # Convert to 0-based index
-            if serial_from_index >= len(commands):
-                serial_from_index = None  # All commands run in parallel
-        
-        # Split commands into parallel and serial batches
-        if serial_from_index is not None and serial_from_index > 0:
-            parallel_commands = commands[:serial_from_index]
-            serial_commands = commands[serial_from_index:]
-        elif serial_from_index == 0:
-            # All commands run serially
-            parallel_commands = []
-            serial_commands = commands
-        else:
-            # All commands run in parallel
-            parallel_commands = commands
-            serial_commands = []
+        # Determine split point for parallel vs serial execution (command numbers in the file)
+        serial_from = range_end + 1
+        if args.serial_from and args.serial_from <= command_count:
+            serial_from = range_start + args.serial_from - 1
+        parallel_count = serial_from - range_start
+        serial_count = range_end + 1 - serial_from
         
         # Execute parallel batch
-        if parallel_commands:
-            if verbosity >= 1 and serial_commands:
-                print(f"{Colors.CYAN}=== Executing parallel batch ({len(parallel_commands)} commands) ==={Colors.RESET}\n")
+        if parallel_count:
+            if verbosity >= 1 and serial_count:
+                print(f"{Colors.CYAN}=== Executing parallel batch ({parallel_count} commands) ==={Colors.RESET}\n")
             
-            cmd_args = [(i + cmd_offset, cmd, temp_dir) for i, cmd in enumerate(parallel_commands)]
+            # Batch tiny commands so dispatch isn't a round trip each; the feeder
+            # keeps only a few batches per worker in flight
+            chunksize = max(1, min(64, parallel_count // (args.jobs * 64)))
+            feeder = Feeder(((number - 1, cmd) for number, cmd in command_file.iter(range_start, serial_from - 1)),
+                            args.jobs * chunksize * 4)
             
-            with Pool(processes=args.jobs) as pool:
-                if args.keep_order:
-                    results = pool.map(execute_command, cmd_args)
-                else:
-                    results = pool.imap_unordered(execute_command, cmd_args)
-                
-                for result in results:
-                    all_results.append(result)
-                    print_progress(result, verbosity)
-                    
-                    if result[1] == 0:
-                        success_count += 1
-                    else:
-                        failed_count += 1
-                        if args.halt_on_error:
+            with profiler.phase("dispatch"):
+                pool = Pool(processes=args.jobs, initializer=init_worker, initargs=(temp_dir,))
+            
+            with pool, profiler.phase("wait"):
+                try:
+                    # Results are taken as they finish, so a slow command doesn't hold
+                    # the feeder's window; --keep-order reorders them for printing
+                    pending = {}
+                    next_index = range_start - 1
+                    halted = False
+                    for result in pool.imap_unordered(run_command, feeder, chunksize):
+                        feeder.done()
+                        result = record(result)
+                        if args.keep_order:
+                            pending[result[0]] = result
+                            ready = []
+                            while next_index in pending:
+                                ready.append(pending.pop(next_index))
+                                next_index += 1
+                        else:
+                            ready = [result]
+                        
+                        for result in ready:
+                            print_progress(result, verbosity)
+                            
+                            if result[1] == 0:
+                                success_count += 1
+                            else:
+                                failed_count += 1
+                                if args.halt_on_error:
+                                    halted = True
+                                    break
+                        if halted:
                             print(f"\n{Colors.RED}Halting execution due to error{Colors.RESET}", file=sys.stderr)
-                            pool.terminate()
-                            serial_commands = []  # Skip serial execution
+                            serial_count = 0  # Skip serial execution
                             break
+                finally:
+                    # Let the pool's task handler out of the feeder before the pool terminates
+                    feeder.stop()
         
         # Execute serial batch
-        if serial_commands:
-            if verbosity >= 1 and parallel_commands:
-                print(f"\n{Colors.CYAN}=== Executing serial batch ({len(serial_commands)} commands) ==={Colors.RESET}\n")
+        if serial_count:
+            if verbosity >= 1 and parallel_count:
+                print(f"\n{Colors.CYAN}=== Executing serial batch ({serial_count} commands) ==={Colors.RESET}\n")
             
-            for i, cmd in enumerate(serial_commands):
-                cmd_index = len(parallel_commands) + i + cmd_offset
-                result = execute_command((cmd_index, cmd, temp_dir))
-                all_results.append(result)
+            for number, cmd in command_file.iter(serial_from, range_end):
+                with profiler.phase("serial"):
+                    result = record(run_command((number - 1, cmd)))
                 print_progress(result, verbosity)
                 
                 if result[1] == 0:
@@ -531,44 +703,47 @@ Examples:
         sys.exit(130)
     
     finally:
-        # Sort results by command index to maintain order
-        all_results.sort(key=lambda x: x[0])
+        if _worker_log is not None:
+            _worker_log.close()
         
         try:
-            with open(args.output, 'w') as outfile:
+            with profiler.phase("concatenate_log"), open(args.output, 'wb') as outfile:
                 # Write header
-                outfile.write(f"{'#'*70}\n")
-                outfile.write(f"# Parallel Execution Log\n")
-                outfile.write(f"# Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                outfile.write(f"# Total Commands: {len(commands)}\n")
-                outfile.write(f"# Parallel Jobs: {args.jobs}\n")
+                header = [
+                    f"{'#'*70}\n",
+                    f"# Parallel Execution Log\n",
+                    f"# Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}\n",
+                    f"# Total Commands: {command_count}\n",
+                    f"# Parallel Jobs: {args.jobs}\n",
+                ]
                 if args.range:
-                    outfile.write(f"# Command range: {args.range}\n")
+                    header.append(f"# Command range: {args.range}\n")
                 if args.serial_from:
-                    outfile.write(f"# Serial execution from command: {args.serial_from}\n")
-                outfile.write(f"{'#'*70}\n\n")
+                    header.append(f"# Serial execution from command: {args.serial_from}\n")
+                header.append(f"{'#'*70}\n\n")
+                outfile.write("".join(header).encode())
                 
-                # Concatenate each command's output
-                for cmd_index, return_code, cmd, temp_file, error_msg in all_results:
-                    if os.path.exists(temp_file):
-                        with open(temp_file, 'r') as infile:
-                            outfile.write(infile.read())
+                # Concatenate each command's output, in command order
+                results.copy_output(outfile)
                 
                 # Write summary
                 elapsed_time = time.time() - start_time
-                outfile.write(f"\n{'#'*70}\n")
-                outfile.write(f"# Execution Summary\n")
-                outfile.write(f"{'#'*70}\n")
+                summary = [
+                    f"\n{'#'*70}\n",
+                    f"# Execution Summary\n",
+                    f"{'#'*70}\n",
+                ]
                 if args.range:
-                    outfile.write(f"Total commands in file: {original_count}\n")
-                    outfile.write(f"Commands in range: {len(commands)}\n")
+                    summary.append(f"Total commands in file: {original_count}\n")
+                    summary.append(f"Commands in range: {command_count}\n")
                 else:
-                    outfile.write(f"Total commands: {len(commands)}\n")
-                outfile.write(f"Executed: {len(all_results)}\n")
-                outfile.write(f"Successful: {success_count}\n")
-                outfile.write(f"Failed: {failed_count}\n")
-                outfile.write(f"Elapsed time: {elapsed_time:.2f} seconds\n")
-                outfile.write(f"{'#'*70}\n")
+                    summary.append(f"Total commands: {command_count}\n")
+                summary.append(f"Executed: {results.executed}\n")
+                summary.append(f"Successful: {success_count}\n")
+                summary.append(f"Failed: {failed_count}\n")
+                summary.append(f"Elapsed time: {elapsed_time:.2f} seconds\n")
+                summary.append(f"{'#'*70}\n")
+                outfile.write("".join(summary).encode())
             
         except Exception as e:
             print(f"Error writing log file: {str(e)}", file=sys.stderr)
@@ -577,7 +752,8 @@ Examples:
         if not args.keep_temp:
             try:
                 import shutil
-                shutil.rmtree(temp_dir)
+                with profiler.phase("cleanup"):
+                    shutil.rmtree(temp_dir)
                 if verbosity >= 2:
                     print(f"{Colors.GREEN}SUCCESS{Colors.RESET} Cleaned up temporary directory")
             except Exception as e:
@@ -592,7 +768,7 @@ Examples:
     
     print(f"\n{'='*60}")
     print(f"{Colors.BOLD}Execution Summary:{Colors.RESET}")
-    print(f"  Total commands: {len(commands)}")
+    print(f"  Total commands: {command_count}")
     print(f"  Executed: {total_count}")
     print(f"  {Colors.GREEN}Successful:{Colors.RESET} {success_count}")
     if failed_count > 0:
@@ -603,6 +779,7 @@ Examples:
     if verbosity >= 1:
         print(f"  Log file: {args.output}")
     print(f"{'='*60}")
+    profiler.finish()
     
     # Exit with error code if any command failed
     if failed_count > 0:
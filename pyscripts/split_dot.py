@@ -7,82 +7,552 @@ Each digraph will be saved as an individual DOT file with intelligently sequence
 import re
 import os
 import argparse
+import hashlib
+import shutil
+import subprocess
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, Iterator, List, Set, Tuple
 
 
-def parse_dot_file(file_path: str) -> List[Tuple[str, str]]:
+# Characters that can change nesting: quotes, escapes, braces, HTML labels and comments
+DOT_TOKEN = re.compile(r'\\.|["{}<>]|/\*|\*/|//', re.DOTALL)
+QUOTED = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+GRAPH_START = re.compile(r'\s*(?:strict\s+)?digraph\b')
+GRAPH_HEADER = re.compile(r'\s*(?:strict\s+)?digraph\s*("(?:[^"\\]|\\.)*"|[\w.]+)?\s*\{')
+GRAPH_LABEL = re.compile(r'^\s*label\s*=\s*("(?:[^"\\]|\\.)*"|[\w.]+)', re.MULTILINE)
+
+
+class DotScanState:
+    """Lexer state carried across lines while scanning a DOT stream."""
+
+    def __init__(self):
+        self.depth = 0
+        self.in_quote = False
+        self.in_comment = False
+        self.html_depth = 0
+        self.opened = False
+
+    @property
+    def in_token(self) -> bool:
+        return self.in_quote or self.in_comment or self.html_depth > 0
+
+    def scan(self, line: str):
+        """
+        Update brace depth for one line, ignoring braces inside quoted
+        strings, HTML labels and comments.
+        """
+        if not self.in_token:
+            # Common case: complete quoted strings and no comments or HTML labels
+            bare = QUOTED.sub('', line) if '"' in line else line
+            if '"' not in bare and '<' not in bare and '/' not in bare:
+                opens = bare.count('{')
+                if opens:
+                    self.opened = True
+                self.depth += opens - bare.count('}')
+                return
+        for m in DOT_TOKEN.finditer(line):
+            tok = m.group()
+            if self.in_comment:
+                if tok == '*/':
+                    self.in_comment = False
+            elif self.in_quote:
+                if tok == '"':
+                    self.in_quote = False
+            elif self.html_depth:
+                if tok == '<':
+                    self.html_depth += 1
+                elif tok == '>':
+                    self.html_depth -= 1
+            elif tok == '"':
+                self.in_quote = True
+            elif tok == '/*':
+                self.in_comment = True
+            elif tok == '//':
+                return
+            elif tok == '{':
+                self.depth += 1
+                self.opened = True
+            elif tok == '}':
+                self.depth -= 1
+            elif tok == '<' and line[:m.start()].rstrip().endswith('='):
+                self.html_depth = 1
+
+
+def iter_digraphs(file_path: str) -> Iterator[Tuple[str, str]]:
     """
-    Parse a DOT file and extract individual digraphs.
-    
+    Stream a DOT file and yield individual digraphs as soon as they close.
+
+    Only the lines of the graph being collected are held in memory, and
+    each line is scanned once, so the whole split is a single linear pass.
+
     Args:
         file_path: Path to the input DOT file
-        
-    Returns:
-        List of tuples containing (digraph_name, digraph_content)
+
+    Yields:
+        Tuples of (digraph_name, digraph_content)
     """
-    with open(file_path, 'r') as f:
-        content = f.read()
-    
-    # Find all digraph blocks
-    digraphs = []
-    brace_count = 0
-    current_digraph = ""
+    state = DotScanState()
+    current_digraph = []
     in_digraph = False
     digraph_counter = 1
-    
-    lines = content.split('\n')
-    
-    for line in lines:
-        stripped_line = line.strip()
-        
-        # Check if we're starting a new digraph
-        if stripped_line.startswith('digraph'):
-            if in_digraph:
-                # Save the previous digraph
-                digraphs.append((f"digraph_{digraph_counter:02d}", current_digraph.strip()))
-                digraph_counter += 1
-                current_digraph = ""
-            
-            in_digraph = True
-            brace_count = 0
-            current_digraph = line + '\n'
-            
-            # Count opening braces in the digraph line
-            brace_count += line.count('{') - line.count('}')
-            
-        elif in_digraph:
-            current_digraph += line + '\n'
-            brace_count += line.count('{') - line.count('}')
-            
+
+    with open(file_path, 'r') as f:
+        for line in f:
+            # Check if we're starting a new digraph
+            if not state.in_token and GRAPH_START.match(line):
+                if in_digraph:
+                    # Save the previous, unterminated digraph
+                    yield (f"digraph_{digraph_counter:02d}", "".join(current_digraph).strip())
+                    digraph_counter += 1
+                in_digraph = True
+                state = DotScanState()
+                current_digraph = []
+
+            if not in_digraph:
+                continue
+
+            current_digraph.append(line if line.endswith('\n') else line + '\n')
+            state.scan(line)
+
             # Check if we've closed all braces
-            if brace_count == 0:
-                # End of current digraph
-                digraphs.append((f"digraph_{digraph_counter:02d}", current_digraph.strip()))
+            if state.opened and state.depth == 0 and not state.in_token:
+                yield (f"digraph_{digraph_counter:02d}", "".join(current_digraph).strip())
                 digraph_counter += 1
-                current_digraph = ""
+                current_digraph = []
                 in_digraph = False
-    
+
     # Handle case where file doesn't end with proper closing
-    if in_digraph and current_digraph.strip():
-        digraphs.append((f"digraph_{digraph_counter:02d}", current_digraph.strip()))
+    if in_digraph and "".join(current_digraph).strip():
+        yield (f"digraph_{digraph_counter:02d}", "".join(current_digraph).strip())
+
+
+def parse_dot_file(file_path: str) -> List[Tuple[str, str]]:
+    """
+    Parse a DOT file and extract individual digraphs.
     
-    return digraphs
+    Args:
+        file_path: Path to the input DOT file
+        
+    Returns:
+        List of tuples containing (digraph_name, digraph_content)
+    """
+    return list(iter_digraphs(file_path))
+
+
+DOT_LEXEME = re.compile(r'''
+    (?P<ws>\s+|//[^\n]*|/\*.*?\*/|(?<![^\n])\#[^\n]*)
+  | (?P<str>"(?:[^"\\]|\\.)*")
+  | (?P<op>->|--|[{}\[\];,=:+<])
+  | (?P<id>-?(?:\.\d+|\d+(?:\.\d*)?)|[^\s{}\[\];,=:+"<>#/-]+)
+''', re.VERBOSE | re.DOTALL)
+PLAIN_ID = re.compile(r'[A-Za-z_\x80-\U0010ffff][\w\x80-\U0010ffff]*|-?(?:\.\d+|\d+(?:\.\d*)?)')
+DOT_KEYWORDS = {'node', 'edge', 'graph', 'digraph', 'subgraph', 'strict'}
+
+
+def tokenize_dot(content: str) -> List[str]:
+    """
+    Split DOT text into tokens. Quoted strings keep their quotes and HTML
+    strings keep their angle brackets, so values can be written back verbatim.
+    """
+    tokens = []
+    pos = 0
+    end = len(content)
+    while pos < end:
+        m = DOT_LEXEME.match(content, pos)
+        if m is None:
+            raise ValueError(f"unexpected character {content[pos]!r} at offset {pos}")
+        pos = m.end()
+        if m.lastgroup == 'ws':
+            continue
+        tok = m.group()
+        if tok == '<':
+            # HTML string: balanced <...>
+            depth = 1
+            while depth and pos < end:
+                c = content[pos]
+                depth += (c == '<') - (c == '>')
+                pos += 1
+            tok = content[m.start():pos]
+        tokens.append(tok)
+    return tokens
+
+
+def unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def quote_id(value: str) -> str:
+    if value.startswith('<') or (PLAIN_ID.fullmatch(value) and value.lower() not in DOT_KEYWORDS):
+        return value
+    return f'"{value}"'
+
+
+def format_attrs(attrs: dict) -> str:
+    if not attrs:
+        return ""
+    return " [" + ",".join(f"{k}={v}" for k, v in attrs.items()) + "]"
+
+
+class DotGraph:
+    """
+    In-memory model of one digraph: nodes, edges and their attributes.
+
+    Node ids are stored unquoted; attribute values are kept as written
+    (quotes included). Subgraphs are flattened into the parent graph and
+    only top-level graph/node/edge defaults are kept, which is enough to
+    summarize and re-render a graph.
+    """
+
+    def __init__(self, name: str = None, strict: bool = False, kind: str = 'digraph'):
+        self.name = name
+        self.strict = strict
+        self.kind = kind
+        self.attr_stmts = []
+        self.nodes = {}
+        self.edges = []
+
+    @classmethod
+    def parse(cls, content: str) -> 'DotGraph':
+        """
+        Build a DotGraph from the text of a single graph.
+
+        Args:
+            content: DOT text of one graph, as produced by iter_digraphs
+
+        Returns:
+            The parsed graph
+        """
+        return _DotParser(tokenize_dot(content)).parse_graph()
+
+    def label(self, node: str) -> str:
+        attrs = self.nodes.get(node, {})
+        return unquote(attrs['label']) if 'label' in attrs else node
+
+    def add_node(self, node: str, attrs: dict = None):
+        known = self.nodes.setdefault(node, {})
+        if attrs:
+            known.update(attrs)
+
+    def successors(self) -> Dict[str, List[str]]:
+        succ = {n: [] for n in self.nodes}
+        for src, _, dst, _, _ in self.edges:
+            succ[src].append(dst)
+        return succ
+
+    def predecessors(self) -> Dict[str, List[str]]:
+        pred = {n: [] for n in self.nodes}
+        for src, _, dst, _, _ in self.edges:
+            pred[dst].append(src)
+        return pred
+
+    def neighbors(self) -> Dict[str, List[str]]:
+        # dicts rather than sets keep traversal order deterministic
+        adj = {n: {} for n in self.nodes}
+        for src, _, dst, _, _ in self.edges:
+            adj[src][dst] = None
+            adj[dst][src] = None
+        return {n: list(others) for n, others in adj.items()}
+
+    def induced(self, keep: Set[str]) -> 'DotGraph':
+        """Return a copy that only holds the nodes in *keep* and edges between them."""
+        graph = DotGraph(self.name, self.strict, self.kind)
+        graph.attr_stmts = list(self.attr_stmts)
+        graph.nodes = {n: dict(a) for n, a in self.nodes.items() if n in keep}
+        graph.edges = [e for e in self.edges if e[0] in keep and e[2] in keep]
+        return graph
+
+    def match_nodes(self, pattern: str) -> List[str]:
+        regex = re.compile(pattern)
+        return [n for n in self.nodes if regex.search(n) or regex.search(self.label(n))]
+
+    def neighborhood(self, pattern: str, hops: int) -> 'DotGraph':
+        """
+        Keep only nodes within *hops* edges (in either direction) of a node
+        whose id or label matches *pattern*.
+        """
+        frontier = self.match_nodes(pattern)
+        seen = set(frontier)
+        adj = self.neighbors()
+        for _ in range(hops):
+            next_frontier = []
+            for node in frontier:
+                for other in adj[node]:
+                    if other not in seen:
+                        seen.add(other)
+                        next_frontier.append(other)
+            frontier = next_frontier
+        return self.induced(seen)
+
+    def collapse_chains(self) -> 'DotGraph':
+        """
+        Replace each run of two or more nodes with exactly one predecessor and
+        one successor by a single box node labeled with the ends of the run.
+        """
+        succ = self.successors()
+        pred = self.predecessors()
+
+        def interior(n):
+            return len(pred[n]) == 1 and len(succ[n]) == 1 and pred[n][0] != n
+
+        merged = {}
+        labels = {}
+        for node in self.nodes:
+            if node in merged or not interior(node) or interior(pred[node][0]):
+                continue
+            run = [node]
+            while interior(succ[run[-1]][0]) and succ[run[-1]][0] not in merged and succ[run[-1]][0] != node:
+                run.append(succ[run[-1]][0])
+            if len(run) < 2:
+                continue
+            for n in run:
+                merged[n] = node
+            labels[node] = (f"{summarize_label(self.label(node))} ... "
+                            f"{summarize_label(self.label(run[-1]))} ({len(run)} nodes)")
+
+        graph = self.induced({n for n in self.nodes if merged.get(n, n) == n})
+        graph.edges = []
+        for src, src_port, dst, dst_port, attrs in self.edges:
+            rep_src, rep_dst = merged.get(src, src), merged.get(dst, dst)
+            if src in merged and dst in merged and rep_src == rep_dst:
+                continue
+            # Ports on a collapsed node referred to the original record fields
+            graph.edges.append((rep_src, None if rep_src in labels else src_port,
+                                rep_dst, None if rep_dst in labels else dst_port, attrs))
+        for node, label in labels.items():
+            graph.nodes[node] = {'shape': 'box', 'style': 'dashed', 'label': f'"{label}"'}
+        return graph
+
+    def cap_nodes(self, max_nodes: int, seeds: List[str] = None) -> 'DotGraph':
+        """
+        Keep at most *max_nodes* nodes, visited breadth-first from *seeds*
+        (or from the entry nodes), and note how many were dropped.
+        """
+        if len(self.nodes) <= max_nodes:
+            return self
+        pred = self.predecessors()
+        adj = self.neighbors()
+        roots = list(seeds or [n for n in self.nodes if not pred[n]])
+        order = []
+        seen = set()
+        for start in roots + list(self.nodes):
+            if len(order) >= max_nodes:
+                break
+            if start in seen:
+                continue
+            seen.add(start)
+            queue = deque([start])
+            while queue and len(order) < max_nodes:
+                node = queue.popleft()
+                order.append(node)
+                for other in adj[node]:
+                    if other not in seen:
+                        seen.add(other)
+                        queue.append(other)
+        graph = self.induced(set(order))
+        omitted = len(self.nodes) - len(order)
+        graph.nodes['__omitted__'] = {'shape': 'note', 'label': f'"{omitted} nodes omitted"'}
+        return graph
+
+    def to_dot(self) -> str:
+        op = '->' if self.kind == 'digraph' else '--'
+
+        def endpoint(node, port):
+            return quote_id(node) + (f":{port}" if port else "")
+
+        header = f"{'strict ' if self.strict else ''}{self.kind}"
+        if self.name is not None:
+            header += f" {quote_id(self.name)}"
+        lines = [header + " {"]
+        lines.extend(f"\t{stmt};" for stmt in self.attr_stmts)
+        lines.extend(f"\t{quote_id(n)}{format_attrs(a)};" for n, a in self.nodes.items())
+        lines.extend(f"\t{endpoint(s, sp)} {op} {endpoint(d, dp)}{format_attrs(a)};"
+                     for s, sp, d, dp, a in self.edges)
+        lines.append("}")
+        return "\n".join(lines)
 
 
-def extract_meaningful_name(digraph_content: str) -> str:
+def summarize_label(label: str, width: int = 40) -> str:
+    """First non-empty field of a (record) label, trimmed for use in a summary."""
+    for part in re.split(r'\\[lnr]|\||[{}]', label):
+        part = part.strip()
+        if part and not part.startswith('<'):
+            return part if len(part) <= width else part[:width - 3] + "..."
+    return label[:width]
+
+
+class _DotParser:
+    """Recursive descent parser over tokenize_dot output, filling a DotGraph."""
+
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.pos = 0
+        self.graph = None
+
+    def peek(self) -> str:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self) -> str:
+        tok = self.peek()
+        if tok is None:
+            raise ValueError("unexpected end of graph")
+        self.pos += 1
+        return tok
+
+    def expect(self, tok: str):
+        got = self.next()
+        if got != tok:
+            raise ValueError(f"expected '{tok}' but found '{got}'")
+
+    def value(self) -> str:
+        val = self.next()
+        # "a" + "b" string concatenation
+        while self.peek() == '+':
+            self.next()
+            val = f'"{unquote(val)}{unquote(self.next())}"'
+        return val
+
+    def parse_graph(self) -> DotGraph:
+        strict = self.peek().lower() == 'strict'
+        if strict:
+            self.next()
+        kind = self.next().lower()
+        if kind not in ('digraph', 'graph'):
+            raise ValueError(f"expected 'digraph' but found '{kind}'")
+        name = None
+        if self.peek() != '{':
+            name = unquote(self.value())
+        self.graph = DotGraph(name, strict, kind)
+        self.expect('{')
+        self.stmt_list(top=True, mentioned=[])
+        self.expect('}')
+        return self.graph
+
+    def attr_list(self) -> dict:
+        attrs = {}
+        while self.peek() == '[':
+            self.next()
+            while self.peek() != ']':
+                if self.peek() in (',', ';'):
+                    self.next()
+                    continue
+                key = unquote(self.next())
+                if self.peek() == '=':
+                    self.next()
+                    attrs[key] = self.value()
+                else:
+                    attrs[key] = 'true'
+            self.next()
+        return attrs
+
+    def operand(self, first: str, mentioned: list) -> List[Tuple[str, str]]:
+        if first == '{' or first.lower() == 'subgraph':
+            inner = []
+            if first != '{':
+                if self.peek() != '{':
+                    self.next()
+                self.expect('{')
+            self.stmt_list(top=False, mentioned=inner)
+            self.expect('}')
+            mentioned.extend(inner)
+            return [(n, None) for n in dict.fromkeys(inner)]
+        node = unquote(first)
+        port = None
+        while self.peek() == ':':
+            self.next()
+            port = self.next() if port is None else f"{port}:{self.next()}"
+        self.graph.add_node(node)
+        mentioned.append(node)
+        return [(node, port)]
+
+    def stmt_list(self, top: bool, mentioned: list):
+        while self.peek() not in ('}', None):
+            tok = self.next()
+            if tok in (';', ','):
+                continue
+            if tok.lower() in ('graph', 'node', 'edge') and self.peek() == '[':
+                attrs = self.attr_list()
+                if top:
+                    self.graph.attr_stmts.append(f"{tok.lower()}{format_attrs(attrs)}")
+                continue
+            if tok not in ('{',) and tok.lower() != 'subgraph' and self.peek() == '=':
+                self.next()
+                val = self.value()
+                if top:
+                    self.graph.attr_stmts.append(f"{tok}={val}")
+                continue
+            ends = self.operand(tok, mentioned)
+            if self.peek() in ('->', '--'):
+                chain = [ends]
+                while self.peek() in ('->', '--'):
+                    self.next()
+                    chain.append(self.operand(self.next(), mentioned))
+                attrs = self.attr_list()
+                for left, right in zip(chain, chain[1:]):
+                    for src, src_port in left:
+                        for dst, dst_port in right:
+                            self.graph.edges.append((src, src_port, dst, dst_port, dict(attrs)))
+            elif len(ends) == 1 and tok != '{' and tok.lower() != 'subgraph':
+                # node_stmt: node_id [port] [attr_list]; the attributes belong to the node
+                self.graph.add_node(ends[0][0], self.attr_list())
+
+
+def graph_title(digraph_content: str) -> str:
+    """
+    Return the graph id, or the graph-level label when the id is missing.
+    """
+    m = GRAPH_HEADER.match(digraph_content)
+    if m and m.group(1):
+        return unquote(m.group(1))
+    m = GRAPH_LABEL.search(digraph_content)
+    return unquote(m.group(1)) if m else None
+
+
+def name_from_title(title: str) -> str:
+    """
+    Turn an LLVM graph title into a file-name friendly function name, e.g.
+    "CFG for 'main' function" -> "main" and
+    "dag-combine1 input for main:entry" -> "main_entry_dag-combine1".
+    """
+    m = re.match(r"(?:Dom\w* tree|CFG|Call graph)(?: for '(.+)' function)?", title)
+    if m and m.group(1):
+        title = m.group(1)
+    else:
+        m = re.match(r"(.+?) input for ([^:]+)(?::(.*))?$", title)
+        if m:
+            title = "_".join(p for p in (m.group(2), m.group(3), m.group(1)) if p)
+    name = re.sub(r'[^\w.-]+', '_', title).strip('_')
+    return name[:80] or None
+
+
+def extract_meaningful_name(digraph_content: str, from_graph_name: bool = False) -> str:
     """
     Extract a meaningful name from the digraph content based on node labels.
     
     Args:
         digraph_content: The content of the digraph
+        from_graph_name: Prefer the graph id/label (e.g. the function name
+            of an LLVM CFG) over node label heuristics
         
     Returns:
         A meaningful name based on the content
     """
+    if from_graph_name:
+        title = graph_title(digraph_content)
+        if title:
+            name = name_from_title(title)
+            if name:
+                return name
+
     # Look for function names or meaningful identifiers in node labels
     node_pattern = r'"([^"]*)"'
-    nodes = re.findall(node_pattern, digraph_content)
+    # Only the first few labels are inspected; don't collect every label of a huge graph
+    nodes = [m.group(1) for m in islice(re.finditer(node_pattern, digraph_content), 5)]
     
     if nodes:
         # Try to find function names or addresses
@@ -102,14 +572,87 @@ def extract_meaningful_name(digraph_content: str) -> str:
     return None
 
 
-def split_dot_file(input_file: str, output_dir: str = None, use_graphviz: bool = True):
+def dot_job(job: Tuple[str, str, str, str, str]) -> Tuple[str, bool, float, str]:
+    """
+    Run `dot` on one split graph: parse-only validation, or a render when
+    a format is given. Successful results are stored in the cache first.
+
+    Args:
+        job: Tuple of (dot_binary, dot_file, format_or_None, cache_file, output_file)
+
+    Returns:
+        Tuple of (dot_file, ok, seconds, error_msg)
+    """
+    dot_binary, dot_file, fmt, cache_file, output_file = job
+    start = time.time()
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    # -Tcanon makes dot parse the graph without laying it out
+    cmd = [dot_binary, f"-T{fmt or 'canon'}", dot_file, "-o", tmp_file if fmt else os.devnull]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    except OSError as e:
+        return dot_file, False, time.time() - start, str(e)
+    if result.returncode != 0:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return dot_file, False, time.time() - start, result.stderr.strip()
+    if fmt:
+        os.replace(tmp_file, cache_file)
+        shutil.copyfile(cache_file, output_file)
+    else:
+        open(cache_file, 'w').close()
+    return dot_file, True, time.time() - start, ""
+
+
+def reduce_graph(content: str, focus: str = None, hops: int = 2,
+                 collapse: bool = False, max_nodes: int = None) -> Tuple[str, int, int]:
+    """
+    Apply the summarization filters to one graph.
+
+    Args:
+        content: DOT text of the graph
+        focus: Regex; keep only the neighborhood of nodes whose id or label matches
+        hops: Neighborhood radius used with focus
+        collapse: Collapse linear chains of nodes
+        max_nodes: Keep at most this many nodes
+
+    Returns:
+        Tuple of (new_content, nodes_before, nodes_after)
+    """
+    graph = DotGraph.parse(content)
+    before = len(graph.nodes)
+    seeds = None
+    if focus:
+        seeds = graph.match_nodes(focus)
+        graph = graph.neighborhood(focus, hops)
+    if collapse:
+        graph = graph.collapse_chains()
+        if seeds:
+            seeds = [n for n in seeds if n in graph.nodes]
+    if max_nodes is not None:
+        graph = graph.cap_nodes(max_nodes, seeds)
+    return graph.to_dot(), before, len(graph.nodes)
+
+
+def split_dot_file(input_file: str, output_dir: str = None, use_graphviz: bool = True,
+                   render_format: str = None, jobs: int = None, use_cache: bool = True,
+                   name_from_graph: bool = False, focus: str = None, hops: int = 2,
+                   collapse_chains: bool = False, max_nodes: int = None):
     """
     Split a DOT file into multiple files, one for each digraph.
     
     Args:
         input_file: Path to the input DOT file
         output_dir: Directory to save the split files (default: same as input file)
-        use_graphviz: Whether to use graphviz library for validation
+        use_graphviz: Whether to validate (or render) each graph with the `dot` binary
+        render_format: Render each graph to this format (e.g. svg, png) instead of only validating
+        jobs: Number of concurrent `dot` processes (default: number of CPUs)
+        use_cache: Reuse results for graphs whose content hash was seen before
+        name_from_graph: Name outputs from the graph id/label rather than node labels
+        focus: Keep only the neighborhood of nodes matching this regex
+        hops: Neighborhood radius used with focus
+        collapse_chains: Collapse linear chains of nodes into one node
+        max_nodes: Cap the number of nodes written per graph
     """
     input_path = Path(input_file)
     
@@ -118,47 +661,94 @@ def split_dot_file(input_file: str, output_dir: str = None, use_graphviz: bool =
     else:
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
+
+    dot_binary = shutil.which("dot") if use_graphviz else None
+    if use_graphviz and dot_binary is None:
+        print("  ! graphviz 'dot' not found in PATH, skipping validation")
+    cache_dir = output_dir / ".dot_cache"
+    if dot_binary:
+        cache_dir.mkdir(exist_ok=True)
+
+    reducing = focus is not None or collapse_chains or max_nodes is not None
+    start_time = time.time()
+    executor = ProcessPoolExecutor(max_workers=jobs) if dot_binary else None
+    futures = []
+    cache_hits = 0
     
-    # Parse the DOT file
-    digraphs = parse_dot_file(input_file)
-    
-    if not digraphs:
+    # Stream the DOT file and save each digraph as soon as it is complete
+    count = 0
+    try:
+        for i, (default_name, content) in enumerate(iter_digraphs(input_file), 1):
+            count = i
+            # Try to extract a meaningful name
+            meaningful_name = extract_meaningful_name(content, name_from_graph)
+            
+            if meaningful_name:
+                filename = f"{input_path.stem}_{meaningful_name}_{i:02d}.dot"
+            else:
+                filename = f"{input_path.stem}_{default_name}.dot"
+            
+            output_path = output_dir / filename
+
+            if reducing:
+                try:
+                    content, before, after = reduce_graph(content, focus, hops, collapse_chains, max_nodes)
+                    print(f"  Reduced {filename}: {before} -> {after} nodes")
+                except ValueError as e:
+                    print(f"  ⚠ Warning: could not parse {filename} for filtering, writing as is: {e}")
+            
+            # Write the digraph to a separate file
+            with open(output_path, 'w') as f:
+                f.write(content)
+            
+            print(f"Created: {output_path}")
+
+            if executor is None:
+                continue
+
+            # Hand the graph to the dot pool while splitting continues
+            digest = hashlib.sha256(content.encode()).hexdigest()
+            cache_file = cache_dir / (f"{digest}.{render_format}" if render_format else f"{digest}.ok")
+            rendered_path = output_path.with_suffix(f".{render_format}") if render_format else None
+            if use_cache and cache_file.exists():
+                if rendered_path:
+                    shutil.copyfile(cache_file, rendered_path)
+                cache_hits += 1
+                continue
+            job = (dot_binary, str(output_path), render_format, str(cache_file), str(rendered_path))
+            futures.append(executor.submit(dot_job, job))
+        split_time = time.time() - start_time
+
+        failures = 0
+        dot_seconds = 0.0
+        slowest = (0.0, None)
+        for future in as_completed(futures):
+            dot_file, ok, seconds, error_msg = future.result()
+            dot_seconds += seconds
+            slowest = max(slowest, (seconds, dot_file), key=lambda x: x[0])
+            if ok:
+                print(f"  ✓ {'Rendered' if render_format else 'Validated'} {dot_file}")
+            else:
+                failures += 1
+                print(f"  ⚠ Warning: dot failed for {dot_file}: {error_msg}")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    if count == 0:
         print("No digraphs found in the input file.")
         return
-    
-    print(f"Found {len(digraphs)} digraph(s) in {input_file}")
-    
-    # Split and save each digraph
-    for i, (default_name, content) in enumerate(digraphs, 1):
-        # Try to extract a meaningful name
-        meaningful_name = extract_meaningful_name(content)
-        
-        if meaningful_name:
-            filename = f"{input_path.stem}_{meaningful_name}_{i:02d}.dot"
-        else:
-            filename = f"{input_path.stem}_{default_name}.dot"
-        
-        output_path = output_dir / filename
-        
-        # Write the digraph to a separate file
-        with open(output_path, 'w') as f:
-            f.write(content)
-        
-        print(f"Created: {output_path}")
-        
-        # Optional: Validate with graphviz if available
-        if use_graphviz:
-            try:
-                import graphviz
-                # Try to parse the generated file to ensure it's valid
-                source = graphviz.Source(content)
-                # This will raise an exception if the DOT syntax is invalid
-                source.source
-                print(f"  ✓ Validated syntax for {filename}")
-            except ImportError:
-                print("  ! graphviz library not available for validation")
-            except Exception as e:
-                print(f"  ⚠ Warning: Syntax validation failed for {filename}: {e}")
+
+    print(f"Split {count} digraph(s) from {input_file}")
+    if executor is not None:
+        print(f"\nTiming summary:")
+        print(f"  Split:            {split_time:.2f}s")
+        print(f"  Total wall time:  {time.time() - start_time:.2f}s")
+        print(f"  dot runs:         {len(futures)} ({dot_seconds:.2f}s summed over workers)")
+        print(f"  Cache hits:       {cache_hits}")
+        print(f"  Failures:         {failures}")
+        if slowest[1]:
+            print(f"  Slowest graph:    {slowest[1]} ({slowest[0]:.2f}s)")
 
 
 def main():
@@ -178,6 +768,48 @@ def main():
         action="store_true",
         help="Skip graphviz validation of output files"
     )
+    parser.add_argument(
+        "-T", "--render",
+        metavar="FORMAT",
+        help="Render each graph with dot to FORMAT (e.g. svg, png, pdf) instead of only validating"
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        help="Number of concurrent dot processes (default: number of CPUs)"
+    )
+    parser.add_argument(
+        "--name-from-graph",
+        action="store_true",
+        help="Name outputs from the graph name/label (e.g. the function of a CFG) instead of node labels"
+    )
+    parser.add_argument(
+        "--focus",
+        metavar="REGEX",
+        help="Keep only nodes within --hops edges of a node whose id or label matches REGEX"
+    )
+    parser.add_argument(
+        "--hops",
+        type=int,
+        default=2,
+        help="Neighborhood radius for --focus (default: 2)"
+    )
+    parser.add_argument(
+        "--collapse-chains",
+        action="store_true",
+        help="Collapse linear chains of nodes into a single summary node"
+    )
+    parser.add_argument(
+        "--max-nodes",
+        type=int,
+        metavar="N",
+        help="Keep at most N nodes per graph (breadth-first from --focus matches or entry nodes)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-run dot even for graphs already validated/rendered with the same content"
+    )
     
     args = parser.parse_args()
     
@@ -189,7 +821,15 @@ def main():
         split_dot_file(
             args.input_file,
             args.output_dir,
-            use_graphviz=not args.no_validation
+            use_graphviz=not args.no_validation,
+            render_format=args.render,
+            jobs=args.jobs,
+            use_cache=not args.no_cache,
+            name_from_graph=args.name_from_graph,
+            focus=args.focus,
+            hops=args.hops,
+            collapse_chains=args.collapse_chains,
+            max_nodes=args.max_nodes
         )
         print("\nSplit completed successfully!")
     except Exception as e:
@@ -1,42 +1,438 @@
 import argparse
+import json
+import mmap
 import os
 import re
+import sys
+import time
+from collections import Counter, defaultdict
 
-def split_log(input_file, out_dir="."):
-    # Read the entire log file
-    with open(input_file, "r") as f:
-        content = f.read()
+import groot.profile
 
-    # Find all start markers and passnames
-    pattern = r'; \*\*\* IR Dump After\s+([^\n"]+|"[^"]+")'
-    matches = list(re.finditer(pattern, content))
+# name -> (regex that precedes the pass name, output extension)
+MARKER_GRAMMARS = {
+    "ir-after": (r'; \*\*\* IR Dump After', ".ll"),
+    "ir-before": (r'; \*\*\* IR Dump Before', ".before.ll"),
+    "mir-after": (r'# \*\*\* IR Dump After', ".mir"),
+    "mir-before": (r'# \*\*\* IR Dump Before', ".before.mir"),
+    # -print-changed: At Start, After (also omitted/filtered out), Pass invalidated/ignored
+    "changed": (r'\*\*\* IR (?:Dump At|Dump After|Pass)', ".changed.ll"),
+}
+DEFAULT_GRAMMARS = ("ir-after", "mir-after")
 
-    if not matches:
-        print("No IR dump markers found.")
+UNIT_PATTERN = re.compile(r' on (.+?)\s*\*\*\*')
+MACHINE_FUNCTION_PATTERN = re.compile(rb'^# Machine code for function ([^\s:]+):', re.MULTILINE)
+MODULE_UNIT = "[module]"
+
+def unit_name(dump, eol):
+    # New PM markers name the IR unit ("... on foo ***"). Legacy ones don't:
+    # a machine function dump names its function in the body, while a legacy
+    # IR dump may hold a whole module or a single function, so those all
+    # share one unit rather than being keyed to the first function they contain
+    m = UNIT_PATTERN.search(dump[:eol].decode(errors="replace"))
+    if m:
+        return m.group(1)
+    m = MACHINE_FUNCTION_PATTERN.search(dump, eol)
+    return m.group(1).decode(errors="replace") if m else MODULE_UNIT
+
+# Per-dump IR statistics. An IR instruction is a two-space indented line
+# (optionally "%x = ", "tail call"); a machine instruction an indented
+# upper-case opcode after its defs and flags, with or without slot indexes.
+IR_INSTRUCTION = re.compile(rb'^  (?:%(?:"[^"\n]*"|[-\w.$]+) = )?(?:(?:tail|musttail|notail) )?([a-z][a-z0-9_.]*)',
+                            re.MULTILINE)
+IR_FUNCTION = re.compile(rb'^define ', re.MULTILINE)
+# every basic block ends in exactly one terminator
+IR_TERMINATORS = ("ret", "br", "switch", "indirectbr", "invoke", "callbr", "resume", "unreachable",
+                  "cleanupret", "catchret", "catchswitch")
+MIR_INSTRUCTION = re.compile(
+    rb'^(?:\d+B\t)?  (?:[^\n=;]*? = )?'
+    rb'(?:(?:frame-setup|frame-destroy|nnan|ninf|nsz|arcp|contract|afn|reassoc|nuw|nsw|nusw|exact|'
+    rb'disjoint|nneg|samesign|inbounds|nofpexcept|unpredictable|noconvergent) )*([A-Z][\w]*)', re.MULTILINE)
+MIR_FUNCTION = re.compile(rb'^# Machine code for function ', re.MULTILINE)
+MIR_BLOCK = re.compile(rb'^(?:\d+B\t)?bb\.\d+', re.MULTILINE)
+STAT_FIELDS = ("bytes", "lines", "functions", "blocks", "instructions")
+
+def dump_stats(dump, ext):
+    """Size and instruction counts of one dump (bytes); opcodes as a Counter."""
+    stats = {"bytes": len(dump), "lines": dump.count(b"\n"), "functions": 0, "blocks": 0, "instructions": 0}
+    if ext.endswith(".ll"):
+        opcodes = Counter(IR_INSTRUCTION.findall(dump))
+        stats["functions"] = len(IR_FUNCTION.findall(dump))
+        stats["blocks"] = sum(opcodes[op.encode()] for op in IR_TERMINATORS)
+    elif ext.endswith(".mir"):
+        opcodes = Counter(MIR_INSTRUCTION.findall(dump))
+        stats["functions"] = len(MIR_FUNCTION.findall(dump))
+        stats["blocks"] = len(MIR_BLOCK.findall(dump))
+    else:
+        opcodes = Counter()
+    stats["instructions"] = sum(opcodes.values())
+    return stats, Counter({op.decode(): n for op, n in opcodes.items()})
+
+def write_stats(rows, path):
+    """ir_stats.csv (one column per opcode seen in the log) or ir_stats.json."""
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(rows, f, separators=(",", ":"))
+            f.write("\n")
         return
+    import csv
+    opcodes = sorted({op for row in rows for op in row["opcodes"]})
+    fields = ["index", "pass", "unit", "kind"] + list(STAT_FIELDS) + [f"d_{k}" for k in STAT_FIELDS]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields + [f"op.{op}" for op in opcodes])
+        for row in rows:
+            writer.writerow([row[k] for k in fields] + [row["opcodes"].get(op, 0) for op in opcodes])
+
+def print_stats_summary(rows, limit=20):
+    # Passes by total instruction growth, the usual compile time suspects
+    per_pass = defaultdict(lambda: [0, 0, 0, 0])
+    for row in rows:
+        acc = per_pass[row["pass"]]
+        acc[0] += 1
+        acc[1] += row["d_instructions"]
+        acc[2] += row["d_blocks"]
+        acc[3] += row["d_bytes"]
+    ranked = sorted(per_pass.items(), key=lambda kv: abs(kv[1][1]), reverse=True)[:limit]
+    width = max([len("Pass")] + [len(p) for p, _ in ranked])
+    print(f"\n{'Pass':<{width}} {'Dumps':>8} {'dInstrs':>10} {'dBlocks':>8} {'dBytes':>12}")
+    for passname, (dumps, instrs, blocks, size) in ranked:
+        print(f"{passname:<{width}} {dumps:>8} {instrs:>+10} {blocks:>+8} {size:>+12}")
+
+def group_opcodes(ops, context):
+    # Same hunk grouping as difflib's get_grouped_opcodes, over precomputed opcodes
+    if not ops or (len(ops) == 1 and ops[0][0] == 'equal'):
+        return []
+    ops = list(ops)
+    if ops[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = ops[0]
+        ops[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if ops[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = ops[-1]
+        ops[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+    groups = []
+    group = []
+    for tag, i1, i2, j1, j2 in ops:
+        if tag == 'equal' and i2 - i1 > 2 * context:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        groups.append(group)
+    return groups
+
+def hunk_range(start, stop):
+    # Empty ranges point at the line before the hunk, as in `diff -u`
+    length = stop - start
+    return f"{start + 1 if length else start},{length}"
+
+def line_opcodes(old_lines, new_lines):
+    # Trim the common head/tail first; most passes touch a small part of the dump
+    lo = 0
+    limit = min(len(old_lines), len(new_lines))
+    while lo < limit and old_lines[lo] == new_lines[lo]:
+        lo += 1
+    tail = 0
+    while tail < limit - lo and old_lines[-1 - tail] == new_lines[-1 - tail]:
+        tail += 1
+    old_end = len(old_lines) - tail
+    new_end = len(new_lines) - tail
+
+    import difflib
+    # Map every distinct line to a small int so the matcher compares ints, not strings
+    ids = {}
+    a = [ids.setdefault(l, len(ids)) for l in old_lines[lo:old_end]]
+    b = [ids.setdefault(l, len(ids)) for l in new_lines[lo:new_end]]
+    ops = [('equal', 0, lo, 0, lo)] if lo else []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        ops.append((tag, i1 + lo, i2 + lo, j1 + lo, j2 + lo))
+    if tail:
+        ops.append(('equal', old_end, len(old_lines), new_end, len(new_lines)))
+    return ops
+
+def hash_diff(old_lines, new_lines, fromfile, tofile, context=3, line_offset=0, ops=None):
+    # ops: line_opcodes(old_lines, new_lines), if the caller already has them
+    if ops is None:
+        ops = line_opcodes(old_lines, new_lines)
+    added = removed = 0
+    out = []
+    for group in group_opcodes(ops, context):
+        if not out:
+            out.append(f"--- {fromfile}\n+++ {tofile}\n")
+        i1, i2, j1, j2 = (n + line_offset for n in (group[0][1], group[-1][2], group[0][3], group[-1][4]))
+        out.append(f"@@ -{hunk_range(i1, i2)} +{hunk_range(j1, j2)} @@\n")
+        for tag, a1, a2, b1, b2 in group:
+            if tag == 'equal':
+                out.extend(' ' + l for l in old_lines[a1:a2])
+                continue
+            if tag in ('replace', 'delete'):
+                out.extend('-' + l for l in old_lines[a1:a2])
+                removed += a2 - a1
+            if tag in ('replace', 'insert'):
+                out.extend('+' + l for l in new_lines[b1:b2])
+                added += b2 - b1
+    return "".join(out), added, removed
+
+def diff_dump(job):
+    idx, passname, unit, prev_file, cur_file, diff_file = job
+    # Skip the marker line, it always differs
+    with open(prev_file, "r") as f:
+        old_lines = f.read().splitlines(keepends=True)[1:]
+    with open(cur_file, "r") as f:
+        new_lines = f.read().splitlines(keepends=True)[1:]
+    text, added, removed = hash_diff(old_lines, new_lines,
+                                     os.path.basename(prev_file), os.path.basename(cur_file), line_offset=1)
+    if text:
+        with open(diff_file, "w") as out:
+            out.write(text)
+    return idx, passname, unit, added, removed
+
+def print_diff_summary(results):
+    per_pass = defaultdict(lambda: [0, 0, 0, 0])
+    for _, passname, _, added, removed in results:
+        row = per_pass[passname]
+        row[0] += 1
+        row[1] += 1 if added or removed else 0
+        row[2] += added
+        row[3] += removed
+    rows = sorted(per_pass.items(), key=lambda kv: kv[1][2] + kv[1][3], reverse=True)
+    width = max([len("Pass")] + [len(p) for p in per_pass])
+    print(f"\n{'Pass':<{width}} {'Dumps':>8} {'Changed':>8} {'Added':>10} {'Removed':>10}")
+    for passname, (dumps, changed, added, removed) in rows:
+        print(f"{passname:<{width}} {dumps:>8} {changed:>8} {added:>10} {removed:>10}")
+
+def compile_scanner(grammars, extra_markers=()):
+    # One alternation for every enabled grammar; the pass name group is shared
+    alternatives = []
+    exts = {}
+    for name in grammars:
+        if name not in MARKER_GRAMMARS:
+            raise ValueError(f"unknown marker grammar '{name}' (known: {', '.join(MARKER_GRAMMARS)})")
+        prefix, ext = MARKER_GRAMMARS[name]
+        alternatives.append((name, prefix))
+        exts[name] = ext
+    for i, prefix in enumerate(extra_markers):
+        name = f"custom{i}"
+        alternatives.append((name, prefix))
+        exts[name] = ".log"
+    body = "|".join(f"(?P<{name.replace('-', '_')}>{prefix})" for name, prefix in alternatives)
+    scanner = re.compile(rf'(?:{body})\s*(?P<pass>"[^"\n]+"|[^\s"]+)'.encode())
+    groups = [(name.replace('-', '_'), exts[name]) for name, _ in alternatives]
+    return scanner, groups
 
-    # Ensure output directory exists
-    os.makedirs(out_dir, exist_ok=True)
-
-    for idx, match in enumerate(matches):
-        start = match.start()
-        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(content)
-        # Get first word after start token
-        first_line = content[start:end].splitlines()[0]
-        tokens = first_line.split()
-        passname = tokens[tokens.index("After")+1] if "After" in tokens and len(tokens) > tokens.index("After")+1 else "unknown"
-        filename = os.path.join(out_dir, f"{idx+1}.{passname}.ll")
-        with open(filename, "w") as out:
-            out.write(content[start:end])
-        print(f"Wrote {filename}")
+def clean_passname(raw):
+    name = raw.decode(errors="replace").strip('"')
+    return re.sub(r'[^\w.+-]+', '_', name) or "unknown"
+
+def split_log(input_file, out_dir=".", diff=False, jobs=None, grammars=DEFAULT_GRAMMARS, extra_markers=(),
+              stats_format=None, profiler=None):
+    profiler = profiler or groot.profile.Profiler()
+    scanner, groups = compile_scanner(grammars, extra_markers)
+    start_time = time.time()
+    size = os.path.getsize(input_file)
+
+    with open(input_file, "rb") as f:
+        # Scan the mapped file directly instead of reading it into a str
+        content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        try:
+            with profiler.phase("scan"):
+                matches = list(scanner.finditer(content))
+            if not matches:
+                print(f"No IR dump markers found in {input_file}.")
+                return input_file, 0, size, time.time() - start_time, [], []
+
+            # Ensure output directory exists
+            os.makedirs(out_dir, exist_ok=True)
+
+            pool = None
+            if diff and jobs != 1:
+                from multiprocessing import Pool
+                with profiler.phase("pool_start"):
+                    pool = Pool(processes=jobs)
+            pending = []
+            last_dump = {}
+            stat_rows = []
+            last_stats = {}
+            # Per-dump work is summed into phases: a span per dump would dwarf the trace
+            clock = time.perf_counter
+            write_time = stats_time = diff_time = 0.0
+            loop_start = clock()
+            try:
+                for idx, match in enumerate(matches):
+                    t0 = clock()
+                    start = match.start()
+                    end = matches[idx + 1].start() if idx + 1 < len(matches) else len(content)
+                    passname = clean_passname(match.group("pass"))
+                    ext = next(ext for group, ext in groups if match.start(group) != -1)
+                    filename = os.path.join(out_dir, f"{idx+1}.{passname}{ext}")
+                    dump = content[start:end]
+                    with open(filename, "wb") as out:
+                        out.write(dump)
+                    print(f"Wrote {filename}")
+                    t1 = clock()
+                    write_time += t1 - t0
+
+                    eol = dump.find(b"\n")
+                    unit = None
+                    if (diff or stats_format) and 0 <= eol < len(dump) - 1:
+                        unit = (ext, unit_name(dump, eol))
+                    if stats_format:
+                        # Counted from the dump in hand; deltas against the previous dump of the same unit
+                        counts, opcodes = dump_stats(dump, ext)
+                        row = {"index": idx + 1, "pass": passname, "unit": unit[1] if unit else "",
+                               "kind": ext.lstrip(".")}
+                        row.update(counts)
+                        prev = last_stats.get(unit)
+                        for k in STAT_FIELDS:
+                            row[f"d_{k}"] = counts[k] - prev[0][k] if prev else 0
+                        row["opcodes"] = dict(opcodes)
+                        row["d_opcodes"] = {op: opcodes[op] - prev[1][op] for op in opcodes.keys() | prev[1].keys()
+                                            if opcodes[op] != prev[1][op]} if prev else {}
+                        stat_rows.append(row)
+                        last_stats[unit] = (counts, opcodes)
+                        stats_time += clock() - t1
+                    if diff and unit is not None:
+                        # Diff against the previous dump of the same IR unit while we keep splitting
+                        if unit in last_dump:
+                            diff_file = os.path.join(out_dir, f"{idx+1}.{passname}.diff")
+                            job = (idx + 1, passname, unit[1], last_dump[unit], filename, diff_file)
+                            if pool is None:
+                                t2 = clock()
+                                pending.append(diff_dump(job))
+                                diff_time += clock() - t2
+                            elif profiler.enabled:
+                                pending.append(pool.apply_async(groot.profile.timed, (diff_dump, job)))
+                            else:
+                                pending.append(pool.apply_async(diff_dump, (job,)))
+                        last_dump[unit] = filename
+                profiler.add("write", write_time, len(matches))
+                if stats_format:
+                    profiler.add("stats", stats_time, len(matches))
+                if diff and pool is None:
+                    profiler.add("diff", diff_time, len(pending))
+                profiler.span("split", loop_start, clock())
+
+                results = []
+                if diff:
+                    if pool is not None:
+                        pool.close()
+                        with profiler.phase("diff_wait"):
+                            results = [r.get() for r in pending]
+                        pool.join()
+                        if profiler.enabled:
+                            # diff time as the workers saw it, a span per diff on its worker's lane
+                            timed_results, results = results, []
+                            for result, (start, end, lane) in timed_results:
+                                results.append(result)
+                                profiler.add("diff", end - start)
+                                profiler.span(f"diff {result[0]}", start, end, lane,
+                                              {"pass": result[1], "unit": result[2]})
+                    else:
+                        results = pending
+                    changed = sum(1 for r in results if r[3] or r[4])
+                    print(f"\nWrote {changed} diff(s) for {len(results)} dump pair(s) from {input_file}")
+                if stats_format:
+                    stats_file = os.path.join(out_dir, f"ir_stats.{stats_format}")
+                    with profiler.phase("write_stats"):
+                        write_stats(stat_rows, stats_file)
+                    print(f"Wrote {stats_file}")
+            finally:
+                if pool is not None:
+                    pool.terminate()
+        finally:
+            if size:
+                content.close()
+
+    return input_file, len(matches), size, time.time() - start_time, results, stat_rows
+
+def split_log_job(job):
+    input_file, out_dir, diff, jobs, grammars, extra_markers, stats_format, profile = job
+    # the worker's phases and spans go back to the main process on its own lane
+    profiler = groot.profile.Profiler(enabled=profile, lane=f"worker {os.getpid()}")
+    return split_log(input_file, out_dir, diff, jobs, grammars, extra_markers, stats_format, profiler), profiler
+
+def print_throughput(stats):
+    width = max([len("Input")] + [len(s[0]) for s in stats])
+    print(f"\n{'Input':<{width}} {'Dumps':>8} {'MB':>10} {'Seconds':>8} {'MB/s':>8}")
+    for input_file, dumps, size, elapsed, _, _ in stats:
+        mb = size / (1 << 20)
+        rate = mb / elapsed if elapsed > 0 else 0.0
+        print(f"{input_file:<{width}} {dumps:>8} {mb:>10.1f} {elapsed:>8.2f} {rate:>8.1f}")
+
+def split_dirs(paths, out_dir):
+    """
+    OUT_DIR/<log name>.split for each input log; logs sharing a name are
+    told apart by their path below the inputs' common directory, and a log
+    given twice by its position.
+    """
+    names = [os.path.basename(p) for p in paths]
+    if len(set(names)) < len(names):
+        full = [os.path.abspath(p) for p in paths]
+        root = os.path.commonpath([os.path.dirname(p) for p in full])
+        names = [os.path.relpath(p, root) for p in full]
+    counts = Counter(names)
+    dirs = []
+    for i, name in enumerate(names):
+        if counts[name] > 1:
+            name = os.path.join(os.path.dirname(name), f"{i + 1}.{os.path.basename(name)}")
+        dirs.append(os.path.join(out_dir, name + ".split"))
+    return dirs
 
 def main():
     parser = argparse.ArgumentParser(description="Split IR dump log into multiple files by pass markers.")
-    parser.add_argument("input", help="Input log file")
-    parser.add_argument("--out-dir", default=".", help="Output directory (default: current dir)")
+    parser.add_argument("input", nargs="+", help="Input log file(s)")
+    parser.add_argument("--out-dir", default=".",
+                        help="Output directory (default: current dir); with several inputs each "
+                             "log goes to OUT_DIR/<log name>.split (OUT_DIR/<dir>/<log name>.split for logs with the same name)")
+    parser.add_argument("--diff", action="store_true",
+                        help="Also write N.Pass.diff against the previous dump of the same function")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Worker processes for splitting and diff generation (default: all cores)")
+    parser.add_argument("--stats", choices=("csv", "json"),
+                        help="Also write per-dump IR statistics (bytes, lines, functions, blocks, instructions, "
+                             "opcodes, and deltas to the previous dump of the same unit) to OUT_DIR/ir_stats.csv/json")
+    parser.add_argument("--markers", default=",".join(DEFAULT_GRAMMARS),
+                        help=f"Comma-separated marker grammars to split on (default: {','.join(DEFAULT_GRAMMARS)}; "
+                             f"known: {','.join(MARKER_GRAMMARS)}, or 'all')")
+    parser.add_argument("--marker-regex", action="append", default=[], metavar="REGEX",
+                        help="Extra marker regex that precedes the pass name (can be repeated)")
+    groot.profile.add_arguments(parser)
     args = parser.parse_args()
+    profiler = groot.profile.from_args(args)
+
+    if args.markers == "all":
+        grammars = tuple(MARKER_GRAMMARS)
+    else:
+        grammars = tuple(m.strip() for m in args.markers.split(",") if m.strip())
+    try:
+        compile_scanner(grammars, args.marker_regex)
+    except (ValueError, re.error) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    jobs = args.jobs or os.cpu_count() or 1
+    if len(args.input) == 1:
+        stats = [split_log(args.input[0], args.out_dir, args.diff, jobs, grammars, args.marker_regex, args.stats,
+                           profiler)]
+    else:
+        # One worker per log; any diffing inside a worker runs inline
+        work = [(path, split_dir, args.diff, 1, grammars, args.marker_regex, args.stats, profiler.enabled)
+                for path, split_dir in zip(args.input, split_dirs(args.input, args.out_dir))]
+        from concurrent.futures import ProcessPoolExecutor
+        stats = []
+        with profiler.phase("logs"), ProcessPoolExecutor(max_workers=min(jobs, len(work))) as executor:
+            for result, worker in executor.map(split_log_job, work):
+                stats.append(result)
+                profiler.merge(worker)
 
-    split_log(args.input, args.out_dir)
+    if args.diff:
+        print_diff_summary([r for s in stats for r in s[4]])
+    if args.stats:
+        print_stats_summary([r for s in stats for r in s[5]])
+    print_throughput(stats)
+    profiler.finish()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
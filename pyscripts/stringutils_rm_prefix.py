@@ -1,41 +1,131 @@
+"""
+python stringutils_rm_prefix.py test.ll ";" CHECK GCN -o out.ll
+python stringutils_rm_prefix.py test.ll ";" CHECK GCN -i more.ll llvm/test/CodeGen/AMDGPU -j 32
+
+Without -o the inputs are rewritten in place (temp file + os.replace), and
+files with nothing to delete are left untouched. Directories are walked
+for --ext files.
+"""
 import argparse
+import mmap
+import os
 import re
+import sys
+import tempfile
+import time
+from itertools import filterfalse, repeat
+
+DEFAULT_EXTS = ".ll,.mir"
+
+
+def compile_patterns(delimiter, tokens):
+    """
+    (line pattern, file pattern). The line pattern is one alternation of
+    all tokens, matched against each line; a line consisting of just the
+    delimiter is deleted as well. The file pattern finds the same lines
+    in a whole file, to tell whether there is anything to delete at all.
+    """
+    delim = re.escape(delimiter.encode())
+    alternatives = b"|".join(re.escape(token.encode()) for token in tokens)
+    line = re.compile(rb"\s*" + delim + rb"\s*(?:" + alternatives + rb"|$)")
+    any_line = re.compile(rb"(?m)^[^\S\n]*" + delim + rb"[^\S\n]*(?:" + alternatives + rb"|$)")
+    return line, any_line
+
+
+def has_match(path, any_line):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return any_line.search(data) is not None
+
+
+def strip_file(input_file, patterns, output_file=None):
+    """
+    Stream input_file through the line pattern, dropping matching lines,
+    into output_file (default: in place). Returns (bytes removed, written).
+    """
+    pattern, any_line = patterns
+    in_place = output_file is None or os.path.abspath(output_file) == os.path.abspath(input_file)
+    if in_place and not has_match(input_file, any_line):
+        return 0, False
+    # in place through a symlink rewrites the file it points to, as open(..., "w") would
+    target = os.path.realpath(input_file) if in_place else output_file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target)),
+                               prefix=f".{os.path.basename(target)}.", suffix=".tmp")
+    try:
+        with open(input_file, "rb") as src, os.fdopen(fd, "wb") as dst:
+            dst.writelines(filterfalse(pattern.match, src))
+            removed = src.tell() - dst.tell()
+        os.chmod(tmp, os.stat(input_file).st_mode & 0o7777)
+        os.replace(tmp, target)
+        return removed, True
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def strip_file_job(job):
+    path, patterns = job
+    return (path,) + strip_file(path, patterns)
+
 
 def delete_lines(input_file, output_file, delimiter, tokens, del_empty_lines=True):
-    # Create patterns for all tokens
-    token_patterns = [re.compile(rf"^{re.escape(delimiter)}\s*{re.escape(token)}") for token in tokens]
-    pattern_delim_eol = re.compile(rf"^{re.escape(delimiter)}\s*$")
-    
-    with open(input_file, 'r') as file:
-        lines = file.readlines()
-
-    with open(output_file, 'w') as file:
-        for line in lines:
-            stripped_line = line.lstrip()
-            
-            # Check if line matches any token pattern
-            should_skip = False
-            for pattern in token_patterns:
-                if pattern.match(stripped_line):
-                    should_skip = True
-                    break
-            
-            if should_skip:
-                continue
-            
-            if pattern_delim_eol.match(stripped_line):
-                continue
-                
-            file.write(line)
+    return strip_file(input_file, compile_patterns(delimiter, tokens), output_file)
+
+
+def expand_inputs(paths, exts):
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith(exts))
+    return files
+
+
+def strip_files(files, patterns, jobs):
+    """In-place strip of many files; returns [(path, bytes removed, written)]."""
+    if jobs <= 1 or len(files) == 1:
+        return [strip_file_job(job) for job in zip(files, repeat(patterns))]
+    from concurrent.futures import ProcessPoolExecutor  # not needed for single files
+    with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as executor:
+        return list(executor.map(strip_file_job, zip(files, repeat(patterns)),
+                                 chunksize=max(1, len(files) // (jobs * 8))))
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Delete lines starting with a specific delimiter and tokens.")
-    parser.add_argument('input_file', type=str, help='Path to the input file')
+    parser.add_argument('input_file', type=str, help='Path to the input file or directory')
     parser.add_argument('delimiter', type=str, help='Delimiter character')
     parser.add_argument('tokens', type=str, nargs='+', help='Token strings to remove')
-    parser.add_argument('-o', type=str, help='Path to the output file')
+    parser.add_argument('-o', type=str, help='Path to the output file (default: rewrite the input in place)')
+    parser.add_argument('-i', '--input', action='extend', nargs='+', default=[], metavar='PATH',
+                        help='More input files or directories, rewritten in place')
+    parser.add_argument('--ext', default=DEFAULT_EXTS,
+                        help=f'Comma-separated extensions of files to clean in directories (default: {DEFAULT_EXTS})')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Worker processes (default: all cores)')
     parser.add_argument('--del_empty_lines', action='store_true', help='Delete empty lines')
-    
+
     args = parser.parse_args()
 
-    delete_lines(args.input_file, args.o, args.delimiter, args.tokens, args.del_empty_lines)
\ No newline at end of file
+    patterns = compile_patterns(args.delimiter, args.tokens)
+    files = expand_inputs([args.input_file] + args.input, tuple(args.ext.split(",")))
+    if args.o and len(files) != 1:
+        print("Error: -o needs exactly one input file")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    if args.o:
+        removed, _ = strip_file(files[0], patterns, args.o)
+        results = [(files[0], removed, True)]
+    else:
+        results = strip_files(files, patterns, args.jobs or os.cpu_count() or 1)
+    elapsed = time.perf_counter() - start
+    if len(files) > 1:
+        changed = sum(1 for _, _, written in results if written)
+        removed = sum(r for _, r, _ in results)
+        print(f"Cleaned {changed} of {len(files)} files, {removed} bytes removed in {elapsed:.2f}s")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark stringutils_rm_prefix.py on a whole LLVM test directory against
+the original per-file implementation, and check both give the same files.
+
+python stringutils_rm_prefix_bench.py --dir ~/llvm-project/llvm/test/CodeGen/X86 CHECK
+python stringutils_rm_prefix_bench.py --files 5000 --legacy-cli    # synthetic tests
+The directory is copied to a scratch location first; it is never modified.
+"""
+import argparse
+import filecmp
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import stringutils_rm_prefix
+
+# what the old bin/lit_clean loop ran for every file
+LEGACY_CLI = ("import sys; sys.path.insert(0, sys.argv[1]); "
+              "from stringutils_rm_prefix_bench import legacy_delete_lines; "
+              "legacy_delete_lines(sys.argv[2], sys.argv[2], sys.argv[3], sys.argv[4:])")
+
+
+def legacy_delete_lines(input_file, output_file, delimiter, tokens):
+    """The original implementation, kept as the reference."""
+    token_patterns = [re.compile(rf"^{re.escape(delimiter)}\s*{re.escape(token)}") for token in tokens]
+    pattern_delim_eol = re.compile(rf"^{re.escape(delimiter)}\s*$")
+    with open(input_file, 'r') as file:
+        lines = file.readlines()
+    with open(output_file, 'w') as file:
+        for line in lines:
+            stripped_line = line.lstrip()
+            if any(pattern.match(stripped_line) for pattern in token_patterns):
+                continue
+            if pattern_delim_eol.match(stripped_line):
+                continue
+            file.write(line)
+
+
+def write_corpus(root, files, seed=3):
+    """Synthetic lit tests: RUN lines, CHECK/GCN check lines and IR."""
+    rng = random.Random(seed)
+    for i in range(files):
+        subdir = os.path.join(root, f"dir{i % 40}")
+        os.makedirs(subdir, exist_ok=True)
+        with open(os.path.join(subdir, f"test{i}.ll"), "w") as f:
+            f.write("; RUN: llc -mtriple=x86_64 < %s | FileCheck %s --check-prefixes=CHECK,GCN\n\n")
+            for fn in range(rng.randint(1, 30)):
+                f.write(f"define i32 @f{fn}(i32 %x) {{\n")
+                f.write(f"; CHECK-LABEL: f{fn}:\n")
+                for _ in range(rng.randint(2, 20)):
+                    f.write(f"; CHECK-NEXT:    addl ${rng.randint(0, 99)}, %eax\n")
+                    if rng.random() < 0.3:
+                        f.write("; GCN:    s_nop 0\n;\n")
+                    f.write(f"  %r{fn} = add i32 %x, {rng.randint(0, 99)}\n")
+                f.write(f"  ret i32 %r{fn}\n}}\n\n")
+
+
+def test_files(root, exts):
+    return stringutils_rm_prefix.expand_inputs([root], exts)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stringutils_rm_prefix.py on a test directory.")
+    parser.add_argument("tokens", nargs="*", default=["CHECK", "GCN"], help="Tokens to remove (default: CHECK GCN)")
+    parser.add_argument("--dir", help="Test directory to clean (copied first)")
+    parser.add_argument("--files", type=int, default=5000, help="Synthetic tests to generate without --dir")
+    parser.add_argument("--delimiter", default=";", help="Delimiter (default: ;)")
+    parser.add_argument("--ext", default=stringutils_rm_prefix.DEFAULT_EXTS, help="Extensions to clean")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--legacy-cli", action="store_true",
+                        help="Also time the old lit_clean loop: one python process per file")
+    args = parser.parse_args()
+
+    exts = tuple(args.ext.split(","))
+    jobs = args.jobs or os.cpu_count() or 1
+    scratch = tempfile.mkdtemp(prefix="rm_prefix_bench_")
+    try:
+        source = os.path.join(scratch, "source")
+        if args.dir:
+            shutil.copytree(args.dir, source, symlinks=True)
+        else:
+            write_corpus(source, args.files)
+        files = test_files(source, exts)
+        size = sum(os.path.getsize(f) for f in files)
+        print(f"{len(files)} files, {size / (1 << 20):.1f} MB")
+
+        trees = {}
+        for name in ("legacy", "serial", "parallel", "rerun") + (("cli",) if args.legacy_cli else ()):
+            trees[name] = os.path.join(scratch, name)
+            shutil.copytree(source, trees[name], symlinks=True)
+
+        patterns = stringutils_rm_prefix.compile_patterns(args.delimiter, args.tokens)
+        results = [
+            ("original, in process", timed(lambda: [
+                legacy_delete_lines(f, f, args.delimiter, args.tokens) for f in test_files(trees["legacy"], exts)]))]
+        if args.legacy_cli:
+            here = os.path.dirname(os.path.abspath(__file__))
+            results.append(("original, process per file", timed(lambda: [
+                subprocess.run([sys.executable, "-c", LEGACY_CLI, here, f, args.delimiter] + args.tokens, check=True)
+                for f in test_files(trees["cli"], exts)])))
+        results.append(("combined regex, -j 1", timed(
+            lambda: stringutils_rm_prefix.strip_files(test_files(trees["serial"], exts), patterns, 1))))
+        results.append((f"combined regex, -j {jobs}", timed(
+            lambda: stringutils_rm_prefix.strip_files(test_files(trees["parallel"], exts), patterns, jobs))))
+        stringutils_rm_prefix.strip_files(test_files(trees["rerun"], exts), patterns, jobs)
+        results.append((f"rerun on clean tree, -j {jobs}", timed(
+            lambda: stringutils_rm_prefix.strip_files(test_files(trees["rerun"], exts), patterns, jobs))))
+
+        base = results[0][1]
+        for name, seconds in results:
+            print(f"{name:<32} {seconds:8.2f}s  {size / (1 << 20) / seconds:8.1f} MB/s  {base / seconds:6.2f}x")
+
+        same = True
+        for name, tree in trees.items():
+            if name == "legacy":
+                continue
+            for f in test_files(trees["legacy"], exts):
+                if not filecmp.cmp(f, os.path.join(tree, os.path.relpath(f, trees["legacy"])), shallow=False):
+                    print(f"MISMATCH ({name}): {os.path.relpath(f, trees['legacy'])}")
+                    same = False
+                    break
+        print("Identical output" if same else "FAILED")
+        sys.exit(0 if same else 1)
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == "__main__":
+    main()
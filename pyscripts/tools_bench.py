@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Benchmark the pyscripts tools end to end on deterministic synthetic inputs
+and compare two runs (e.g. two commits).
+
+python tools_bench.py --out base.json                      # default sizes
+python tools_bench.py --scale 0.05 --only cabbie,split_printlog --out new.json
+python tools_bench.py --compare base.json new.json         # exit 1 on regressions
+
+Every benchmark runs the tool's command line in a child process, --repeat
+times, and records the best wall time, throughput (items/s and input MB/s)
+and peak RSS (largest process of the run, pool workers included). Startup
+is the best of --startup-runs `tool.py --help` runs next to a bare
+interpreter. The corpora are generated into --corpus (default: a temp dir)
+from fixed seeds and reused while their sizes match, so --corpus DIR keeps
+a multi-GB print-after-all log around between runs.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import compact_json_bench
+import merge_json_bench
+
+PYSCRIPTS = os.path.dirname(os.path.abspath(__file__))
+STARTUP_TOOLS = ("parallel_exec", "cabbie", "split_printlog", "split_dot", "merge_json")
+RESULTS_VERSION = 1
+
+# generator -> default size at --scale 1
+CORPUS_SIZES = {
+    "commands": 20000,      # trivial commands
+    "printlog": 1024,       # MB of print-after-all output
+    "dot": 2000,            # digraphs of ~60 nodes
+    "join": 1000000,        # rows
+    "lltests": 20000,       # .ll test files
+    "json_doc": 64,         # MB document for CompactJSONEncoder
+}
+
+IR_PASSES = ("SROAPass", "EarlyCSEPass", "InstCombinePass", "SimplifyCFGPass", "GVNPass", "LICMPass",
+             "LoopRotatePass", "DSEPass", "ADCEPass", "ReassociatePass")
+MIR_PASSES = ("Two-Address instruction pass (twoaddressinstruction)", "Greedy Register Allocator (greedy)",
+              "Machine Copy Propagation Pass (machine-cp)", "Prologue/Epilogue Insertion & Frame Finalization "
+              "(prologepilog)", "Post-RA pseudo instruction expansion pass (postrapseudos)")
+IR_OPS = ("add nsw i32", "sub i32", "mul i32", "xor i32", "and i32", "shl i32", "or i32")
+MIR_OPS = ("ADD32rr", "SUB32rr", "IMUL32rr", "XOR32rr", "AND32rr", "MOV32rr", "LEA64r")
+CHECK_PREFIXES = ("CHECK", "CHECK-NEXT", "CHECK-LABEL", "X86", "GCN", "NOTE")
+
+
+# ---------------------------------------------------------------- corpora
+
+def write_commands(path, count):
+    """count trivial shell commands, one per line."""
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(f"true {i}\n")
+    return count
+
+
+def ir_function(rng, name, size):
+    lines = [f"define dso_local i32 @{name}(i32 noundef %x, i32 noundef %y) #0 {{", "entry:"]
+    prev = "%x"
+    for i in range(size):
+        if i and i % 12 == 0:
+            lines.append(f"  br label %bb{i}")
+            lines.append(f"bb{i}:")
+        lines.append(f"  %v{i} = {rng.choice(IR_OPS)} {prev}, {rng.randint(1, 99)}")
+        prev = f"%v{i}"
+    lines.append(f"  ret i32 {prev}")
+    lines.append("}")
+    return lines
+
+
+def mir_function(rng, name, size):
+    lines = [f"# Machine code for function {name}: NoPHIs, TracksLiveness, NoVRegs", "bb.0.entry:"]
+    for i in range(size):
+        if i and i % 12 == 0:
+            lines.append(f"bb.{i // 12}:")
+        lines.append(f"  $eax = {rng.choice(MIR_OPS)} $eax, $e{rng.choice('bcd')}x, implicit-def dead $eflags")
+    lines.append("  RET64 $eax")
+    lines.append("")
+    lines.append(f"# End machine code for function {name}.")
+    return lines
+
+
+def write_printlog(path, size_mb, seed=11):
+    """
+    A -print-after-all log of about size_mb MB: every IR pass on every
+    function, then the machine passes, with a few instructions rewritten by
+    each pass so dumps and diffs differ. Returns the number of dumps.
+    """
+    rng = random.Random(seed)
+    budget = size_mb << 20
+    written = dumps = 0
+    with open(path, "w") as f:
+        module = 0
+        while written < budget:
+            names = [f"m{module}_f{i}" for i in range(rng.randint(20, 60))]
+            ir = {n: ir_function(rng, n, rng.randint(10, 200)) for n in names}
+            mir = {n: mir_function(rng, n, rng.randint(10, 200)) for n in names}
+            for passes, bodies, marker in ((IR_PASSES, ir, "; *** IR Dump After {} on {} ***"),
+                                           (MIR_PASSES, mir, "# *** IR Dump After {} ***:")):
+                for pass_name in passes:
+                    for name in names:
+                        body = bodies[name]
+                        for _ in range(rng.randint(0, 3)):
+                            i = rng.randrange(2, len(body) - 3)
+                            if body[i].startswith("  "):
+                                body[i] = body[i].rsplit(" ", 1)[0] + f" {rng.randint(1, 99)}"
+                        text = "\n".join([marker.format(pass_name, name)] + body) + "\n\n"
+                        f.write(text)
+                        written += len(text)
+                        dumps += 1
+                        if written >= budget:
+                            return dumps
+            module += 1
+    return dumps
+
+
+def write_dot(path, graphs, seed=13):
+    """graphs CFG digraphs in opt -dot-cfg style, ~60 record nodes each."""
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for g in range(graphs):
+            name = f"func_{g}"
+            f.write(f"digraph \"CFG for '{name}' function\" {{\n\tlabel=\"CFG for '{name}' function\";\n\n")
+            nodes = rng.randint(20, 100)
+            for n in range(nodes):
+                body = "\\l  ".join(f"%v{n}_{i} = add i32 %v{n}_{i - 1}, {rng.randint(1, 9)}"
+                                    for i in range(rng.randint(1, 8)))
+                f.write(f'\tNode0x{g:x}{n:04x} [shape=record,color="#3d50c3ff",style=filled,'
+                        f'label="{{bb{n}:\\l  {body}\\l}}"];\n')
+                for succ in rng.sample(range(nodes), min(nodes, rng.randint(0, 2))):
+                    f.write(f"\tNode0x{g:x}{n:04x} -> Node0x{g:x}{succ:04x};\n")
+            f.write("}\n")
+    return graphs
+
+
+def write_lltests(root, files, seed=17):
+    """
+    Directive-heavy lit-style .ll tests: a third carry COMPILE/LINK/RUN or
+    custom prefixes, all have many `WORD:` check lines for the discovery
+    prefilter to reject.
+    """
+    rng = random.Random(seed)
+    for i in range(files):
+        subdir = os.path.join(root, f"dir{i % 50}")
+        os.makedirs(subdir, exist_ok=True)
+        lines = [f"; RUN: llc -mtriple=x86_64 < %s | FileCheck %s --check-prefixes={rng.choice(CHECK_PREFIXES)}"]
+        if i % 3 == 0:
+            lines += ["; COMPILE: llc -filetype=obj %s -o t.o", "; LINK: clang t.o -o t", "; RUN: ./t"]
+        elif i % 3 == 1:
+            lines.append(f"; VERIFY{i % 4}: opt -passes=verify %s -disable-output")
+        for fn in range(rng.randint(1, 20)):
+            lines.append(f"define i32 @f{fn}(i32 %x) {{")
+            for _ in range(rng.randint(1, 15)):
+                lines.append(f"; {rng.choice(CHECK_PREFIXES)}:    addl ${rng.randint(0, 99)}, %eax")
+                lines.append(f"  %r{fn} = add i32 %x, {rng.randint(0, 99)}")
+            lines.append("  ret i32 %x\n}")
+        with open(os.path.join(subdir, f"test{i}.ll"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+    return files
+
+
+def write_join(root, rows):
+    a_path, b_path = merge_json_bench.write_inputs(rows, root)
+    with open(os.path.join(root, "config.json"), "w") as f:
+        json.dump({"key": "a:id -> b:id",
+                   "fields": ["a:bench", "a:time", "a:size", "b:cycles", "b:ipc", "b:size"]}, f)
+    return rows
+
+
+def write_json_doc(path, size_mb):
+    doc = compact_json_bench.make_document(size_mb)
+    with open(path, "w") as f:
+        json.dump(doc, f)
+    return sum(len(functions) for functions in doc["benchmarks"].values())
+
+
+def file_bytes(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, n)) for d, _, names in os.walk(path) for n in names)
+
+
+class Corpus:
+    """
+    Generated inputs under one directory, recorded in manifest.json as
+    {name: {"size", "items", "bytes"}}; an input is regenerated only when
+    its size changes.
+    """
+
+    GENERATORS = {
+        "commands": ("commands.txt", write_commands),
+        "printlog": ("print-after-all.log", write_printlog),
+        "dot": ("cfgs.dot", write_dot),
+        "join": ("join", write_join),
+        "lltests": ("lltests", write_lltests),
+        "json_doc": ("doc.json", write_json_doc),
+    }
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def get(self, name, size):
+        """(path, items, bytes) of the input, generating it if needed."""
+        filename, generate = self.GENERATORS[name]
+        path = os.path.join(self.root, filename)
+        entry = self.manifest.get(name)
+        if entry is None or entry["size"] != size or not os.path.exists(path):
+            print(f"Generating {name} ({size})...", flush=True)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            if filename in ("join", "lltests"):
+                os.makedirs(path)
+            start = time.perf_counter()
+            items = generate(path, size)
+            entry = {"size": size, "items": items, "bytes": file_bytes(path)}
+            self.manifest[name] = entry
+            with open(self.manifest_path, "w") as f:
+                json.dump(self.manifest, f, indent=2)
+            print(f"  {entry['bytes'] / (1 << 20):.1f} MB in {time.perf_counter() - start:.1f}s", flush=True)
+        return path, entry["items"], entry["bytes"]
+
+
+# ---------------------------------------------------------------- running
+
+def tool(name):
+    return [sys.executable, os.path.join(PYSCRIPTS, f"{name}.py")]
+
+
+# Forks and times the command from a minimal interpreter: Linux carries the
+# forking process's RSS high-water mark into the child's ru_maxrss, so
+# measuring straight from this (much larger) process would report our size.
+MEASURE = """
+import os, sys, time
+start = time.perf_counter()
+pid = os.fork()
+if pid == 0:
+    try:
+        os.execvp(sys.argv[2], sys.argv[2:])
+    finally:
+        os._exit(127)
+_, status, usage = os.wait4(pid, 0)
+os.write(int(sys.argv[1]), b"%f %d" % (time.perf_counter() - start, usage.ru_maxrss))
+sys.exit(os.waitstatus_to_exitcode(status))
+"""
+
+
+def measure(cmd, cwd):
+    """(seconds, peak RSS in MB) of one run; raises RuntimeError if the command fails."""
+    r, w = os.pipe()
+    with tempfile.TemporaryFile() as err, open(r, "rb") as reports:
+        try:
+            proc = subprocess.Popen([sys.executable, "-S", "-I", "-c", MEASURE, str(w)] + cmd, cwd=cwd,
+                                    stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=err, pass_fds=(w,))
+        finally:
+            os.close(w)
+        report = reports.read()
+        proc.wait()
+        if proc.returncode != 0 or not report:
+            err.seek(0)
+            tail = err.read()[-2000:].decode(errors="replace")
+            raise RuntimeError(f"{' '.join(cmd)} exited with {proc.returncode}\n{tail}")
+    seconds, maxrss_kb = report.split()
+    return float(seconds), int(maxrss_kb) / 1024
+
+
+def benchmarks(corpus, scale, jobs):
+    """
+    (name, tool, unit, corpus entry, command builder, reset) per benchmark;
+    the builder gets the input path and a scratch directory, reset(work,
+    cmd) clears what a run leaves behind (or prepares a warm run).
+    """
+    size = lambda name: max(1, int(CORPUS_SIZES[name] * scale))
+    j = ["-j", str(jobs)]
+    clear = lambda *names: lambda work, cmd: [shutil.rmtree(os.path.join(work, n), ignore_errors=True) for n in names]
+    index = lambda work: os.path.join(work, "cabbie-index.json")
+    encode = (f"import json, sys; sys.path.insert(0, {PYSCRIPTS!r}); "
+              "from CompactJSONEncoder import CompactJSONEncoder; "
+              "json.dump(json.load(open(sys.argv[1])), open(sys.argv[2], 'w'), cls=CompactJSONEncoder)")
+    return [
+        ("parallel_exec", "parallel_exec", "commands", ("commands", size("commands")),
+         lambda src, work: tool("parallel_exec") + [src, "-q", "-o", os.path.join(work, "pe.log")] + j,
+         clear()),
+        ("cabbie_discover_cold", "cabbie", "files", ("lltests", size("lltests")),
+         lambda src, work: tool("cabbie") + [src, "--list", "--index", index(work)] + j,
+         lambda work, cmd: os.path.exists(index(work)) and os.unlink(index(work))),
+        ("cabbie_discover_warm", "cabbie", "files", ("lltests", size("lltests")),
+         lambda src, work: tool("cabbie") + [src, "--list", "--index", index(work)] + j,
+         lambda work, cmd: os.path.exists(index(work)) or measure(cmd, work)),
+        ("split_printlog", "split_printlog", "dumps", ("printlog", size("printlog")),
+         lambda src, work: tool("split_printlog") + [src, "--out-dir", os.path.join(work, "split")] + j,
+         clear("split")),
+        ("split_printlog_diff_stats", "split_printlog", "dumps", ("printlog", size("printlog")),
+         lambda src, work: tool("split_printlog") + [src, "--out-dir", os.path.join(work, "split"), "--diff",
+                                                     "--stats", "json"] + j,
+         clear("split")),
+        ("split_dot", "split_dot", "graphs", ("dot", size("dot")),
+         lambda src, work: tool("split_dot") + [src, "-o", os.path.join(work, "dot"), "--no-validation",
+                                                "--no-cache"],
+         clear("dot")),
+        ("merge_json", "merge_json", "rows", ("join", size("join")),
+         lambda src, work: tool("merge_json") + [os.path.join(src, "a.json"), os.path.join(src, "b.json"),
+                                                 os.path.join(src, "config.json"), os.path.join(work, "out.json")],
+         clear()),
+        ("merge_json_stream", "merge_json", "rows", ("join", size("join")),
+         lambda src, work: tool("merge_json") + ["--stream", os.path.join(src, "a.json"),
+                                                 os.path.join(src, "b.json"), os.path.join(src, "config.json"),
+                                                 os.path.join(work, "out.json")],
+         clear()),
+        ("compact_json", "CompactJSONEncoder", "functions", ("json_doc", size("json_doc")),
+         lambda src, work: [sys.executable, "-c", encode, src, os.path.join(work, "compact.json")],
+         clear()),
+    ]
+
+
+def startup_times(runs):
+    """Best wall time in ms of `python -c pass` and of `tool.py --help` per tool."""
+    times = {}
+    for name, cmd in [("python", [sys.executable, "-c", "pass"])] + \
+                     [(t, tool(t) + ["--help"]) for t in STARTUP_TOOLS]:
+        times[name] = round(min(measure(cmd, PYSCRIPTS)[0] for _ in range(runs)) * 1000, 2)
+    return times
+
+
+def git_commit():
+    try:
+        head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=PYSCRIPTS, capture_output=True, text=True,
+                              check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=PYSCRIPTS,
+                               capture_output=True, text=True).stdout.strip() != ""
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return head, dirty
+
+
+def run(args):
+    corpus_dir = args.corpus or tempfile.mkdtemp(prefix="tools_bench_corpus_")
+    corpus = Corpus(corpus_dir)
+    only = set(args.only.split(",")) if args.only else None
+    head, dirty = git_commit()
+    results = {
+        "version": RESULTS_VERSION,
+        "commit": head,
+        "dirty": dirty,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "jobs": args.jobs,
+        "scale": args.scale,
+        "startup_ms": {},
+        "benchmarks": {},
+    }
+    try:
+        if not args.no_startup:
+            results["startup_ms"] = startup_times(args.startup_runs)
+            for name, ms in results["startup_ms"].items():
+                print(f"startup {name:<16} {ms:8.1f} ms")
+        print(f"{'Benchmark':<28} {'Items':>10} {'MB':>8} {'Best (s)':>9} {'Items/s':>11} {'MB/s':>8} {'RSS MB':>8}")
+        for name, tool_name, unit, (input_name, size), build, reset in benchmarks(corpus, args.scale, args.jobs):
+            if only and name not in only and tool_name not in only:
+                continue
+            src, items, nbytes = corpus.get(input_name, size)
+            work = tempfile.mkdtemp(prefix=f"tools_bench_{name}_")
+            try:
+                cmd = build(src, work)
+                runs = []
+                rss = 0.0
+                for _ in range(args.repeat):
+                    reset(work, cmd)
+                    seconds, peak = measure(cmd, work)
+                    runs.append(round(seconds, 4))
+                    rss = max(rss, peak)
+            finally:
+                shutil.rmtree(work)
+            best = min(runs)
+            entry = {"tool": tool_name, "unit": unit, "items": items, "bytes": nbytes, "runs": runs,
+                     "seconds": best, "items_per_s": round(items / best, 1),
+                     "mb_per_s": round(nbytes / (1 << 20) / best, 2), "peak_rss_mb": round(rss, 1)}
+            results["benchmarks"][name] = entry
+            print(f"{name:<28} {items:>10} {nbytes / (1 << 20):>8.1f} {best:>9.3f} {entry['items_per_s']:>11.0f} "
+                  f"{entry['mb_per_s']:>8.1f} {rss:>8.1f}", flush=True)
+    finally:
+        if not args.corpus:
+            shutil.rmtree(corpus_dir)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+    return 0
+
+
+def compare(old_path, new_path, threshold):
+    """Print new vs old per benchmark; 1 if any time or RSS got worse by more than threshold."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"old: {old.get('commit')} ({old.get('date')}), new: {new.get('commit')} ({new.get('date')})")
+    if old.get("scale") != new.get("scale") or old.get("jobs") != new.get("jobs"):
+        print(f"WARNING: scale/jobs differ: {old.get('scale')}/{old.get('jobs')} vs "
+              f"{new.get('scale')}/{new.get('jobs')}")
+    regressions = []
+
+    def row(name, metric, a, b):
+        ratio = b / a if a else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(f"{name} {metric}")
+        elif ratio < 1 - threshold:
+            flag = "  improved"
+        print(f"{name:<28} {metric:<10} {a:>10.3f} {b:>10.3f} {ratio:>7.2f}x{flag}")
+
+    print(f"{'Benchmark':<28} {'Metric':<10} {'Old':>10} {'New':>10} {'Ratio':>8}")
+    for name in old.get("startup_ms", {}):
+        if name in new.get("startup_ms", {}):
+            row(f"startup {name}", "ms", old["startup_ms"][name], new["startup_ms"][name])
+    for name, a in old["benchmarks"].items():
+        b = new["benchmarks"].get(name)
+        if b is None:
+            continue
+        if a["items"] != b["items"]:
+            print(f"{name:<28} inputs differ ({a['items']} vs {b['items']} {a['unit']}), skipped")
+            continue
+        row(name, "seconds", a["seconds"], b["seconds"])
+        row(name, "rss MB", a["peak_rss_mb"], b["peak_rss_mb"])
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pyscripts tools on synthetic inputs.")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply every corpus size (default sizes: "
+                             + ", ".join(f"{k}={v}" for k, v in CORPUS_SIZES.items()) + "; printlog and "
+                             "json_doc are MB)")
+    parser.add_argument("--corpus", metavar="DIR", help="Generate inputs in DIR and keep them for later runs")
+    parser.add_argument("--only", help="Comma-separated benchmark or tool names")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Jobs passed to the tools that take -j (default: all cores)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the best is kept (default: 3)")
+    parser.add_argument("--startup-runs", type=int, default=20, help="Runs per startup measurement (default: 20)")
+    parser.add_argument("--no-startup", action="store_true", help="Skip the startup measurements")
+    parser.add_argument("--out", metavar="FILE", help="Write the results as JSON to FILE")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="With --compare, relative slowdown counted as a regression (default: 0.10)")
+    args = parser.parse_args()
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@
 # Usage: ./bisector.sh <compile_script> <fail_test_script>
 #   compile_script: script that compiles with -mllvm -opt-bisect-limit=X
 #   fail_test_script: script that returns 0 if compilation/test passes, non-zero if fails
+# For a parallel search with memoized results see pyscripts/opt_bisect.py
 
 set -e
 
@@ -2,6 +2,7 @@
 #!/bin/bash
 # Take diff of all comman files from arg1 and arg2  with extension arg3
 # E.g. diffutils_dir_ext.sh  /usr/dir1 /usr/dir2 txt
+# For a recursive, parallel diff with asm filters and a ranked summary see pyscripts/diffutils_dir.py
 #
 #
 # Define the directories